@@ -0,0 +1,298 @@
+"""
+异步上传引擎
+基于 asyncio + aiohttp，在单个线程中同时保持数百个上传请求，
+适合高延迟、允许高并发的HTTP图床
+"""
+import asyncio
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from file_memo import file_memo
+from metrics import metrics
+from note_writer import NoteWriter, apply_edits, read_note
+from uploader import (
+    apply_wordpress_links,
+    collect_markdown_files,
+    find_local_images,
+    resolve_image_path,
+    safe_print,
+    upload_image,
+)
+
+# 默认的最大并发上传数
+DEFAULT_MAX_CONCURRENCY = 200
+
+
+class AsyncUploadEngine:
+    """异步处理笔记：读取、并发上传（同一图片只上传一次）、改写、写回"""
+
+    def __init__(
+        self,
+        image_host=None,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        convert_to_wp: bool = False,
+        remove_wp: bool = False,
+        image_path_prefix: str = "",
+        offline_queue=None,
+        max_notes: Optional[int] = None,
+    ):
+        """
+        初始化异步引擎
+
+        Args:
+            image_host: 图床适配器实例，为None时使用默认的PicGo上传
+            max_concurrency: 最大并发上传数
+            convert_to_wp: 是否转换为WordPress格式
+            remove_wp: 是否移除WordPress前缀
+            image_path_prefix: 图片路径前缀
+            offline_queue: 离线上传队列，上传失败的图片会加入队列等待补传
+            max_notes: 同时处理的笔记数，为None时与最大并发上传数相同
+        """
+        self.image_host = image_host
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_notes = max(1, max_notes or self.max_concurrency)
+        self.convert_to_wp = convert_to_wp
+        self.remove_wp = remove_wp
+        self.image_path_prefix = image_path_prefix
+        self.offline_queue = offline_queue
+        self.stats = {
+            "notes": 0,
+            "changed_notes": 0,
+            "images": 0,
+            "uploaded": 0,
+            "reused": 0,
+            "failed": 0,
+            "failed_notes": 0,
+        }
+        self._session = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        # 图片路径 -> 上传任务，同一张图片被多篇笔记引用时只上传一次
+        self._uploads: Dict[str, asyncio.Task] = {}
+        self._note_writer = NoteWriter()
+
+    async def run(self, md_files: List[str]) -> Dict[str, int]:
+        """
+        处理一批笔记
+
+        Args:
+            md_files: Markdown文件路径列表
+
+        Returns:
+            统计信息
+        """
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        try:
+            import aiohttp
+        except ImportError:
+            aiohttp = None
+            safe_print(
+                "aiohttp未安装，异步引擎回退到线程池上传，可运行: pip install aiohttp",
+                level="warning",
+            )
+
+        try:
+            if aiohttp is None:
+                await self._process_notes(md_files)
+            else:
+                connector = aiohttp.TCPConnector(limit=self.max_concurrency)
+                async with aiohttp.ClientSession(connector=connector) as session:
+                    self._session = session
+                    await self._process_notes(md_files)
+        finally:
+            self._session = None
+            await asyncio.to_thread(self._note_writer.flush)
+            self.stats["changed_notes"] = self._note_writer.stats[NoteWriter.WRITTEN]
+            if self.offline_queue is not None:
+                self.offline_queue.save()
+        return self.stats
+
+    async def _process_notes(self, md_files: List[str]):
+        """由 max_notes 个协程依次领取笔记处理，避免一次为所有笔记创建协程、读入内容"""
+        pending = iter(md_files)
+
+        async def worker():
+            for file_path in pending:
+                try:
+                    await self._process_note(file_path)
+                except Exception as e:
+                    # 单篇笔记出错不影响其他笔记
+                    self.stats["failed_notes"] += 1
+                    safe_print(
+                        f"处理文件时出错: {os.path.basename(file_path)} {str(e)} ❌",
+                        level="error",
+                    )
+
+        await asyncio.gather(*(worker() for _ in range(min(self.max_notes, len(md_files)))))
+
+    async def _upload(self, local_path: str) -> Optional[str]:
+        """实际上传一张图片，并发数受信号量限制"""
+        host_name = self.image_host.get_name() if self.image_host else "PicGo"
+        async with self._semaphore:
+            start = time.perf_counter()
+            url = None
+            try:
+                if self.image_host:
+                    url = await self.image_host.upload_async(local_path, self._session)
+                else:
+                    url = await asyncio.to_thread(upload_image, local_path)
+                return url
+            finally:
+                try:
+                    size = file_memo.getsize(local_path)
+                except OSError:
+                    size = 0
+                metrics.record_upload(
+                    host_name,
+                    os.path.basename(local_path),
+                    size,
+                    time.perf_counter() - start,
+                    bool(url),
+                )
+
+    async def _upload_once(self, local_path: str):
+        """
+        上传图片（去重）
+
+        Returns:
+            (URL, 错误信息)
+        """
+        key = os.path.normcase(os.path.abspath(local_path))
+        task = self._uploads.get(key)
+        owner = task is None
+        if owner:
+            safe_print(f"上传图片: {os.path.basename(local_path)}", level="info")
+            task = asyncio.ensure_future(self._upload(local_path))
+            self._uploads[key] = task
+
+        try:
+            url = await asyncio.shield(task)
+            error = "" if url else "upload failed"
+        except Exception as e:
+            url = None
+            error = str(e)
+            if owner:
+                safe_print(f"处理图片时出错: {error} ❌", level="error")
+
+        if url:
+            if owner:
+                self.stats["uploaded"] += 1
+                safe_print(f"图片 {os.path.basename(local_path)} 上传成功 ✅", level="success")
+            else:
+                self.stats["reused"] += 1
+                metrics.record_cache_hit()
+        return url, error
+
+    async def _process_image(self, file_path: str, match) -> Optional[str]:
+        local_path = resolve_image_path(match.group(1), file_path, self.image_path_prefix)
+        if not file_memo.exists(local_path):
+            safe_print(f"图片不存在: {local_path} ❌", level="error")
+            self.stats["failed"] += 1
+            return None
+
+        url, error = await self._upload_once(local_path)
+        if not url:
+            self.stats["failed"] += 1
+            safe_print(f"图片 {os.path.basename(local_path)} 上传失败 ❌", level="error")
+            if self.offline_queue is not None:
+                self.offline_queue.add(
+                    local_path,
+                    file_path,
+                    match.group(0),
+                    error,
+                    convert_to_wp=self.convert_to_wp,
+                )
+        return url
+
+    async def _process_note(self, file_path: str):
+        file_name = os.path.basename(file_path)
+        try:
+            content, version = await asyncio.to_thread(read_note, file_path)
+        except (OSError, UnicodeDecodeError) as e:
+            safe_print(f"读取文件失败: {file_name} {str(e)} ❌", level="error")
+            return
+        self.stats["notes"] += 1
+
+        matches = find_local_images(content, file_path, self.image_path_prefix)
+        self.stats["images"] += len(matches)
+        urls = await asyncio.gather(
+            *(self._process_image(file_path, match) for match in matches)
+        )
+
+        edits = [(match.group(0), f"![]({url})") for match, url in zip(matches, urls) if url]
+
+        def rewrite(text):
+            return apply_wordpress_links(
+                apply_edits(text, edits),
+                convert_to_wp=self.convert_to_wp,
+                remove_wp=self.remove_wp,
+            )
+
+        new_content = rewrite(content)
+        if new_content == content:
+            safe_print(f"文件未发生更改: {file_name} ℹ️", level="info")
+            return
+        # 写入临时文件，全部笔记处理完后批量提交
+        await asyncio.to_thread(
+            self._note_writer.write, file_path, new_content, version, rewrite
+        )
+
+
+async def process_vault_async(
+    path,
+    image_host=None,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    convert_to_wp: bool = False,
+    remove_wp: bool = False,
+    image_path_prefix: str = "",
+    offline_queue=None,
+) -> Dict[str, Any]:
+    """
+    异步处理路径（单个文件或目录）
+
+    Args:
+        path: 文件或目录路径
+        image_host: 图床适配器实例
+        max_concurrency: 最大并发上传数
+        convert_to_wp: 是否转换为WordPress格式
+        remove_wp: 是否移除WordPress前缀
+        image_path_prefix: 图片路径前缀
+        offline_queue: 离线上传队列
+
+    Returns:
+        统计信息
+    """
+    safe_print(f"处理路径: {path}", level="info")
+    md_files = await asyncio.to_thread(collect_markdown_files, path)
+    engine = AsyncUploadEngine(
+        image_host=image_host,
+        max_concurrency=max_concurrency,
+        convert_to_wp=convert_to_wp,
+        remove_wp=remove_wp,
+        image_path_prefix=image_path_prefix,
+        offline_queue=offline_queue,
+    )
+    stats = await engine.run(md_files)
+    safe_print(
+        f"共处理 {stats['notes']} 个文件，更新 {stats['changed_notes']} 个，"
+        f"上传 {stats['uploaded']} 张图片，复用 {stats['reused']} 张，"
+        f"失败 {stats['failed']} 张",
+        level="info",
+    )
+    if stats["failed_notes"]:
+        safe_print(f"{stats['failed_notes']} 个文件处理出错 ⚠️", level="warning")
+    return stats
+
+
+def process_vault_sync(path, **kwargs) -> Dict[str, Any]:
+    """
+    process_vault_async 的同步包装，供图形界面和命令行在普通线程中调用
+
+    Args:
+        path: 文件或目录路径
+        kwargs: 同 process_vault_async
+
+    Returns:
+        统计信息
+    """
+    return asyncio.run(process_vault_async(path, **kwargs))
@@ -0,0 +1,138 @@
+"""
+图形界面的合并处理任务
+多次拖入的文件和目录合并为一个任务，在后台线程中送入同一个流水线，
+共用图床实例、上传调度器和各类缓存；处理期间新拖入的路径直接加入正在运行的队列，
+不需要等待上一批处理完成
+"""
+import os
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+from typing import Any, Callable, ContextManager, Dict, Iterable, Iterator, Optional, Set
+
+from metrics import metrics
+from uploader import safe_print, collect_markdown_files
+
+# 没有新路径时检查流水线是否已处理完的间隔（秒）
+DEFAULT_POLL_INTERVAL = 0.2
+
+
+class BatchJob:
+    """把拖入的路径合并到一个正在运行的流水线中处理（线程安全）"""
+
+    def __init__(
+        self,
+        create_host: Callable[[], Any],
+        create_pipeline: Callable[[Any], Any],
+        on_finish: Optional[Callable[[Dict[str, Any]], None]] = None,
+        run_context: Optional[Callable[[], ContextManager]] = None,
+        enabled: Optional[Callable[[], bool]] = None,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+    ):
+        """
+        初始化任务
+
+        Args:
+            create_host: 创建图床实例的函数，每次运行调用一次，运行期间的所有路径共用
+            create_pipeline: 创建流水线（VaultPipeline）的函数，参数为图床实例
+            on_finish: 运行结束后的回调，参数为统计信息（在后台线程中调用）
+            run_context: 包裹整次运行的上下文（如性能追踪和汇总）
+            enabled: 当前配置是否使用合并任务，返回False时调用方应回退到逐个处理
+            poll_interval: 没有新路径时检查流水线是否已处理完的间隔（秒）
+        """
+        self.create_host = create_host
+        self.create_pipeline = create_pipeline
+        self.on_finish = on_finish
+        self.run_context = run_context
+        self._enabled = enabled
+        self.poll_interval = poll_interval
+        self._pending: "deque[str]" = deque()
+        self._seen: Set[str] = set()
+        self._running = False
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+
+    def enabled(self) -> bool:
+        """当前配置是否使用合并任务"""
+        return self._enabled is None or self._enabled()
+
+    @property
+    def running(self) -> bool:
+        with self._lock:
+            return self._running
+
+    def add(self, paths: Iterable[str]) -> bool:
+        """
+        加入拖入的路径；没有正在运行的任务时启动新任务
+
+        Args:
+            paths: Markdown文件或目录路径
+
+        Returns:
+            是否加入了正在运行的任务（False表示启动了新任务）
+        """
+        with self._lock:
+            self._pending.extend(str(path) for path in paths)
+            joined = self._running
+            if not joined:
+                self._running = True
+                self._seen = set()
+                threading.Thread(target=self._run, name="batch-job", daemon=True).start()
+        self._wakeup.set()
+        return joined
+
+    def _feed(self, pipeline) -> Iterator[str]:
+        """
+        持续产生待处理的笔记：队列为空时等待新路径，
+        直到流水线处理完所有笔记且没有新路径时结束
+        """
+        while True:
+            with self._lock:
+                path = self._pending.popleft() if self._pending else None
+                if path is None and pipeline.idle():
+                    return
+                self._wakeup.clear()
+            if path is None:
+                self._wakeup.wait(self.poll_interval)
+                continue
+            if os.path.isdir(path):
+                files = collect_markdown_files(path)
+            elif os.path.isfile(path) and path.lower().endswith(".md"):
+                files = [path]
+            else:
+                continue
+            for file_path in files:
+                key = os.path.normcase(os.path.abspath(file_path))
+                with self._lock:
+                    if key in self._seen:
+                        continue
+                    self._seen.add(key)
+                yield str(file_path)
+
+    def _run(self):
+        totals: Dict[str, Any] = {}
+        start = time.perf_counter()
+        try:
+            context = self.run_context() if self.run_context else nullcontext()
+            with context:
+                image_host = self.create_host()
+                while True:
+                    pipeline = self.create_pipeline(image_host)
+                    for key, value in pipeline.run(self._feed(pipeline)).items():
+                        totals[key] = totals.get(key, 0) + value
+                    # 流水线关闭期间拖入的路径由新的流水线继续处理
+                    with self._lock:
+                        if not self._pending:
+                            self._running = False
+                            break
+                uploads, _ = metrics.run_records()
+                totals["uploaded_bytes"] = sum(upload[2] for upload in uploads if upload[4])
+        except Exception as e:
+            safe_print(f"处理出错: {str(e)} ❌", level="error")
+        finally:
+            with self._lock:
+                self._running = False
+        totals["seconds"] = time.perf_counter() - start
+        if self.on_finish:
+            self.on_finish(totals)
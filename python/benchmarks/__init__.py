@@ -0,0 +1,4 @@
+"""
+性能基准测试
+使用本地模拟的图床服务和合成笔记仓库测量 process_vault 的吞吐量
+"""
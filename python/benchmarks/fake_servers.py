@@ -0,0 +1,162 @@
+"""
+本地模拟图床服务
+在进程内模拟 PicGo /upload、GitHub contents、SM.MS 和 Imgur 接口，
+可配置响应延迟和错误率
+"""
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+
+class _FakeHTTPServer(ThreadingHTTPServer):
+    # 加大监听队列，异步引擎会同时发起数百个连接
+    request_queue_size = 1024
+
+
+class FakeHostServer:
+    """模拟图床服务器，在后台线程中运行"""
+
+    def __init__(
+        self,
+        latency: float = 0.05,
+        jitter: float = 0.02,
+        error_rate: float = 0.0,
+        seed: Optional[int] = None,
+    ):
+        """
+        初始化模拟服务器
+
+        Args:
+            latency: 每个请求的基础延迟（秒）
+            jitter: 延迟的随机抖动范围（秒）
+            error_rate: 返回服务器错误的概率（0~1）
+            seed: 随机数种子，便于复现
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.requests = 0
+        self.bytes_received = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeHostServer":
+        """在随机端口启动服务器"""
+        server = self
+
+        class Handler(_FakeHostHandler):
+            fake = server
+
+        self._server = _FakeHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """停止服务器"""
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def _simulate(self, body_size: int) -> bool:
+        """模拟延迟，返回本次请求是否应该失败"""
+        with self._lock:
+            self.requests += 1
+            self.bytes_received += body_size
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            failed = self._random.random() < self.error_rate
+        time.sleep(delay)
+        return failed
+
+
+class _FakeHostHandler(BaseHTTPRequestHandler):
+    fake: FakeHostServer = None
+
+    GITHUB_PATH = re.compile(r"^/repos/([^/]+/[^/]+)/contents/(.+)$")
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length", 0))
+        return self.rfile.read(length) if length else b""
+
+    def _send_json(self, status: int, data: dict):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _image_url(self, name: str) -> str:
+        return f"{self.fake.base_url}/files/{uuid.uuid4().hex[:8]}-{name}"
+
+    def do_POST(self):
+        body = self._read_body()
+        failed = self.fake._simulate(len(body))
+
+        if self.path == "/upload":
+            # PicGo
+            if failed:
+                self._send_json(200, {"success": False, "msg": "fake error"})
+                return
+            image_path = json.loads(body or b"{}").get("list", ["image.png"])[0]
+            name = re.split(r"[\\/]", image_path)[-1]
+            self._send_json(200, {"success": True, "result": [self._image_url(name)]})
+        elif self.path == "/api/v2/upload":
+            # SM.MS
+            if failed:
+                self._send_json(500, {"success": False, "message": "fake error"})
+                return
+            self._send_json(
+                200, {"success": True, "data": {"url": self._image_url("smms.png")}}
+            )
+        elif self.path == "/3/image":
+            # Imgur
+            if failed:
+                self._send_json(500, {"success": False})
+                return
+            self._send_json(
+                200, {"success": True, "data": {"link": self._image_url("imgur.png")}}
+            )
+        else:
+            self._send_json(404, {"message": "Not Found"})
+
+    def do_PUT(self):
+        body = self._read_body()
+        failed = self.fake._simulate(len(body))
+
+        match = self.GITHUB_PATH.match(self.path)
+        if not match:
+            self._send_json(404, {"message": "Not Found"})
+            return
+        if failed:
+            self._send_json(500, {"message": "fake error"})
+            return
+        name = match.group(2).split("/")[-1]
+        self._send_json(201, {"content": {"download_url": self._image_url(name)}})
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.end_headers()
@@ -0,0 +1,319 @@
+"""
+性能基准测试入口
+
+用法（在 python 目录下运行）:
+    python -m benchmarks.run_benchmark --notes 200 --images 5 --hosts gitee smms
+    python -m benchmarks.run_benchmark --baseline benchmarks/results/old.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from benchmarks.fake_servers import FakeHostServer
+from benchmarks.vault_factory import build_vault
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+BENCHMARK_HOSTS = ("gitee", "github", "smms", "imgur")
+
+
+def create_host(host_type: str, base_url: str):
+    """
+    创建指向模拟服务器的图床实例
+
+    Args:
+        host_type: 图床类型
+        base_url: 模拟服务器地址
+
+    Returns:
+        图床适配器实例
+    """
+    from image_hosts import ImageHostFactory
+
+    if host_type == "gitee":
+        return ImageHostFactory.create("gitee", {"server": base_url})
+    if host_type == "github":
+        host = ImageHostFactory.create("github", {"token": "fake", "repo": "bench/images"})
+        host.API_BASE = base_url
+        return host
+    if host_type == "smms":
+        host = ImageHostFactory.create("smms", {"token": "fake"})
+        host.API_URL = f"{base_url}/api/v2/upload"
+        return host
+    if host_type == "imgur":
+        host = ImageHostFactory.create("imgur", {"client_id": "fake"})
+        host.API_URL = f"{base_url}/3/image"
+        return host
+    raise ValueError(f"Unsupported benchmark host: {host_type}")
+
+
+class TimedHost:
+    """记录每次上传耗时的图床包装器"""
+
+    def __init__(self, host):
+        self.host = host
+        self.latencies: List[float] = []
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    def get_name(self) -> str:
+        return self.host.get_name()
+
+    def _record(self, start: float, failed: bool):
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.latencies.append(elapsed)
+            if failed:
+                self.failures += 1
+
+    def upload(self, image_path: str) -> str:
+        start = time.perf_counter()
+        failed = True
+        try:
+            url = self.host.upload(image_path)
+            failed = False
+            return url
+        finally:
+            self._record(start, failed)
+
+    async def upload_async(self, image_path: str, session=None) -> str:
+        start = time.perf_counter()
+        failed = True
+        try:
+            url = await self.host.upload_async(image_path, session)
+            failed = False
+            return url
+        finally:
+            self._record(start, failed)
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """
+    计算百分位数（线性插值）
+
+    Args:
+        values: 数值列表
+        pct: 百分位（0~100）
+
+    Returns:
+        百分位数，列表为空时返回None
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * pct / 100
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def peak_rss_mb() -> Optional[float]:
+    """获取进程峰值内存占用（MB），无法获取时返回None"""
+    try:
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS 以字节为单位，Linux 以KB为单位
+        divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+        return round(peak / divisor, 1)
+    except ImportError:
+        pass
+    try:
+        import psutil
+
+        info = psutil.Process().memory_info()
+        return round(getattr(info, "peak_wset", info.rss) / 1024 / 1024, 1)
+    except ImportError:
+        return None
+
+
+def get_version() -> str:
+    """获取当前代码版本（git提交），失败时返回unknown"""
+    try:
+        result = subprocess.run(
+            ["git", "describe", "--always", "--dirty"],
+            capture_output=True,
+            text=True,
+            cwd=os.path.dirname(__file__),
+        )
+        return result.stdout.strip() or "unknown"
+    except OSError:
+        return "unknown"
+
+
+def run_once(host_type: str, args) -> Dict[str, Any]:
+    """
+    针对一种图床运行一次基准测试
+
+    Args:
+        host_type: 图床类型
+        args: 命令行参数
+
+    Returns:
+        测试结果
+    """
+    from async_uploader import process_vault_sync
+    from uploader import process_vault
+
+    with tempfile.TemporaryDirectory(prefix="md2picgo-bench-") as vault_dir:
+        vault = build_vault(
+            vault_dir,
+            notes=args.notes,
+            images_per_note=args.images,
+            size_profile=args.size_profile,
+            shared_ratio=args.shared_ratio,
+            seed=args.seed,
+        )
+
+        with FakeHostServer(
+            latency=args.latency,
+            jitter=args.jitter,
+            error_rate=args.error_rate,
+            seed=args.seed,
+        ) as server:
+            host = TimedHost(create_host(host_type, server.base_url))
+
+            # 屏蔽处理过程中的日志输出
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                if args.engine == "async":
+                    process_vault_sync(
+                        vault_dir, image_host=host, max_concurrency=args.concurrency
+                    )
+                else:
+                    process_vault(vault_dir, image_host=host, max_workers=args.workers)
+            wall = time.perf_counter() - start
+
+            requests_sent = server.requests
+            bytes_sent = server.bytes_received
+
+    uploaded = len(host.latencies) - host.failures
+    return {
+        "host": host_type,
+        "vault": vault,
+        "wall_s": round(wall, 3),
+        "uploads": len(host.latencies),
+        "uploaded": uploaded,
+        "failed": host.failures,
+        "requests": requests_sent,
+        "bytes_sent": bytes_sent,
+        "images_per_s": round(uploaded / wall, 2) if wall else None,
+        "latency_ms": {
+            name: round(value * 1000, 2) if value is not None else None
+            for name, value in (
+                ("p50", percentile(host.latencies, 50)),
+                ("p95", percentile(host.latencies, 95)),
+                ("p99", percentile(host.latencies, 99)),
+            )
+        },
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def run_isolated(host_type: str, args) -> Dict[str, Any]:
+    """
+    在独立的子进程中运行 run_once，使每种图床的峰值内存互不影响
+    （ru_maxrss 是整个进程生命周期的峰值）
+
+    Args:
+        host_type: 图床类型
+        args: 命令行参数
+
+    Returns:
+        测试结果
+    """
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        return pool.submit(run_once, host_type, args).result()
+
+
+def compare(current: Dict[str, Any], baseline_path: str):
+    """打印与基线结果的对比"""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    previous = {result["host"]: result for result in baseline.get("results", [])}
+
+    print(f"\n与基线 {baseline.get('version')} 对比:")
+    for result in current["results"]:
+        old = previous.get(result["host"])
+        if not old or not old.get("images_per_s"):
+            print(f"  {result['host']}: 基线中没有对应结果")
+            continue
+        ratio = result["images_per_s"] / old["images_per_s"]
+        print(
+            f"  {result['host']}: {old['images_per_s']} → {result['images_per_s']} 张/秒 "
+            f"({ratio:.2f}x), p95 {old['latency_ms']['p95']} → "
+            f"{result['latency_ms']['p95']} ms"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="md2picgo 性能基准测试")
+    parser.add_argument("--notes", type=int, default=100, help="笔记数量")
+    parser.add_argument("--images", type=int, default=5, help="每篇笔记的图片数量")
+    parser.add_argument(
+        "--size-profile", default="mixed", choices=["small", "mixed", "large"]
+    )
+    parser.add_argument("--shared-ratio", type=float, default=0.1, help="重复引用比例")
+    parser.add_argument("--hosts", nargs="+", default=["gitee"], choices=BENCHMARK_HOSTS)
+    parser.add_argument("--workers", type=int, default=3, help="上传线程数")
+    parser.add_argument(
+        "--engine", choices=["pipeline", "async"], default="pipeline", help="上传引擎"
+    )
+    parser.add_argument("--concurrency", type=int, default=200, help="异步引擎的最大并发数")
+    parser.add_argument("--latency", type=float, default=0.05, help="模拟延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.02, help="延迟抖动（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="模拟错误率")
+    parser.add_argument("--seed", type=int, default=42, help="随机数种子")
+    parser.add_argument("--output", help="结果JSON文件路径，默认保存到 benchmarks/results")
+    parser.add_argument("--baseline", help="用于对比的历史结果JSON文件")
+    args = parser.parse_args(argv)
+
+    report = {
+        "version": get_version(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "params": {
+            key: value
+            for key, value in vars(args).items()
+            if key not in ("output", "baseline")
+        },
+        "results": [],
+    }
+
+    for host_type in args.hosts:
+        print(f"运行基准测试: {host_type} ...")
+        result = run_isolated(host_type, args)
+        report["results"].append(result)
+        print(
+            f"  {result['images_per_s']} 张/秒，p50/p95/p99 = "
+            f"{result['latency_ms']['p50']}/{result['latency_ms']['p95']}/"
+            f"{result['latency_ms']['p99']} ms，峰值内存 {result['peak_rss_mb']} MB"
+        )
+
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(
+            RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{report['version']}.json"
+        )
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"结果已保存: {output}")
+
+    if args.baseline:
+        compare(report, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
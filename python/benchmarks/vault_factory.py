@@ -0,0 +1,91 @@
+"""
+合成笔记仓库生成
+生成 N 篇笔记 × M 张图片的测试仓库，图片大小按比例混合
+"""
+import os
+import random
+from typing import Dict, List, Tuple
+
+# PNG 文件头，让生成的文件看起来像真实图片
+PNG_HEADER = b"\x89PNG\r\n\x1a\n"
+
+# 大小分布：(权重, 最小字节数, 最大字节数)
+SIZE_PROFILES: Dict[str, List[Tuple[float, int, int]]] = {
+    "small": [(1.0, 5 * 1024, 50 * 1024)],
+    "mixed": [
+        (0.80, 10 * 1024, 200 * 1024),
+        (0.18, 500 * 1024, 2 * 1024 * 1024),
+        (0.02, 5 * 1024 * 1024, 20 * 1024 * 1024),
+    ],
+    "large": [(1.0, 2 * 1024 * 1024, 10 * 1024 * 1024)],
+}
+
+
+def _pick_size(rng: random.Random, profile: List[Tuple[float, int, int]]) -> int:
+    roll = rng.random()
+    for weight, low, high in profile:
+        if roll < weight:
+            return rng.randint(low, high)
+        roll -= weight
+    _, low, high = profile[-1]
+    return rng.randint(low, high)
+
+
+def build_vault(
+    root: str,
+    notes: int = 100,
+    images_per_note: int = 5,
+    size_profile: str = "mixed",
+    shared_ratio: float = 0.1,
+    seed: int = 42,
+) -> Dict[str, int]:
+    """
+    生成合成笔记仓库
+
+    Args:
+        root: 仓库根目录
+        notes: 笔记数量
+        images_per_note: 每篇笔记引用的图片数量
+        size_profile: 图片大小分布（small、mixed、large）
+        shared_ratio: 引用其他笔记已用图片的比例，用于模拟重复引用
+        seed: 随机数种子，相同参数生成相同的仓库
+
+    Returns:
+        统计信息 {"notes", "images", "references", "bytes"}
+    """
+    rng = random.Random(seed)
+    profile = SIZE_PROFILES[size_profile]
+    attachment_dir = os.path.join(root, "Z-附件")
+    os.makedirs(attachment_dir, exist_ok=True)
+
+    images: List[str] = []
+    total_bytes = 0
+    references = 0
+
+    for note_index in range(notes):
+        lines = [f"# 笔记 {note_index}", ""]
+        for image_index in range(images_per_note):
+            if images and rng.random() < shared_ratio:
+                name = rng.choice(images)
+            else:
+                name = f"img-{note_index:05d}-{image_index:02d}.png"
+                size = _pick_size(rng, profile)
+                with open(os.path.join(attachment_dir, name), "wb") as f:
+                    f.write(PNG_HEADER)
+                    f.write(rng.randbytes(max(0, size - len(PNG_HEADER))))
+                images.append(name)
+                total_bytes += size
+            lines.append(f"段落 {image_index}，正文内容。")
+            lines.append(f"![[{name}]]")
+            lines.append("")
+            references += 1
+
+        with open(os.path.join(root, f"note-{note_index:05d}.md"), "w", encoding="utf-8") as f:
+            f.write("\n".join(lines))
+
+    return {
+        "notes": notes,
+        "images": len(images),
+        "references": references,
+        "bytes": total_bytes,
+    }
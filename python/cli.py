@@ -0,0 +1,508 @@
+"""
+命令行入口
+提供不依赖图形界面的批处理模式
+"""
+import argparse
+import json
+import sys
+import time
+
+from config_manager import ConfigManager
+
+
+def cmd_process(args, config_manager):
+    """上传笔记中的本地图片并改写链接"""
+    from runtime import (
+        create_image_host,
+        create_near_duplicates,
+        create_offline_queue,
+        create_reference_index,
+    )
+    from metrics import report_run, start_metrics_server
+    from tracing import trace_to
+    from uploader import process_vault, safe_print
+
+    metrics_port = args.metrics_port or config_manager.get_metrics_port()
+    if metrics_port:
+        start_metrics_server(metrics_port)
+        safe_print(f"指标接口: http://127.0.0.1:{metrics_port}/metrics", level="info")
+
+    offline_queue = None if args.no_offline_queue else create_offline_queue(config_manager)
+    wp_config = config_manager.get_wordpress_config()
+    async_config = config_manager.get_async_engine_config()
+    multiprocess_config = config_manager.get_multiprocess_config()
+    output_dir = args.output_dir or config_manager.get_output_dir()
+    if output_dir and (args.processes is not None or args.use_async):
+        safe_print("输出目录模式只支持流水线引擎，忽略 --processes/--async", level="warning")
+    with trace_to(args.trace or config_manager.get_trace_file()), report_run(safe_print):
+        if output_dir:
+            process_vault(
+                args.path,
+                image_host=create_image_host(config_manager),
+                max_workers=args.workers or config_manager.get_max_workers(),
+                convert_to_wp=wp_config.get("enabled", False),
+                remove_wp=wp_config.get("remove_prefix", False),
+                image_path_prefix=config_manager.get_image_path_prefix(),
+                pipeline_config=config_manager.get_pipeline_config(),
+                output_dir=output_dir,
+                near_duplicates=create_near_duplicates(config_manager),
+            )
+        elif args.processes is not None or multiprocess_config.get("enabled"):
+            from multiprocess_vault import process_vault_multiprocess
+
+            process_vault_multiprocess(
+                args.path,
+                config_manager,
+                processes=(
+                    multiprocess_config["processes"]
+                    if args.processes is None
+                    else args.processes
+                ),
+                chunk_size=multiprocess_config["chunk_size"],
+                max_workers=args.workers or config_manager.get_max_workers(),
+                convert_to_wp=wp_config.get("enabled", False),
+                remove_wp=wp_config.get("remove_prefix", False),
+                image_path_prefix=config_manager.get_image_path_prefix(),
+                cache_path=config_manager.get_upload_cache_path(),
+                offline_queue=offline_queue,
+            )
+        elif args.use_async or async_config.get("enabled"):
+            from async_uploader import process_vault_sync
+
+            process_vault_sync(
+                args.path,
+                image_host=create_image_host(config_manager),
+                max_concurrency=args.concurrency or async_config["max_concurrency"],
+                convert_to_wp=wp_config.get("enabled", False),
+                remove_wp=wp_config.get("remove_prefix", False),
+                image_path_prefix=config_manager.get_image_path_prefix(),
+                offline_queue=offline_queue,
+            )
+        else:
+            process_vault(
+                args.path,
+                image_host=create_image_host(config_manager),
+                max_workers=args.workers or config_manager.get_max_workers(),
+                convert_to_wp=wp_config.get("enabled", False),
+                remove_wp=wp_config.get("remove_prefix", False),
+                image_path_prefix=config_manager.get_image_path_prefix(),
+                pipeline_config=config_manager.get_pipeline_config(),
+                offline_queue=offline_queue,
+                reference_index=create_reference_index(config_manager),
+                near_duplicates=create_near_duplicates(config_manager),
+            )
+    if offline_queue is not None and len(offline_queue):
+        safe_print(
+            f"{len(offline_queue)} 张图片在离线队列中，可稍后运行 flush 命令补传",
+            level="warning",
+        )
+    return 0
+
+
+def cmd_flush(args, config_manager):
+    """补传离线队列中的图片"""
+    from runtime import create_image_host, create_offline_queue
+    from uploader import safe_print
+
+    offline_queue = create_offline_queue(config_manager)
+    if offline_queue is None:
+        safe_print("离线队列未启用", level="warning")
+        return 1
+
+    interval = config_manager.get_offline_queue_config()["flush_interval"]
+    while True:
+        uploaded = offline_queue.flush(create_image_host(config_manager))
+        remaining = len(offline_queue)
+        safe_print(f"补传 {uploaded} 张图片，剩余 {remaining} 张", level="info")
+        if not args.watch or not remaining:
+            parked = offline_queue.parked()
+            if parked:
+                safe_print(
+                    f"{len(parked)} 张图片补传失败次数过多，已停止自动重试，"
+                    f"请检查后重新处理引用它们的笔记",
+                    level="warning",
+                )
+            return 1 if remaining or parked else 0
+        time.sleep(interval)
+
+
+def cmd_filter(args, config_manager):
+    """过滤模式：从标准输入或清单读取Markdown，输出改写结果，不修改源文件"""
+    from filter_mode import MarkdownFilter, filter_manifest, filter_stdin
+    from runtime import create_image_host, create_upload_cache
+    from metrics import report_run
+    from uploader import safe_print, set_log_stream
+
+    # 标准输出用于输出内容，日志改为输出到标准错误
+    set_log_stream(sys.stderr)
+    if args.manifest and not args.output_dir:
+        safe_print("使用 --manifest 时必须指定 --output-dir", level="error")
+        return 2
+
+    wp_config = config_manager.get_wordpress_config()
+    markdown_filter = MarkdownFilter(
+        image_host=create_image_host(config_manager),
+        cache=None if args.no_cache else create_upload_cache(config_manager),
+        max_workers=args.workers or config_manager.get_max_workers(),
+        convert_to_wp=wp_config.get("enabled", False),
+        remove_wp=wp_config.get("remove_prefix", False),
+        image_path_prefix=config_manager.get_image_path_prefix(),
+    )
+    with report_run(safe_print):
+        if args.manifest:
+            written = filter_manifest(
+                markdown_filter, args.manifest, args.output_dir, root=args.root
+            )
+            safe_print(f"已写出 {written} 个文件到 {args.output_dir}", level="success")
+        else:
+            filter_stdin(markdown_filter, base_dir=args.base)
+    return 1 if markdown_filter.stats["failed"] else 0
+
+
+def cmd_incremental(args, config_manager):
+    """只处理 git 仓库中有变化的笔记"""
+    from git_incremental import GitError, process_git_changes
+    from runtime import create_image_host, create_offline_queue
+    from uploader import safe_print
+
+    offline_queue = create_offline_queue(config_manager)
+    wp_config = config_manager.get_wordpress_config()
+    try:
+        process_git_changes(
+            args.path,
+            image_host=create_image_host(config_manager),
+            max_workers=args.workers or config_manager.get_max_workers(),
+            convert_to_wp=wp_config.get("enabled", False),
+            remove_wp=wp_config.get("remove_prefix", False),
+            image_path_prefix=config_manager.get_image_path_prefix(),
+            offline_queue=offline_queue,
+            staged=args.staged,
+            since=args.since,
+        )
+    except GitError as e:
+        safe_print(f"git 操作失败: {str(e)} ❌", level="error")
+        return 1
+    finally:
+        if offline_queue is not None:
+            offline_queue.save()
+    return 0
+
+
+def cmd_queue(args, config_manager):
+    """初始化分布式任务队列或查看进度"""
+    from job_queue import JobQueue
+    from uploader import safe_print
+
+    queue_config = config_manager.get_job_queue_config()
+    job_queue = JobQueue(args.db or queue_config["path"], queue_config["lease_timeout"])
+
+    if args.action == "init":
+        if not args.path:
+            safe_print("init 需要指定笔记目录", level="error")
+            return 2
+        counts = job_queue.enqueue_vault(args.path, config_manager.get_image_path_prefix())
+        safe_print(
+            f"已写入 {counts['images']} 个上传任务、{counts['notes']} 个改写任务",
+            level="success",
+        )
+        return 0
+
+    for kind, label in (("upload", "上传"), ("rewrite", "改写")):
+        status = job_queue.counts()[kind]
+        summary = "，".join(f"{name} {count}" for name, count in sorted(status.items()))
+        safe_print(f"{label}任务: {summary or '无'}", level="info")
+    for failure in job_queue.failures():
+        target = failure["payload"].get("path", failure["key"])
+        safe_print(f"失败: {failure['kind']} {target} {failure['error']}", level="error")
+    return 0
+
+
+def cmd_index(args, config_manager):
+    """维护图片引用反向索引：建立、按图片更新笔记、生成报告"""
+    from reference_index import ReferenceIndex, index_vault, update_image
+    from uploader import safe_print
+
+    index_config = config_manager.get_reference_index_config()
+    reference_index = ReferenceIndex(args.db or index_config["path"])
+
+    if args.action == "build":
+        if not args.paths:
+            safe_print("build 需要指定笔记目录", level="error")
+            return 2
+        for path in args.paths:
+            count = index_vault(path, reference_index, config_manager.get_image_path_prefix())
+            safe_print(f"{path}: 记录 {count} 处本地图片引用", level="success")
+    elif args.action == "update":
+        from runtime import create_image_host
+
+        if not args.paths:
+            safe_print("update 需要指定图片路径", level="error")
+            return 2
+        image_host = create_image_host(config_manager)
+        convert_to_wp = config_manager.get_wordpress_config().get("enabled", False)
+        for path in args.paths:
+            result = update_image(
+                path, reference_index, image_host, convert_to_wp=convert_to_wp, force=args.force
+            )
+            safe_print(
+                f"{path}: 引用的笔记 {result['notes']} 篇，改写 {result['patched']} 篇",
+                level="info",
+            )
+    elif args.action == "unused":
+        if not args.paths:
+            safe_print("unused 需要指定笔记目录", level="error")
+            return 2
+        for path in args.paths:
+            unused = reference_index.unused_attachments(path)
+            for image_path in unused:
+                print(image_path)
+            safe_print(f"{path}: {len(unused)} 个未被引用的图片", level="info")
+    elif args.action == "top":
+        for image_path, notes, count in reference_index.most_referenced(args.limit):
+            print(f"{count:6d} 次  {notes:5d} 篇  {image_path}")
+    elif args.action == "prune":
+        removed = reference_index.prune()
+        safe_print(f"删除 {removed} 条已失效的引用", level="info")
+    return 0
+
+
+def cmd_worker(args, config_manager):
+    """从分布式任务队列领取任务并执行"""
+    from job_queue import JobQueue, QueueWorker
+    from runtime import create_image_host
+    from metrics import report_run
+    from uploader import safe_print
+
+    queue_config = config_manager.get_job_queue_config()
+    job_queue = JobQueue(args.db or queue_config["path"], queue_config["lease_timeout"])
+    wp_config = config_manager.get_wordpress_config()
+    worker = QueueWorker(
+        job_queue,
+        args.path,
+        image_host=create_image_host(config_manager),
+        threads=args.workers or config_manager.get_max_workers(),
+        convert_to_wp=wp_config.get("enabled", False),
+        remove_wp=wp_config.get("remove_prefix", False),
+        max_attempts=queue_config["max_attempts"],
+    )
+    with report_run(safe_print):
+        try:
+            stats = worker.run(watch=args.watch)
+        except KeyboardInterrupt:
+            worker.stop()
+            safe_print("已停止，未完成的任务会在租约过期后由其他 worker 接手", level="warning")
+            return 130
+    safe_print(
+        f"本 worker 上传 {stats['uploaded']} 张图片，改写 {stats['rewritten']} 篇笔记，"
+        f"失败 {stats['failed']} 次",
+        level="info",
+    )
+    return 0
+
+
+def cmd_check_links(args, config_manager):
+    """检查远程图片链接是否可用"""
+    from link_checker import LinkChecker, LinkCheckCache
+    from uploader import safe_print
+
+    link_config = config_manager.get_link_check_config()
+    cache = LinkCheckCache(
+        args.cache or link_config["cache_path"],
+        ttl=args.ttl if args.ttl is not None else link_config["cache_ttl"],
+    )
+    checker = LinkChecker(
+        max_workers=args.workers or link_config["max_workers"],
+        per_domain_limit=args.per_domain or link_config["per_domain_limit"],
+        timeout=link_config["timeout"],
+        cache=cache,
+    )
+
+    safe_print(f"检查远程图片链接: {args.path}", level="info")
+    report = checker.check_vault(args.path)
+
+    total = 0
+    broken = 0
+    for note, links in sorted(report.items()):
+        dead = [link for link in links if not link["ok"]]
+        total += len(links)
+        broken += len(dead)
+        if dead:
+            safe_print(f"{note}: {len(dead)}/{len(links)} 个链接失效 ❌", level="error")
+            for link in dead:
+                reason = link["status"] or link["error"]
+                safe_print(f"    {link['url']} ({reason})", level="error")
+        elif args.verbose:
+            safe_print(f"{note}: {len(links)} 个链接正常 ✅", level="success")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+    level = "error" if broken else "success"
+    safe_print(f"共检查 {total} 个链接，失效 {broken} 个", level=level)
+    return 1 if broken else 0
+
+
+def cmd_wordpress(args, config_manager):
+    """批量转换或还原WordPress链接，不上传图片"""
+    from wordpress_processor import WordPressLinkProcessor
+    from uploader import safe_print
+
+    convert_to_wp = args.action == "convert"
+    remove_wp = args.action == "remove"
+
+    safe_print(f"批量处理WordPress链接: {args.path}", level="info")
+    stats = WordPressLinkProcessor.process_vault(
+        args.path,
+        convert_to_wp=convert_to_wp,
+        remove_wp=remove_wp,
+        max_workers=args.workers,
+    )
+
+    for file_path, error in stats["errors"]:
+        safe_print(f"处理文件 {file_path} 时出错: {error} ❌", level="error")
+
+    action = "转换" if convert_to_wp else "还原"
+    safe_print(
+        f"共扫描 {stats['files']} 个文件，更新 {stats['changed_files']} 个，"
+        f"{action} {stats['links']} 个链接 ✅",
+        level="success",
+    )
+    return 1 if stats["errors"] else 0
+
+
+def build_parser():
+    """构建命令行参数解析器"""
+    parser = argparse.ArgumentParser(prog="md2picgo", description="Markdown图片上传工具")
+    parser.add_argument("--config", default="config.json", help="配置文件路径")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    process_parser = subparsers.add_parser("process", help="上传本地图片并改写链接")
+    process_parser.add_argument("path", help="Markdown文件或目录路径")
+    process_parser.add_argument("--workers", type=int, help="上传线程数")
+    process_parser.add_argument(
+        "--async", dest="use_async", action="store_true", help="使用 asyncio 异步上传引擎"
+    )
+    process_parser.add_argument("--concurrency", type=int, help="异步引擎的最大并发上传数")
+    process_parser.add_argument(
+        "--processes",
+        type=int,
+        help="多进程模式的进程数（0为CPU核心数），笔记分片并行扫描和改写",
+    )
+    process_parser.add_argument(
+        "--output-dir", help="输出目录：改写结果写入该目录，未改写的文件以硬链接放入，不修改源文件"
+    )
+    process_parser.add_argument("--trace", help="导出 Chrome trace 格式的性能追踪文件")
+    process_parser.add_argument("--metrics-port", type=int, help="Prometheus 指标接口端口")
+    process_parser.add_argument(
+        "--no-offline-queue", action="store_true", help="上传失败时不加入离线队列"
+    )
+    process_parser.set_defaults(func=cmd_process)
+
+    flush_parser = subparsers.add_parser("flush", help="补传离线队列中的图片")
+    flush_parser.add_argument(
+        "--watch", action="store_true", help="持续运行，直到队列清空"
+    )
+    flush_parser.set_defaults(func=cmd_flush)
+
+    filter_parser = subparsers.add_parser(
+        "filter", help="从标准输入或清单读取Markdown，输出改写结果（不修改源文件）"
+    )
+    filter_parser.add_argument(
+        "--manifest", help="清单文件，每行一个Markdown文件路径（- 表示从标准输入读取清单）"
+    )
+    filter_parser.add_argument("--output-dir", help="输出目录（使用 --manifest 时必需）")
+    filter_parser.add_argument(
+        "--root", default=".", help="源文件根目录，输出时保持相对它的目录结构"
+    )
+    filter_parser.add_argument(
+        "--base", default=".", help="标准输入模式下解析相对图片路径使用的笔记目录"
+    )
+    filter_parser.add_argument("--workers", type=int, help="上传线程数")
+    filter_parser.add_argument(
+        "--no-cache", action="store_true", help="不使用上传缓存，每次都重新上传"
+    )
+    filter_parser.set_defaults(func=cmd_filter)
+
+    incremental_parser = subparsers.add_parser(
+        "incremental", help="只处理 git 仓库中上次处理之后有变化的笔记"
+    )
+    incremental_parser.add_argument("path", nargs="?", default=".", help="git 仓库路径")
+    incremental_parser.add_argument(
+        "--staged", action="store_true", help="只处理暂存区中的笔记（用于 pre-commit 钩子）"
+    )
+    incremental_parser.add_argument("--since", help="起始提交，默认使用上次记录的提交")
+    incremental_parser.add_argument("--workers", type=int, help="上传线程数")
+    incremental_parser.set_defaults(func=cmd_incremental)
+
+    queue_parser = subparsers.add_parser("queue", help="分布式任务队列：初始化或查看进度")
+    queue_parser.add_argument("action", choices=["init", "status"], help="初始化或查看进度")
+    queue_parser.add_argument("path", nargs="?", help="笔记目录（init 时必需）")
+    queue_parser.add_argument("--db", help="任务数据库路径，可放在共享网络盘上")
+    queue_parser.set_defaults(func=cmd_queue)
+
+    index_parser = subparsers.add_parser(
+        "index", help="图片引用反向索引：建立、按图片更新笔记、未使用附件和引用排行报告"
+    )
+    index_parser.add_argument(
+        "action",
+        choices=["build", "update", "unused", "top", "prune"],
+        help="build 扫描笔记建立索引；update 重新上传图片并改写引用它的笔记；"
+        "unused 列出未被引用的图片；top 列出被引用最多的图片；prune 清理已删除笔记的引用",
+    )
+    index_parser.add_argument(
+        "paths", nargs="*", help="笔记目录（build/unused）或图片路径（update）"
+    )
+    index_parser.add_argument("--db", help="索引数据库路径")
+    index_parser.add_argument("--limit", type=int, default=20, help="top 显示的数量")
+    index_parser.add_argument(
+        "--force", action="store_true", help="update 时即使图片内容未变化也重新上传"
+    )
+    index_parser.set_defaults(func=cmd_index)
+
+    worker_parser = subparsers.add_parser("worker", help="从分布式任务队列领取任务并执行")
+    worker_parser.add_argument("path", help="本机上的笔记目录（用于解析任务中的相对路径）")
+    worker_parser.add_argument("--db", help="任务数据库路径")
+    worker_parser.add_argument("--workers", type=int, help="执行任务的线程数")
+    worker_parser.add_argument(
+        "--watch", action="store_true", help="队列清空后继续等待新任务"
+    )
+    worker_parser.set_defaults(func=cmd_worker)
+
+    check_parser = subparsers.add_parser("check-links", help="检查远程图片链接是否失效")
+    check_parser.add_argument("path", help="Markdown文件或目录路径")
+    check_parser.add_argument("--workers", type=int, help="最大并发检查数")
+    check_parser.add_argument("--per-domain", type=int, help="每个域名的最大并发连接数")
+    check_parser.add_argument("--ttl", type=int, help="结果缓存有效期（秒）")
+    check_parser.add_argument(
+        "--cache", help="结果缓存文件路径（默认使用配置中的 link_check.cache_path）"
+    )
+    check_parser.add_argument("--json", help="将完整报告保存为JSON文件")
+    check_parser.add_argument("-v", "--verbose", action="store_true", help="显示正常的笔记")
+    check_parser.set_defaults(func=cmd_check_links)
+
+    wp_parser = subparsers.add_parser("wp", help="批量转换或还原WordPress链接")
+    wp_parser.add_argument("action", choices=["convert", "remove"], help="转换或还原")
+    wp_parser.add_argument("path", help="Markdown文件或目录路径")
+    wp_parser.add_argument("--workers", type=int, help="最大进程数，默认为CPU核心数")
+    wp_parser.set_defaults(func=cmd_wordpress)
+
+    return parser
+
+
+def main(argv=None):
+    from runtime import configure_runtime
+
+    args = build_parser().parse_args(argv)
+    if args.func is cmd_filter:
+        from uploader import set_log_stream
+
+        # 过滤模式的标准输出用于输出内容，加载配置前就把日志改为输出到标准错误
+        set_log_stream(sys.stderr)
+    config_manager = ConfigManager(args.config)
+    configure_runtime(config_manager)
+    return args.func(args, config_manager)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,7 +4,32 @@
 """
 import json
 import os
-from typing import Dict, Any, Optional
+import sys
+from typing import Dict, Any, List, Optional
+
+
+def user_data_path(filename: str) -> str:
+    """
+    获取当前用户数据目录中的文件路径（目录不存在时创建）
+
+    Windows 为 %LOCALAPPDATA%\\md2picgo，macOS 为 ~/Library/Application Support/md2picgo，
+    其他系统为 $XDG_DATA_HOME/md2picgo（默认 ~/.local/share/md2picgo）
+
+    Args:
+        filename: 文件名
+
+    Returns:
+        文件路径
+    """
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~\\AppData\\Local")
+    elif sys.platform == "darwin":
+        base = os.path.expanduser("~/Library/Application Support")
+    else:
+        base = os.environ.get("XDG_DATA_HOME") or os.path.expanduser("~/.local/share")
+    directory = os.path.join(base, "md2picgo")
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, filename)
 
 
 class ConfigManager:
@@ -16,6 +41,52 @@ class ConfigManager:
         "image_path_prefix": "",
         "max_workers": 3,
         "max_retries": 3,
+        "failover_host": None,
+        "circuit_breaker": {
+            "enabled": True,
+            "failure_threshold": 5,
+            "reset_timeout": 60,
+            "hedge_after": 0,
+        },
+        "offline_queue": {
+            "enabled": True,
+            "path": "",
+            "flush_interval": 60,
+            "max_attempts": 5,
+        },
+        "rate_limits": {},
+        "async_engine": {"enabled": False, "max_concurrency": 200},
+        "multiprocess": {"enabled": False, "processes": 0, "chunk_size": 50},
+        "upload_cache_path": "",
+        "file_memo": {"path": "", "capacity": 10000, "stat_ttl": 5},
+        "image_types": ["png", "jpeg", "gif", "bmp", "webp", "svg", "avif", "ico"],
+        "output_dir": "",
+        "vault_path": "",
+        "inventory": {"path": "", "refresh_interval": 300},
+        "reference_index": {"enabled": True, "path": ""},
+        "near_duplicates": {"enabled": False, "max_distance": 2, "processes": 0},
+        "job_queue": {"path": "jobs.db", "lease_timeout": 60, "max_attempts": 3},
+        "trace_file": "",
+        "metrics_port": 0,
+        "link_check": {
+            "max_workers": 16,
+            "per_domain_limit": 4,
+            "timeout": 10,
+            "cache_ttl": 86400,
+            "cache_path": "",
+        },
+        "pipeline": {
+            "queue_size": 64,
+            "large_file_threshold": 5 * 1024 * 1024,
+            "stages": {
+                "scan": {"workers": 2, "executor": "thread"},
+                "resolve": {"workers": 2, "executor": "thread"},
+                "hash": {"workers": 2, "executor": "thread"},
+                "transform": {"workers": 1, "executor": "thread"},
+                "rewrite": {"workers": 1, "executor": "thread"},
+                "write": {"workers": 2, "executor": "thread"},
+            },
+        },
     }
 
     def __init__(self, config_path: str = "config.json"):
@@ -50,14 +121,14 @@ class ConfigManager:
                 merged_config.update(config)
                 return merged_config
             else:
-                print("配置文件格式错误，使用默认配置")
+                print("配置文件格式错误，使用默认配置", file=sys.stderr)
                 return self.DEFAULT_CONFIG.copy()
 
         except json.JSONDecodeError as e:
-            print(f"配置文件JSON格式错误: {e}，使用默认配置")
+            print(f"配置文件JSON格式错误: {e}，使用默认配置", file=sys.stderr)
             return self.DEFAULT_CONFIG.copy()
         except Exception as e:
-            print(f"加载配置文件时出错: {e}，使用默认配置")
+            print(f"加载配置文件时出错: {e}，使用默认配置", file=sys.stderr)
             return self.DEFAULT_CONFIG.copy()
 
     def save_config(self, config: Optional[Dict[str, Any]] = None) -> bool:
@@ -76,7 +147,7 @@ class ConfigManager:
         try:
             # 验证配置
             if not self.validate_config(config):
-                print("配置验证失败，无法保存")
+                print("配置验证失败，无法保存", file=sys.stderr)
                 return False
 
             # 保存到文件
@@ -88,7 +159,7 @@ class ConfigManager:
             return True
 
         except Exception as e:
-            print(f"保存配置文件时出错: {e}")
+            print(f"保存配置文件时出错: {e}", file=sys.stderr)
             return False
 
     def get_image_host_config(self) -> Dict[str, Any]:
@@ -136,6 +207,216 @@ class ConfigManager:
         """
         return self.config.get("max_retries", 3)
 
+    def get_failover_host_config(self) -> Optional[Dict[str, Any]]:
+        """
+        获取备用图床配置
+
+        Returns:
+            备用图床配置字典 {"type", "config"}，未配置时返回None
+        """
+        return self.config.get("failover_host")
+
+    def get_circuit_breaker_config(self) -> Dict[str, Any]:
+        """
+        获取熔断配置
+
+        Returns:
+            熔断配置字典（缺失字段使用默认值）
+        """
+        circuit_breaker = dict(self.DEFAULT_CONFIG["circuit_breaker"])
+        circuit_breaker.update(self.config.get("circuit_breaker", {}))
+        return circuit_breaker
+
+    def get_offline_queue_config(self) -> Dict[str, Any]:
+        """
+        获取离线上传队列配置
+
+        Returns:
+            离线队列配置字典（缺失字段使用默认值，未设置 path 时保存到用户数据目录）
+        """
+        offline_queue = dict(self.DEFAULT_CONFIG["offline_queue"])
+        offline_queue.update(self.config.get("offline_queue", {}))
+        if not offline_queue["path"]:
+            offline_queue["path"] = user_data_path("offline_queue.json")
+        return offline_queue
+
+    def get_rate_limits(self) -> Dict[str, Dict[str, Any]]:
+        """
+        获取各图床的限速配置
+
+        Returns:
+            {图床类型: {"bytes_per_second", "requests_per_second"}}，0表示不限制
+        """
+        return self.config.get("rate_limits", {})
+
+    def get_async_engine_config(self) -> Dict[str, Any]:
+        """
+        获取异步上传引擎配置
+
+        Returns:
+            异步引擎配置字典（缺失字段使用默认值）
+        """
+        async_engine = dict(self.DEFAULT_CONFIG["async_engine"])
+        async_engine.update(self.config.get("async_engine", {}))
+        return async_engine
+
+    def get_multiprocess_config(self) -> Dict[str, Any]:
+        """
+        获取多进程处理配置
+
+        Returns:
+            多进程配置字典（缺失字段使用默认值）
+        """
+        multiprocess = dict(self.DEFAULT_CONFIG["multiprocess"])
+        multiprocess.update(self.config.get("multiprocess", {}))
+        return multiprocess
+
+    def get_upload_cache_path(self) -> str:
+        """
+        获取上传缓存数据库路径（按图片内容哈希记录已上传的URL）
+
+        Returns:
+            数据库文件路径（未设置时保存到用户数据目录）
+        """
+        return self.config.get("upload_cache_path") or user_data_path("upload_cache.db")
+
+    def get_image_types(self) -> List[str]:
+        """
+        获取允许上传的图片格式（按文件头识别，扩展名不区分大小写）
+
+        Returns:
+            格式名列表，可选 png、jpeg、gif、bmp、webp、svg、avif、ico、tiff、heic
+        """
+        return self.config.get("image_types") or self.DEFAULT_CONFIG["image_types"]
+
+    def get_file_memo_config(self) -> Dict[str, Any]:
+        """
+        获取图片文件状态和哈希缓存配置
+
+        Returns:
+            缓存配置字典（缺失字段使用默认值）
+        """
+        file_memo = dict(self.DEFAULT_CONFIG["file_memo"])
+        file_memo.update(self.config.get("file_memo", {}))
+        return file_memo
+
+    def get_output_dir(self) -> str:
+        """
+        获取输出目录（设置后改写结果写入输出目录，不修改源笔记）
+
+        Returns:
+            输出目录路径，为空时直接改写源笔记
+        """
+        return self.config.get("output_dir", "")
+
+    def get_vault_path(self) -> str:
+        """
+        获取笔记仓库目录（图形界面启动时显示该仓库的待处理统计）
+
+        Returns:
+            仓库目录，为空时不统计
+        """
+        return self.config.get("vault_path", "")
+
+    def get_inventory_config(self) -> Dict[str, Any]:
+        """
+        获取仓库清单配置
+
+        Returns:
+            仓库清单配置字典（缺失字段使用默认值，未设置 path 时保存到用户数据目录）
+        """
+        inventory = dict(self.DEFAULT_CONFIG["inventory"])
+        inventory.update(self.config.get("inventory", {}))
+        if not inventory["path"]:
+            inventory["path"] = user_data_path("vault_inventory.json")
+        return inventory
+
+    def get_reference_index_config(self) -> Dict[str, Any]:
+        """
+        获取图片引用反向索引配置
+
+        Returns:
+            反向索引配置字典（缺失字段使用默认值，未设置 path 时保存到用户数据目录）
+        """
+        reference_index = dict(self.DEFAULT_CONFIG["reference_index"])
+        reference_index.update(self.config.get("reference_index", {}))
+        if not reference_index["path"]:
+            reference_index["path"] = user_data_path("reference_index.db")
+        return reference_index
+
+    def get_near_duplicates_config(self) -> Dict[str, Any]:
+        """
+        获取近似重复图片检测配置
+
+        Returns:
+            近似重复检测配置字典（缺失字段使用默认值）
+        """
+        near_duplicates = dict(self.DEFAULT_CONFIG["near_duplicates"])
+        near_duplicates.update(self.config.get("near_duplicates", {}))
+        return near_duplicates
+
+    def get_job_queue_config(self) -> Dict[str, Any]:
+        """
+        获取分布式任务队列配置
+
+        Returns:
+            任务队列配置字典（缺失字段使用默认值）
+        """
+        job_queue = dict(self.DEFAULT_CONFIG["job_queue"])
+        job_queue.update(self.config.get("job_queue", {}))
+        return job_queue
+
+    def get_trace_file(self) -> str:
+        """
+        获取性能追踪文件路径
+
+        Returns:
+            trace 文件路径，为空时不记录追踪数据
+        """
+        return self.config.get("trace_file", "")
+
+    def get_metrics_port(self) -> int:
+        """
+        获取 Prometheus 指标接口端口
+
+        Returns:
+            端口号，为0时不启动指标接口
+        """
+        return self.config.get("metrics_port", 0)
+
+    def get_link_check_config(self) -> Dict[str, Any]:
+        """
+        获取链接检查配置
+
+        Returns:
+            链接检查配置字典（缺失字段使用默认值，未设置 cache_path 时保存到用户数据目录）
+        """
+        link_check = dict(self.DEFAULT_CONFIG["link_check"])
+        link_check.update(self.config.get("link_check", {}))
+        if not link_check["cache_path"]:
+            link_check["cache_path"] = user_data_path("link_check_cache.json")
+        return link_check
+
+    def get_pipeline_config(self) -> Dict[str, Any]:
+        """
+        获取流水线配置（上传阶段的线程数由 max_workers 决定）
+
+        Returns:
+            流水线配置字典 {"queue_size", "large_file_threshold", "stages"}
+        """
+        default = self.DEFAULT_CONFIG["pipeline"]
+        pipeline = self.config.get("pipeline", {})
+        stages = {name: dict(value) for name, value in default["stages"].items()}
+        for name, value in pipeline.get("stages", {}).items():
+            stages.setdefault(name, {}).update(value)
+        return {
+            "queue_size": pipeline.get("queue_size", default["queue_size"]),
+            "large_file_threshold": pipeline.get(
+                "large_file_threshold", default["large_file_threshold"]
+            ),
+            "stages": stages,
+        }
+
     def validate_config(self, config: Dict[str, Any]) -> bool:
         """
         验证配置的有效性
@@ -165,6 +446,24 @@ class ConfigManager:
                 if not isinstance(wordpress, dict):
                     return False
 
+            # 检查备用图床配置（如果存在）
+            failover_host = config.get("failover_host")
+            if failover_host is not None:
+                if not isinstance(failover_host, dict) or "type" not in failover_host:
+                    return False
+
+            # 检查限速配置（如果存在）
+            rate_limits = config.get("rate_limits", {})
+            if not isinstance(rate_limits, dict):
+                return False
+            for limit in rate_limits.values():
+                if not isinstance(limit, dict):
+                    return False
+                for field in ("bytes_per_second", "requests_per_second"):
+                    value = limit.get(field, 0)
+                    if not isinstance(value, (int, float)) or value < 0:
+                        return False
+
             # 检查数值类型字段
             if "max_workers" in config:
                 if not isinstance(config["max_workers"], int) or config["max_workers"] < 1:
@@ -207,6 +506,19 @@ class ConfigManager:
         self.config["wordpress"] = {"enabled": enabled, "remove_prefix": remove_prefix}
         return self.save_config()
 
+    def update_vault_path(self, vault_path: str) -> bool:
+        """
+        更新笔记仓库目录
+
+        Args:
+            vault_path: 仓库目录
+
+        Returns:
+            是否更新成功
+        """
+        self.config["vault_path"] = vault_path
+        return self.save_config()
+
     def update_image_path_prefix(self, prefix: str) -> bool:
         """
         更新图片路径前缀
@@ -0,0 +1,333 @@
+"""
+本地图片文件的状态和哈希缓存
+以 (路径, inode, 修改时间, 大小) 为键缓存 stat 结果、内容哈希和识别出的图片格式（LRU），
+同一张图片被多处引用或多次检查时只 stat 一次、只读取并计算一次哈希；
+可选保存到SQLite数据库，文件未变化时跨多次运行也不会重新读取
+"""
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from image_formats import hash_and_detect, read_format
+
+# 内存中最多缓存的文件数
+DEFAULT_CAPACITY = 10000
+
+# stat 结果的有效期（秒），有效期内重复检查同一文件不再访问文件系统
+DEFAULT_STAT_TTL = 5.0
+
+# 文件身份：(inode, 修改时间纳秒, 大小)
+FileKey = Tuple[int, int, int]
+
+
+class _Entry:
+    """一个文件的缓存内容"""
+
+    __slots__ = ("stat", "checked_at", "key", "digest", "format", "format_known")
+
+    def __init__(self):
+        self.stat: Optional[os.stat_result] = None
+        self.checked_at = 0.0
+        self.key: Optional[FileKey] = None
+        self.digest: Optional[str] = None
+        self.format: Optional[str] = None
+        self.format_known = False
+
+
+class FileMemo:
+    """文件状态和哈希的LRU缓存（线程安全）"""
+
+    def __init__(
+        self,
+        capacity: int = DEFAULT_CAPACITY,
+        stat_ttl: float = DEFAULT_STAT_TTL,
+        db_path: str = "",
+    ):
+        """
+        初始化缓存
+
+        Args:
+            capacity: 内存中最多缓存的文件数
+            stat_ttl: stat 结果的有效期（秒），0表示每次都重新 stat
+            db_path: 持久化数据库路径，为空时只在内存中缓存
+        """
+        self.stats = dict.fromkeys(("stat_hits", "stat_misses", "hash_hits", "hash_misses"), 0)
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.configure(capacity, stat_ttl, db_path)
+
+    def configure(
+        self,
+        capacity: int = DEFAULT_CAPACITY,
+        stat_ttl: float = DEFAULT_STAT_TTL,
+        db_path: str = "",
+    ):
+        """修改缓存容量、stat 有效期和持久化数据库路径（参数同构造函数）"""
+        with self._lock:
+            self.capacity = max(1, capacity)
+            self.stat_ttl = stat_ttl
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+        self.close()
+        self.db_path = db_path
+        if db_path:
+            with self._connect() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS files ("
+                    "path TEXT PRIMARY KEY, inode INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, "
+                    "size INTEGER NOT NULL, digest TEXT, format TEXT, updated_at REAL NOT NULL)"
+                )
+
+    def _connect(self) -> sqlite3.Connection:
+        """每个线程使用独立的连接"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _normalize(path: str) -> str:
+        return os.path.normcase(os.path.abspath(path))
+
+    def _entry(self, path: str) -> _Entry:
+        """取出（或创建）文件的缓存项并标记为最近使用，调用方需持有锁"""
+        entry = self._entries.get(path)
+        if entry is None:
+            entry = self._entries[path] = _Entry()
+            if len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+        else:
+            self._entries.move_to_end(path)
+        return entry
+
+    def stat(self, path: str) -> Optional[os.stat_result]:
+        """
+        获取文件的 stat 结果（有效期内直接返回缓存）
+
+        Args:
+            path: 文件路径
+
+        Returns:
+            stat 结果，文件不存在时返回None
+        """
+        key = self._normalize(path)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entry(key)
+            if entry.checked_at and now - entry.checked_at < self.stat_ttl:
+                self.stats["stat_hits"] += 1
+                return entry.stat
+            self.stats["stat_misses"] += 1
+        try:
+            result = os.stat(path)
+        except OSError:
+            result = None
+        with self._lock:
+            entry = self._entry(key)
+            entry.stat = result
+            entry.checked_at = now
+            file_key = None if result is None else _file_key(result)
+            if file_key != entry.key:
+                # 文件已变化，之前的哈希和格式失效
+                entry.key = file_key
+                entry.digest = entry.format = None
+                entry.format_known = False
+        return result
+
+    def exists(self, path: str) -> bool:
+        """文件是否存在"""
+        return self.stat(path) is not None
+
+    def getsize(self, path: str) -> int:
+        """
+        获取文件大小
+
+        Raises:
+            FileNotFoundError: 文件不存在
+        """
+        result = self.stat(path)
+        if result is None:
+            raise FileNotFoundError(f"File not found: {path}")
+        return result.st_size
+
+    def cached_hash(self, path: str) -> Optional[Tuple[str, Optional[str]]]:
+        """
+        查询缓存中文件当前内容的 (哈希, 格式)，不读取文件内容
+
+        Returns:
+            (哈希, 格式)；未缓存、文件已变化或不存在时返回None
+        """
+        if self.stat(path) is None:
+            return None
+        key = self._normalize(path)
+        with self._lock:
+            entry = self._entry(key)
+            if entry.digest is not None:
+                self.stats["hash_hits"] += 1
+                return entry.digest, entry.format
+            file_key = entry.key
+        row = self._load(key, file_key)
+        with self._lock:
+            self.stats["hash_misses" if row is None else "hash_hits"] += 1
+        if row is not None:
+            self._store(path, *row)
+        return row
+
+    def hash(self, path: str) -> Tuple[str, Optional[str]]:
+        """
+        获取文件内容的 (SHA-256, 图片格式)，文件未变化时不重新读取
+
+        Args:
+            path: 文件路径
+
+        Returns:
+            (十六进制哈希值, 格式名)
+
+        Raises:
+            OSError: 文件不存在或读取失败
+        """
+        cached = self.cached_hash(path)
+        if cached is not None:
+            return cached
+        digest, image_format = hash_and_detect(path)
+        self.remember(path, digest, image_format)
+        return digest, image_format
+
+    def format(self, path: str) -> Optional[str]:
+        """
+        获取文件的图片格式；已计算过哈希的文件直接返回，否则只读取文件头
+
+        Returns:
+            格式名，无法识别或文件不存在时返回None
+        """
+        if self.stat(path) is None:
+            return None
+        key = self._normalize(path)
+        with self._lock:
+            entry = self._entry(key)
+            if entry.format_known:
+                return entry.format
+        cached = self.cached_hash(path)
+        if cached is not None:
+            return cached[1]
+        try:
+            image_format = read_format(path)
+        except OSError:
+            return None
+        with self._lock:
+            entry = self._entry(key)
+            entry.format = image_format
+            entry.format_known = True
+        return image_format
+
+    def remember(self, path: str, digest: str, image_format: Optional[str]):
+        """
+        记录文件当前内容的哈希和格式（如在进程池中计算的结果），配置了数据库时同时保存
+
+        Args:
+            path: 文件路径
+            digest: 内容哈希
+            image_format: 图片格式
+        """
+        result = self._store(path, digest, image_format)
+        if result is None or not self.db_path:
+            return
+        inode, mtime_ns, size = _file_key(result)
+        try:
+            self._connect().execute(
+                "INSERT OR REPLACE INTO files "
+                "(path, inode, mtime_ns, size, digest, format, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (self._normalize(path), inode, mtime_ns, size, digest, image_format, time.time()),
+            )
+        except sqlite3.Error:
+            pass
+
+    def _store(
+        self, path: str, digest: str, image_format: Optional[str]
+    ) -> Optional[os.stat_result]:
+        """写入内存缓存，返回文件的 stat 结果（文件不存在时不写入）"""
+        result = self.stat(path)
+        if result is None:
+            return None
+        with self._lock:
+            entry = self._entry(self._normalize(path))
+            entry.digest = digest
+            entry.format = image_format
+            entry.format_known = True
+        return result
+
+    def _load(
+        self, key: str, file_key: Optional[FileKey]
+    ) -> Optional[Tuple[str, Optional[str]]]:
+        """从数据库读取与当前文件身份一致的记录"""
+        if not self.db_path or file_key is None:
+            return None
+        try:
+            row = self._connect().execute(
+                "SELECT digest, format FROM files "
+                "WHERE path = ? AND inode = ? AND mtime_ns = ? AND size = ?",
+                (key, *file_key),
+            ).fetchone()
+        except sqlite3.Error:
+            return None
+        return (row[0], row[1]) if row and row[0] else None
+
+    def invalidate(self, path: Optional[str] = None):
+        """
+        使缓存的 stat 结果失效（文件可能已被修改时调用），哈希在下次访问时按文件身份重新校验
+
+        Args:
+            path: 文件路径，为None时使所有文件失效
+        """
+        with self._lock:
+            entries = (
+                self._entries.values()
+                if path is None
+                else [self._entries.get(self._normalize(path))]
+            )
+            for entry in entries:
+                if entry is not None:
+                    entry.checked_at = 0.0
+
+    def close(self):
+        """关闭当前线程的数据库连接"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def summary(self) -> Dict[str, Any]:
+        """缓存统计：命中和未命中次数、缓存的文件数"""
+        with self._lock:
+            return dict(self.stats, entries=len(self._entries))
+
+
+def _file_key(result: os.stat_result) -> FileKey:
+    return result.st_ino, result.st_mtime_ns, result.st_size
+
+
+# 全局缓存实例
+file_memo = FileMemo()
+
+
+def configure_file_memo(config: Dict[str, Any]):
+    """
+    按配置设置全局缓存
+
+    Args:
+        config: {"path": 持久化数据库路径（为空时不持久化）, "capacity": 内存缓存的文件数,
+                 "stat_ttl": stat 结果的有效期（秒）}
+    """
+    file_memo.configure(
+        capacity=config.get("capacity", DEFAULT_CAPACITY),
+        stat_ttl=config.get("stat_ttl", DEFAULT_STAT_TTL),
+        db_path=config.get("path", ""),
+    )
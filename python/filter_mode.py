@@ -0,0 +1,238 @@
+"""
+过滤模式
+从标准输入或清单文件读取Markdown，上传其中的本地图片后把改写结果输出到标准输出或输出目录，
+不修改源文件；上传结果保存在上传缓存中，重复构建时不会重复上传
+"""
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from file_memo import file_memo
+from output_tree import write_atomic
+from uploader import (
+    safe_print,
+    find_local_images,
+    resolve_image_path,
+    upload_with_host,
+    apply_wordpress_links,
+)
+
+
+class MarkdownFilter:
+    """改写Markdown内容中的本地图片链接（只处理内容，不读写笔记文件）"""
+
+    def __init__(
+        self,
+        image_host=None,
+        cache=None,
+        max_workers: int = 3,
+        convert_to_wp: bool = False,
+        remove_wp: bool = False,
+        image_path_prefix: str = "",
+    ):
+        """
+        初始化过滤器
+
+        Args:
+            image_host: 图床适配器实例
+            cache: 上传缓存（UploadCache），为None时每次都重新上传
+            max_workers: 最大上传线程数
+            convert_to_wp: 是否转换为WordPress格式
+            remove_wp: 是否移除WordPress前缀
+            image_path_prefix: 图片路径前缀
+        """
+        self.image_host = image_host
+        self.cache = cache
+        self.max_workers = max(1, max_workers)
+        self.convert_to_wp = convert_to_wp
+        self.remove_wp = remove_wp
+        self.image_path_prefix = image_path_prefix
+        self.stats = dict.fromkeys(
+            ("documents", "images", "uploaded", "reused", "failed"), 0
+        )
+
+    def _upload(self, local_path: str) -> Tuple[Optional[str], bool]:
+        """上传一张图片，返回 (URL, 是否复用缓存)"""
+        from pipeline import hash_file
+
+        if self.cache is None:
+            return upload_with_host(local_path, self.image_host), False
+        url, reused, error = self.cache.upload_once(
+            hash_file(local_path), lambda: upload_with_host(local_path, self.image_host)
+        )
+        if error:
+            safe_print(f"处理图片时出错: {error} ❌", level="error")
+        return url, reused
+
+    def upload_images(
+        self, documents: List[Tuple[str, str]]
+    ) -> Dict[str, Optional[str]]:
+        """
+        并行上传所有文档引用的本地图片（相同路径只上传一次）
+
+        Args:
+            documents: [(Markdown内容, 笔记路径), ...]，笔记路径用于解析相对图片路径
+
+        Returns:
+            {图片本地路径: URL}
+        """
+        from metrics import metrics
+
+        local_paths = []
+        for content, note_path in documents:
+            for match in find_local_images(content, note_path, self.image_path_prefix):
+                local_path = resolve_image_path(
+                    match.group(1), note_path, self.image_path_prefix
+                )
+                self.stats["images"] += 1
+                if local_path not in local_paths:
+                    local_paths.append(local_path)
+
+        def upload(local_path):
+            if not file_memo.exists(local_path):
+                safe_print(f"图片不存在: {local_path} ❌", level="error")
+                return None, False
+            try:
+                return self._upload(local_path)
+            except Exception as e:
+                safe_print(f"处理图片时出错: {str(e)} ❌", level="error")
+                return None, False
+
+        urls = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = executor.map(upload, local_paths)
+            for local_path, (url, reused) in zip(local_paths, results):
+                urls[local_path] = url
+                if not url:
+                    continue
+                if reused:
+                    self.stats["reused"] += 1
+                    metrics.record_cache_hit()
+                else:
+                    self.stats["uploaded"] += 1
+        return urls
+
+    def rewrite(
+        self, content: str, note_path: str, urls: Dict[str, Optional[str]]
+    ) -> str:
+        """
+        用上传结果改写内容
+
+        Args:
+            content: Markdown内容
+            note_path: 笔记路径
+            urls: upload_images 的返回值
+
+        Returns:
+            改写后的内容
+        """
+        self.stats["documents"] += 1
+        new_content = content
+        for match in find_local_images(content, note_path, self.image_path_prefix):
+            local_path = resolve_image_path(match.group(1), note_path, self.image_path_prefix)
+            url = urls.get(local_path)
+            if url:
+                new_content = new_content.replace(match.group(0), f"![]({url})")
+            else:
+                self.stats["failed"] += 1
+        return apply_wordpress_links(
+            new_content, convert_to_wp=self.convert_to_wp, remove_wp=self.remove_wp
+        )
+
+    def process(self, documents: List[Tuple[str, str]]) -> List[str]:
+        """
+        上传并改写一批文档
+
+        Args:
+            documents: [(Markdown内容, 笔记路径), ...]
+
+        Returns:
+            改写后的内容列表
+        """
+        urls = self.upload_images(documents)
+        return [self.rewrite(content, note_path, urls) for content, note_path in documents]
+
+
+def read_manifest(manifest: str) -> List[str]:
+    """
+    读取清单文件（每行一个Markdown文件路径，"-" 表示从标准输入读取清单）
+
+    Args:
+        manifest: 清单文件路径
+
+    Returns:
+        文件路径列表
+    """
+    if manifest == "-":
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(manifest, "r", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+    return [line.strip() for line in lines if line.strip() and not line.startswith("#")]
+
+
+def output_path_for(file_path: str, root: str, output_dir: str) -> str:
+    """计算文件在输出目录中的路径（保持相对 root 的目录结构）"""
+    file_path = os.path.abspath(file_path)
+    try:
+        relative = os.path.relpath(file_path, root)
+    except ValueError:
+        relative = os.path.basename(file_path)
+    if relative.startswith(os.pardir):
+        relative = os.path.basename(file_path)
+    return os.path.join(output_dir, relative)
+
+
+def filter_stdin(markdown_filter: MarkdownFilter, base_dir: str = "."):
+    """
+    从标准输入读取Markdown，改写后输出到标准输出
+
+    Args:
+        markdown_filter: 过滤器
+        base_dir: 解析相对图片路径时使用的笔记目录
+    """
+    content = sys.stdin.buffer.read().decode("utf-8")
+    note_path = os.path.join(os.path.abspath(base_dir), "stdin.md")
+    (new_content,) = markdown_filter.process([(content, note_path)])
+    sys.stdout.buffer.write(new_content.encode("utf-8"))
+    sys.stdout.flush()
+
+
+def filter_manifest(
+    markdown_filter: MarkdownFilter,
+    manifest: str,
+    output_dir: str,
+    root: str = ".",
+) -> int:
+    """
+    处理清单中的文件，把改写结果写入输出目录（源文件不变）
+
+    Args:
+        markdown_filter: 过滤器
+        manifest: 清单文件路径
+        output_dir: 输出目录
+        root: 源文件的根目录，输出时保持相对它的目录结构
+
+    Returns:
+        写出的文件数
+    """
+    root = os.path.abspath(root)
+    documents = []
+    for file_path in read_manifest(manifest):
+        try:
+            with open(file_path, "r", encoding="utf-8", newline="") as f:
+                documents.append((f.read(), os.path.abspath(file_path)))
+        except (OSError, UnicodeDecodeError) as e:
+            safe_print(f"读取文件失败: {file_path} {str(e)} ❌", level="error")
+
+    written = 0
+    results = markdown_filter.process(documents)
+    for (_, note_path), new_content in zip(documents, results):
+        target = output_path_for(note_path, root, output_dir)
+        try:
+            write_atomic(target, new_content)
+            written += 1
+        except OSError as e:
+            safe_print(f"写入文件失败: {target} {str(e)} ❌", level="error")
+    return written
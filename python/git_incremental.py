@@ -0,0 +1,224 @@
+"""
+Git 增量模式
+笔记仓库是 git 仓库时，只处理上次处理的提交之后有变化的笔记，
+或暂存区中的笔记（用于 pre-commit 钩子），避免每次都遍历整个仓库
+"""
+import os
+import subprocess
+from typing import Any, Dict, List, Optional
+
+from uploader import safe_print, process_markdown_file
+
+# 记录上次处理的提交的 git 配置项（保存在仓库的 .git/config 中）
+PROCESSED_COMMIT_KEY = "md2picgo.processedCommit"
+
+
+class GitError(Exception):
+    """git 命令执行失败"""
+
+
+def run_git(repo: str, *args: str) -> str:
+    """
+    在仓库中执行 git 命令
+
+    Args:
+        repo: 仓库路径
+        args: git 参数
+
+    Returns:
+        标准输出
+
+    Raises:
+        GitError: 命令执行失败或未安装 git
+    """
+    try:
+        result = subprocess.run(
+            ["git", "-C", repo, *args],
+            capture_output=True,
+            text=True,
+            encoding="utf-8",
+        )
+    except OSError as e:
+        raise GitError(f"无法执行git: {str(e)}")
+    if result.returncode != 0:
+        raise GitError(result.stderr.strip() or f"git {args[0]} 失败")
+    return result.stdout
+
+
+def _split_paths(output: str) -> List[str]:
+    """解析 -z 格式的路径列表"""
+    return [path for path in output.split("\0") if path]
+
+
+def find_repo_root(path: str) -> str:
+    """获取路径所在 git 仓库的根目录"""
+    directory = path if os.path.isdir(path) else os.path.dirname(os.path.abspath(path))
+    return run_git(directory, "rev-parse", "--show-toplevel").strip()
+
+
+def head_commit(repo: str) -> Optional[str]:
+    """获取当前 HEAD 提交，仓库还没有提交时返回None"""
+    try:
+        return run_git(repo, "rev-parse", "--verify", "-q", "HEAD").strip() or None
+    except GitError:
+        return None
+
+
+def get_processed_commit(repo: str) -> Optional[str]:
+    """获取上次处理的提交"""
+    try:
+        output = run_git(repo, "config", "--local", "--get", PROCESSED_COMMIT_KEY)
+    except GitError:
+        return None
+    commit = output.strip()
+    if not commit:
+        return None
+    # 历史被改写（rebase 等）后记录的提交可能已不存在
+    try:
+        run_git(repo, "cat-file", "-e", f"{commit}^{{commit}}")
+    except GitError:
+        safe_print(f"记录的提交 {commit[:8]} 已不存在，将处理全部笔记", level="warning")
+        return None
+    return commit
+
+
+def set_processed_commit(repo: str, commit: str):
+    """记录本次处理的提交"""
+    run_git(repo, "config", "--local", PROCESSED_COMMIT_KEY, commit)
+
+
+def staged_notes(repo: str, pathspec: str = ".") -> List[str]:
+    """获取暂存区中新增或修改的笔记（相对仓库根目录的路径）"""
+    output = run_git(
+        repo, "diff", "--cached", "--name-only", "-z", "--diff-filter=ACMR", "--", pathspec
+    )
+    return [path for path in _split_paths(output) if path.lower().endswith(".md")]
+
+
+def partially_staged(repo: str, paths: List[str]) -> List[str]:
+    """获取工作区与暂存区内容不一致（还有未暂存修改）的路径"""
+    if not paths:
+        return []
+    output = run_git(repo, "diff", "--name-only", "-z", "--", *paths)
+    return _split_paths(output)
+
+
+def changed_notes(repo: str, since: Optional[str], pathspec: str = ".") -> List[str]:
+    """
+    获取自指定提交以来有变化的笔记（相对仓库根目录的路径），
+    包括未提交的修改和未跟踪的文件
+
+    Args:
+        repo: 仓库路径
+        since: 起始提交，为None时返回全部笔记
+        pathspec: 只列出该路径下的笔记
+
+    Returns:
+        笔记路径列表
+    """
+    if since:
+        paths = _split_paths(
+            run_git(
+                repo, "diff", "--name-only", "-z", "--diff-filter=ACMR", since, "--", pathspec
+            )
+        )
+    else:
+        paths = _split_paths(run_git(repo, "ls-files", "-z", "--", pathspec))
+    paths += _split_paths(
+        run_git(repo, "ls-files", "-z", "--others", "--exclude-standard", "--", pathspec)
+    )
+    seen = set()
+    notes = []
+    for path in paths:
+        if path.lower().endswith(".md") and path not in seen:
+            seen.add(path)
+            notes.append(path)
+    return notes
+
+
+def _stat_key(path: str):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def process_git_changes(
+    path: str,
+    image_host=None,
+    max_workers: int = 3,
+    convert_to_wp: bool = False,
+    remove_wp: bool = False,
+    image_path_prefix: str = "",
+    offline_queue=None,
+    staged: bool = False,
+    since: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    只处理 git 仓库中有变化的笔记
+
+    Args:
+        path: 仓库（或其中任意目录）路径
+        image_host: 图床适配器实例
+        max_workers: 最大工作线程数
+        convert_to_wp: 是否转换为WordPress格式
+        remove_wp: 是否移除WordPress前缀
+        image_path_prefix: 图片路径前缀
+        offline_queue: 离线上传队列
+        staged: 为True时只处理暂存区中的笔记，
+            并把改写后的笔记重新加入暂存区（用于 pre-commit 钩子）；
+            还有未暂存修改的笔记会被跳过
+        since: 起始提交，默认使用上次记录的提交
+
+    Returns:
+        {"notes": 处理的笔记数, "changed_notes": 改写的笔记数, "commit": 记录的提交}
+    """
+    repo = find_repo_root(path)
+    pathspec = os.path.abspath(path)
+    if staged:
+        notes = staged_notes(repo, pathspec)
+        # 还有未暂存修改的笔记改写后重新加入暂存区会把这些修改一起暂存，跳过
+        partial = set(partially_staged(repo, notes))
+        for note in partial:
+            safe_print(f"笔记还有未暂存的修改，跳过: {note} ⚠️", level="warning")
+        notes = [note for note in notes if note not in partial]
+    else:
+        since = since or get_processed_commit(repo)
+        if since:
+            safe_print(f"处理 {since[:8]} 之后有变化的笔记", level="info")
+        else:
+            safe_print("没有已处理的提交记录，处理全部笔记", level="info")
+        commit = head_commit(repo)
+        notes = changed_notes(repo, since, pathspec)
+
+    changed = []
+    for note in notes:
+        note_path = os.path.join(repo, note)
+        if not os.path.isfile(note_path):
+            continue
+        before = _stat_key(note_path)
+        process_markdown_file(
+            note_path,
+            image_host=image_host,
+            max_workers=max_workers,
+            convert_to_wp=convert_to_wp,
+            remove_wp=remove_wp,
+            image_path_prefix=image_path_prefix,
+            offline_queue=offline_queue,
+        )
+        if _stat_key(note_path) != before:
+            changed.append(note)
+
+    result = {"notes": len(notes), "changed_notes": len(changed), "commit": None}
+    if staged:
+        if changed:
+            run_git(repo, "add", "--", *changed)
+            safe_print(f"已将 {len(changed)} 篇改写后的笔记重新加入暂存区", level="info")
+    elif commit:
+        set_processed_commit(repo, commit)
+        result["commit"] = commit
+    safe_print(
+        f"共处理 {len(notes)} 篇有变化的笔记，更新 {len(changed)} 篇", level="info"
+    )
+    return result
@@ -0,0 +1,199 @@
+"""
+图片格式识别
+按文件头的魔数识别图片格式（不依赖扩展名），识别在计算哈希时对同一读取缓冲区完成，
+不额外读取文件；识别结果用于筛选允许上传的类型、上传时设置 Content-Type，
+以及为没有扩展名的图片（如直接粘贴的截图）补全上传后的文件名
+"""
+import hashlib
+import mimetypes
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# 格式名: (扩展名, MIME类型)，第一个扩展名用于补全文件名
+FORMATS: Dict[str, Tuple[Tuple[str, ...], str]] = {
+    "png": (("png",), "image/png"),
+    "jpeg": (("jpg", "jpeg", "jfif"), "image/jpeg"),
+    "gif": (("gif",), "image/gif"),
+    "bmp": (("bmp",), "image/bmp"),
+    "webp": (("webp",), "image/webp"),
+    "svg": (("svg",), "image/svg+xml"),
+    "avif": (("avif",), "image/avif"),
+    "ico": (("ico",), "image/x-icon"),
+    "tiff": (("tif", "tiff"), "image/tiff"),
+    "heic": (("heic", "heif"), "image/heic"),
+}
+
+# 默认允许上传的格式（浏览器能直接显示的格式）
+DEFAULT_IMAGE_TYPES = ("png", "jpeg", "gif", "bmp", "webp", "svg", "avif", "ico")
+
+# 识别格式时读取的文件头长度
+SNIFF_SIZE = 512
+
+# 计算哈希时每次读取的块大小
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# ISO BMFF（ftyp）品牌到格式的映射
+_FTYP_BRANDS = {
+    b"avif": "avif",
+    b"avis": "avif",
+    b"heic": "heic",
+    b"heix": "heic",
+    b"hevc": "heic",
+    b"hevx": "heic",
+    b"mif1": "heic",
+    b"msf1": "heic",
+}
+
+# 当前允许上传的格式
+_allowed_types: Tuple[str, ...] = DEFAULT_IMAGE_TYPES
+
+
+def configure_image_types(types: Optional[Iterable[str]]) -> List[str]:
+    """
+    设置允许上传的图片格式
+
+    Args:
+        types: 格式名列表（见 FORMATS），为空时使用默认格式
+
+    Returns:
+        无法识别的格式名
+    """
+    global _allowed_types
+    types = [name.lower() for name in (types or DEFAULT_IMAGE_TYPES)]
+    _allowed_types = tuple(name for name in types if name in FORMATS)
+    return [name for name in types if name not in FORMATS]
+
+
+def allowed_types() -> Tuple[str, ...]:
+    """当前允许上传的格式名"""
+    return _allowed_types
+
+
+def image_extensions() -> List[str]:
+    """当前允许上传的格式对应的扩展名（小写）"""
+    return [ext for name in _allowed_types for ext in FORMATS[name][0]]
+
+
+def is_allowed(image_format: Optional[str]) -> bool:
+    """格式是否允许上传"""
+    return image_format in _allowed_types
+
+
+def sniff(header: bytes) -> Optional[str]:
+    """
+    按文件头识别图片格式
+
+    Args:
+        header: 文件开头的字节（至少 SNIFF_SIZE 字节或整个文件）
+
+    Returns:
+        格式名，无法识别时返回None
+    """
+    if header.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if header.startswith(b"\xff\xd8\xff"):
+        return "jpeg"
+    if header.startswith((b"GIF87a", b"GIF89a")):
+        return "gif"
+    if header.startswith(b"RIFF") and header[8:12] == b"WEBP":
+        return "webp"
+    if header[4:8] == b"ftyp":
+        return _FTYP_BRANDS.get(header[8:12])
+    if header.startswith((b"II*\x00", b"MM\x00*")):
+        return "tiff"
+    if header.startswith(b"\x00\x00\x01\x00"):
+        return "ico"
+    if header.startswith(b"BM") and len(header) >= 26:
+        return "bmp"
+    text = header.lstrip(b"\xef\xbb\xbf \t\r\n").lower()
+    if text.startswith((b"<?xml", b"<svg", b"<!doctype svg", b"<!--")) and b"<svg" in text:
+        return "svg"
+    return None
+
+
+def read_format(file_path: str) -> Optional[str]:
+    """
+    读取文件头识别图片格式
+
+    Args:
+        file_path: 图片路径
+
+    Returns:
+        格式名，无法识别时返回None
+
+    Raises:
+        OSError: 读取失败
+    """
+    with open(file_path, "rb") as f:
+        return sniff(f.read(SNIFF_SIZE))
+
+
+def detect(file_path: str) -> Optional[str]:
+    """
+    识别图片格式；计算哈希时已识别过的文件直接返回结果（见 file_memo），否则只读取文件头
+
+    Args:
+        file_path: 图片路径
+
+    Returns:
+        格式名，无法识别或文件不存在时返回None
+    """
+    from file_memo import file_memo
+
+    return file_memo.format(file_path)
+
+
+def hash_and_detect(file_path: str) -> Tuple[str, Optional[str]]:
+    """
+    流式计算文件内容的SHA-256，同时用第一个读取块识别图片格式
+    （模块级函数，可在进程池中执行）
+
+    Args:
+        file_path: 文件路径
+
+    Returns:
+        (十六进制哈希值, 格式名)
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        chunk = f.read(HASH_CHUNK_SIZE)
+        image_format = sniff(chunk[:SNIFF_SIZE])
+        while chunk:
+            digest.update(chunk)
+            chunk = f.read(HASH_CHUNK_SIZE)
+    return digest.hexdigest(), image_format
+
+
+def content_type(file_path: str) -> str:
+    """
+    上传时使用的 Content-Type：优先按文件内容识别，其次按扩展名猜测
+
+    Args:
+        file_path: 图片路径
+
+    Returns:
+        MIME类型
+    """
+    image_format = detect(file_path)
+    if image_format:
+        return FORMATS[image_format][1]
+    return mimetypes.guess_type(file_path)[0] or "application/octet-stream"
+
+
+def upload_name(file_path: str) -> str:
+    """
+    上传后使用的文件名：没有扩展名的图片按识别出的格式补全扩展名
+
+    Args:
+        file_path: 图片路径
+
+    Returns:
+        文件名
+    """
+    file_name = os.path.basename(file_path)
+    if os.path.splitext(file_name)[1]:
+        return file_name
+    image_format = detect(file_path)
+    if image_format:
+        return f"{file_name}.{FORMATS[image_format][0][0]}"
+    return file_name
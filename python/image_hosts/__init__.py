@@ -11,6 +11,8 @@ from .github import GitHubHost
 from .qiniu import QiniuHost
 from .upyun import UpyunHost
 from .imgur import ImgurHost
+from .circuit_breaker import CircuitBreaker, CircuitOpenError
+from .failover import FailoverHost
 
 # 注册所有图床适配器
 ImageHostFactory.register("gitee", GiteeHost)
@@ -33,4 +35,7 @@ __all__ = [
     "QiniuHost",
     "UpyunHost",
     "ImgurHost",
+    "CircuitBreaker",
+    "CircuitOpenError",
+    "FailoverHost",
 ]
@@ -1,14 +1,17 @@
 """
 阿里云OSS图床适配器
 """
-import os
 from typing import Dict, Any, List
+from file_memo import file_memo
+from image_formats import content_type, upload_name
 from .base import ImageHostBase
 
 
 class AliyunOSSHost(ImageHostBase):
     """阿里云OSS图床适配器"""
 
+    IDENTITY_FIELDS = ("endpoint", "bucket")
+
     def upload(self, image_path: str) -> str:
         """
         上传图片到阿里云OSS
@@ -24,7 +27,7 @@ class AliyunOSSHost(ImageHostBase):
         except ImportError:
             raise Exception("阿里云OSS SDK未安装，请运行: pip install oss2")
 
-        if not os.path.exists(image_path):
+        if not file_memo.exists(image_path):
             raise FileNotFoundError(f"Image file not found: {image_path}")
 
         access_key_id = self.config["access_key_id"]
@@ -39,12 +42,14 @@ class AliyunOSSHost(ImageHostBase):
         bucket = oss2.Bucket(auth, endpoint, bucket_name)
 
         # 生成对象键（文件名）
-        file_name = os.path.basename(image_path)
+        file_name = upload_name(image_path)
         object_key = f"images/{file_name}"
 
         try:
             # 上传文件
-            result = bucket.put_object_from_file(object_key, image_path)
+            result = bucket.put_object_from_file(
+                object_key, image_path, headers={"Content-Type": content_type(image_path)}
+            )
 
             if result.status == 200:
                 # 构建URL
@@ -2,13 +2,80 @@
 图床适配器基类
 定义所有图床适配器的接口
 """
+import asyncio
+import functools
+import os
+import time
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple
+
+from file_memo import file_memo
+from rate_limit import throttle, throttle_async
+from tracing import tracer
 
 
 class ImageHostBase(ABC):
     """图床适配器抽象基类"""
 
+    # 区分图床账号或存储位置的配置项，用于上传缓存的命名空间（见 ImageHostFactory.cache_namespace）
+    IDENTITY_FIELDS: Tuple[str, ...] = ()
+
+    def __init_subclass__(cls, **kwargs):
+        """为子类的 upload / upload_async 方法自动加上限速和追踪区间"""
+        super().__init_subclass__(**kwargs)
+        cls._wrap_upload_async()
+        upload = cls.__dict__.get("upload")
+        if upload is None or getattr(upload, "__traced__", False):
+            return
+
+        @functools.wraps(upload)
+        def traced_upload(self, image_path: str) -> str:
+            # host_type 由工厂设置；同类型的所有实例共用一组令牌桶
+            host_type = getattr(self, "host_type", None)
+            if host_type:
+                throttle(host_type, image_path)
+            with tracer.span(
+                "host.upload",
+                category="host",
+                host=self.get_name(),
+                file=os.path.basename(image_path),
+            ):
+                return upload(self, image_path)
+
+        traced_upload.__traced__ = True
+        cls.upload = traced_upload
+
+    @classmethod
+    def _wrap_upload_async(cls):
+        upload_async = cls.__dict__.get("upload_async")
+        if upload_async is None or getattr(upload_async, "__traced__", False):
+            return
+
+        @functools.wraps(upload_async)
+        async def traced_upload_async(self, image_path: str, session=None) -> str:
+            if session is None:
+                # 没有 aiohttp 会话时回退到同步上传（同步路径自带限速和追踪）
+                return await ImageHostBase.upload_async(self, image_path)
+            host_type = getattr(self, "host_type", None)
+            if host_type:
+                await throttle_async(host_type, image_path)
+            # 协程在同一线程上交错执行，不能用嵌套的 span，直接记录完成区间
+            start = time.perf_counter()
+            try:
+                return await upload_async(self, image_path, session)
+            finally:
+                tracer.complete(
+                    "host.upload_async",
+                    start,
+                    time.perf_counter(),
+                    category="host",
+                    host=self.get_name(),
+                    file=os.path.basename(image_path),
+                )
+
+        traced_upload_async.__traced__ = True
+        cls.upload_async = traced_upload_async
+
     def __init__(self, config: Dict[str, Any]):
         """
         初始化图床适配器
@@ -36,6 +103,32 @@ class ImageHostBase(ABC):
         """
         pass
 
+    async def upload_async(self, image_path: str, session=None) -> str:
+        """
+        异步上传图片；默认在线程池中调用同步的 upload，
+        基于HTTP的图床可覆盖此方法，使用 aiohttp 在事件循环中直接上传
+
+        Args:
+            image_path: 图片本地路径
+            session: aiohttp.ClientSession，为None时回退到同步上传
+
+        Returns:
+            上传后的图片URL
+        """
+        return await asyncio.to_thread(self.upload, image_path)
+
+    @staticmethod
+    async def read_file_async(image_path: str) -> bytes:
+        """在线程池中读取图片内容，避免阻塞事件循环"""
+        if not file_memo.exists(image_path):
+            raise FileNotFoundError(f"Image file not found: {image_path}")
+
+        def read():
+            with open(image_path, "rb") as f:
+                return f.read()
+
+        return await asyncio.to_thread(read)
+
     @abstractmethod
     def validate_config(self, config: Dict[str, Any]) -> bool:
         """
@@ -0,0 +1,92 @@
+"""
+熔断器
+图床连续失败达到阈值后暂停请求，冷却时间过后放行一次探测请求
+"""
+import threading
+import time
+
+
+class CircuitOpenError(Exception):
+    """熔断器打开时拒绝请求"""
+
+
+class CircuitBreaker:
+    """线程安全的熔断器"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 60):
+        """
+        初始化熔断器
+
+        Args:
+            failure_threshold: 连续失败多少次后打开熔断器
+            reset_timeout: 打开后多少秒放行一次探测请求
+        """
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """
+        判断是否允许发起请求；冷却结束后只放行一个探测请求
+
+        Returns:
+            是否允许请求
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+
+    @property
+    def is_open(self) -> bool:
+        """熔断器是否处于打开状态（冷却中）"""
+        with self._lock:
+            return (
+                self.state == self.OPEN
+                and time.monotonic() - self._opened_at < self.reset_timeout
+            )
+
+    def record_success(self):
+        """记录请求成功，关闭熔断器"""
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def release(self):
+        """放弃本次请求（失败原因与图床无关），不改变熔断器状态，只释放探测名额"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self) -> bool:
+        """
+        记录请求失败
+
+        Returns:
+            本次失败是否导致熔断器打开
+        """
+        with self._lock:
+            self.failures += 1
+            self._probe_in_flight = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                tripped = self.state != self.OPEN
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                return tripped
+            return False
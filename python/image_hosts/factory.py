@@ -2,6 +2,7 @@
 图床工厂类
 根据配置创建对应的图床适配器实例
 """
+import hashlib
 from typing import Dict, Any
 from .base import ImageHostBase
 
@@ -41,7 +42,43 @@ class ImageHostFactory:
             raise ValueError(f"Unsupported image host type: {host_type}")
 
         host_class = cls._registry[host_type]
-        return host_class(config)
+        instance = host_class(config)
+        instance.host_type = host_type
+        return instance
+
+    @classmethod
+    def create_from_config(cls, image_host_config: Dict[str, Any]) -> ImageHostBase:
+        """
+        根据配置文件中的图床配置创建实例
+
+        Args:
+            image_host_config: 图床配置 {"type": 图床类型, "config": 图床配置}
+
+        Returns:
+            图床适配器实例
+        """
+        host_type = image_host_config.get("type", "gitee")
+        host_config = image_host_config.get("config", {})
+        return cls.create(host_type, host_config)
+
+    @classmethod
+    def cache_namespace(cls, image_host_config: Dict[str, Any]) -> str:
+        """
+        上传缓存的命名空间：图床类型加上区分账号或存储位置的配置项（如仓库、存储桶、域名），
+        切换图床或账号后不会复用旧图床的URL；配置值只保存哈希，避免令牌写入缓存
+
+        Args:
+            image_host_config: 图床配置 {"type": 图床类型, "config": 图床配置}
+
+        Returns:
+            命名空间，如 "github:3f2a9c0d1e4b5a6c"
+        """
+        host_type = image_host_config.get("type", "gitee")
+        host_config = image_host_config.get("config", {})
+        host_class = cls._registry.get(host_type)
+        fields = host_class.IDENTITY_FIELDS if host_class else ()
+        identity = "\0".join(str(host_config.get(field, "")) for field in fields)
+        return f"{host_type}:{hashlib.sha256(identity.encode('utf-8')).hexdigest()[:16]}"
 
     @classmethod
     def get_supported_types(cls) -> list:
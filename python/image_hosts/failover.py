@@ -0,0 +1,311 @@
+"""
+故障转移图床适配器
+为每个图床配置熔断器，主图床不可用时自动切换到备用图床，可选对冲请求降低长尾延迟
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from file_memo import file_memo
+from .base import ImageHostBase
+from .circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+def _all_failed(errors: List[Tuple[str, Exception]]) -> Exception:
+    """
+    所有图床都失败时抛出的异常：消息汇总各图床的错误，最后一个错误作为 __cause__，
+    调用方可据此区分网络不可达和图片本身的问题
+
+    Args:
+        errors: [(图床名称, 异常), ...]，为空表示所有图床均已熔断
+
+    Returns:
+        异常
+    """
+    if not errors:
+        return CircuitOpenError("所有图床均已熔断，暂停上传")
+    error = Exception("; ".join(f"{name}: {str(e)}" for name, e in errors))
+    error.__cause__ = errors[-1][1]
+    return error
+
+
+class FailoverHost(ImageHostBase):
+    """按顺序尝试多个图床的适配器"""
+
+    def __init__(
+        self,
+        hosts: List[ImageHostBase],
+        config: Optional[Dict[str, Any]] = None,
+        notify: Optional[Callable[..., None]] = None,
+    ):
+        """
+        初始化故障转移适配器
+
+        Args:
+            hosts: 图床实例列表，第一个为主图床
+            config: 熔断配置 {"failure_threshold", "reset_timeout", "hedge_after"}
+            notify: 状态变化时的通知函数，签名同 safe_print(message, level=...)
+        """
+        self.hosts = hosts
+        self.notify = notify
+        super().__init__(config or {})
+        self.breakers = [
+            CircuitBreaker(
+                failure_threshold=self.config.get("failure_threshold", 5),
+                reset_timeout=self.config.get("reset_timeout", 60),
+            )
+            for _ in hosts
+        ]
+        self.hedge_after = self.config.get("hedge_after") or 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
+    def _notify(self, message: str, level: str = "warning"):
+        if self.notify:
+            self.notify(message, level=level)
+
+    def _attempt(self, index: int, image_path: str) -> str:
+        """通过指定图床上传，并根据结果更新熔断器"""
+        host = self.hosts[index]
+        breaker = self.breakers[index]
+        try:
+            url = host.upload(image_path)
+        except FileNotFoundError:
+            # 文件问题与图床无关，既不计入失败也不算作成功
+            breaker.release()
+            raise
+        except Exception:
+            if breaker.record_failure():
+                self._notify(
+                    f"图床 {host.get_name()} 连续失败，已熔断 {breaker.reset_timeout} 秒",
+                    level="warning",
+                )
+            raise
+        breaker.record_success()
+        return url
+
+    def upload(self, image_path: str) -> str:
+        """
+        上传图片，依次尝试未熔断的图床
+
+        Args:
+            image_path: 图片本地路径
+
+        Returns:
+            上传后的图片URL
+        """
+        if not file_memo.exists(image_path):
+            raise FileNotFoundError(f"Image file not found: {image_path}")
+
+        if self.hedge_after and len(self.hosts) > 1:
+            return self._hedged_upload(image_path)
+
+        errors = []
+        for index, host in enumerate(self.hosts):
+            if not self.breakers[index].allow():
+                continue
+            try:
+                url = self._attempt(index, image_path)
+            except FileNotFoundError:
+                raise
+            except Exception as e:
+                errors.append((host.get_name(), e))
+                continue
+            if index > 0:
+                self._notify(
+                    f"已切换到备用图床 {host.get_name()}: {os.path.basename(image_path)}",
+                    level="info",
+                )
+            return url
+
+        raise _all_failed(errors)
+
+    async def _attempt_async(self, index: int, image_path: str, session) -> str:
+        """_attempt 的协程版本"""
+        host = self.hosts[index]
+        breaker = self.breakers[index]
+        try:
+            url = await host.upload_async(image_path, session)
+        except FileNotFoundError:
+            breaker.release()
+            raise
+        except Exception:
+            if breaker.record_failure():
+                self._notify(
+                    f"图床 {host.get_name()} 连续失败，已熔断 {breaker.reset_timeout} 秒",
+                    level="warning",
+                )
+            raise
+        breaker.record_success()
+        return url
+
+    async def upload_async(self, image_path: str, session=None) -> str:
+        """
+        异步上传图片，依次尝试未熔断的图床
+
+        Args:
+            image_path: 图片本地路径
+            session: aiohttp.ClientSession
+
+        Returns:
+            上传后的图片URL
+        """
+        if not file_memo.exists(image_path):
+            raise FileNotFoundError(f"Image file not found: {image_path}")
+
+        if self.hedge_after and len(self.hosts) > 1:
+            return await self._hedged_upload_async(image_path, session)
+
+        errors = []
+        for index, host in enumerate(self.hosts):
+            if not self.breakers[index].allow():
+                continue
+            try:
+                url = await self._attempt_async(index, image_path, session)
+            except FileNotFoundError:
+                raise
+            except Exception as e:
+                errors.append((host.get_name(), e))
+                continue
+            if index > 0:
+                self._notify(
+                    f"已切换到备用图床 {host.get_name()}: {os.path.basename(image_path)}",
+                    level="info",
+                )
+            return url
+
+        raise _all_failed(errors)
+
+    async def _hedged_upload_async(self, image_path: str, session) -> str:
+        """_hedged_upload 的协程版本，落后的请求继续在事件循环中完成"""
+        pending = {}
+        errors = []
+        next_index = 0
+
+        def launch_next() -> bool:
+            nonlocal next_index
+            while next_index < len(self.hosts):
+                index = next_index
+                next_index += 1
+                if self.breakers[index].allow():
+                    task = asyncio.ensure_future(
+                        self._attempt_async(index, image_path, session)
+                    )
+                    # 未被采用的请求的异常不再关心，取出以免事件循环告警
+                    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+                    pending[task] = index
+                    return True
+            return False
+
+        if not launch_next():
+            raise CircuitOpenError("所有图床均已熔断，暂停上传")
+
+        while pending:
+            timeout = self.hedge_after if next_index < len(self.hosts) else None
+            done, _ = await asyncio.wait(
+                list(pending), timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                launch_next()
+                continue
+            for task in done:
+                index = pending.pop(task)
+                try:
+                    return task.result()
+                except FileNotFoundError:
+                    raise
+                except Exception as e:
+                    errors.append((self.hosts[index].get_name(), e))
+            if not pending:
+                launch_next()
+
+        raise _all_failed(errors)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=8, thread_name_prefix="hedge"
+                )
+            return self._executor
+
+    def _hedged_upload(self, image_path: str) -> str:
+        """
+        对冲请求：主图床在 hedge_after 秒内未完成时，同时向备用图床发起请求，
+        取先成功的结果（两边都成功时备用图床上会多出一份图片）
+        """
+        executor = self._get_executor()
+        pending = {}
+        errors = []
+        next_index = 0
+
+        def launch_next() -> bool:
+            nonlocal next_index
+            while next_index < len(self.hosts):
+                index = next_index
+                next_index += 1
+                if self.breakers[index].allow():
+                    pending[executor.submit(self._attempt, index, image_path)] = index
+                    return True
+            return False
+
+        if not launch_next():
+            raise CircuitOpenError("所有图床均已熔断，暂停上传")
+
+        while pending:
+            timeout = self.hedge_after if next_index < len(self.hosts) else None
+            done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                # 超时未完成，发起对冲请求
+                launch_next()
+                continue
+            for future in done:
+                index = pending.pop(future)
+                try:
+                    return future.result()
+                except FileNotFoundError:
+                    raise
+                except Exception as e:
+                    errors.append((self.hosts[index].get_name(), e))
+            if not pending:
+                launch_next()
+
+        raise _all_failed(errors)
+
+    def validate_config(self, config: Dict[str, Any]) -> bool:
+        """
+        验证配置是否有效
+
+        Args:
+            config: 配置字典
+
+        Returns:
+            配置是否有效
+        """
+        if not self.hosts:
+            return False
+        for field in ("failure_threshold", "reset_timeout", "hedge_after"):
+            value = config.get(field)
+            if value is not None and (not isinstance(value, (int, float)) or value < 0):
+                return False
+        return True
+
+    def get_required_fields(self) -> List[str]:
+        """
+        获取必需的配置字段列表
+
+        Returns:
+            必需字段名称列表
+        """
+        return []
+
+    def get_name(self) -> str:
+        """
+        获取图床名称
+
+        Returns:
+            主图床名称（有备用图床时附带备用图床名称）
+        """
+        return "/".join(host.get_name() for host in self.hosts)
@@ -1,15 +1,18 @@
 """
 Gitee图床适配器
 """
-import os
+import asyncio
 import requests
 from typing import Dict, Any, List
+from file_memo import file_memo
 from .base import ImageHostBase
 
 
 class GiteeHost(ImageHostBase):
     """Gitee图床适配器"""
 
+    IDENTITY_FIELDS = ("server",)
+
     def upload(self, image_path: str) -> str:
         """
         上传图片到Gitee
@@ -20,7 +23,7 @@ class GiteeHost(ImageHostBase):
         Returns:
             上传后的图片URL
         """
-        if not os.path.exists(image_path):
+        if not file_memo.exists(image_path):
             raise FileNotFoundError(f"Image file not found: {image_path}")
 
         server = self.config.get("server", "http://127.0.0.1:36677")
@@ -45,6 +48,44 @@ class GiteeHost(ImageHostBase):
         except requests.RequestException as e:
             raise Exception(f"Gitee request error: {str(e)}")
 
+    async def upload_async(self, image_path: str, session=None) -> str:
+        """
+        通过 aiohttp 异步上传图片到Gitee
+
+        Args:
+            image_path: 图片本地路径
+            session: aiohttp.ClientSession
+
+        Returns:
+            上传后的图片URL
+        """
+        import aiohttp
+
+        if not file_memo.exists(image_path):
+            raise FileNotFoundError(f"Image file not found: {image_path}")
+
+        server = self.config.get("server", "http://127.0.0.1:36677")
+        upload_url = f"{server}/upload"
+
+        try:
+            async with session.post(
+                upload_url,
+                json={"list": [image_path]},
+                timeout=aiohttp.ClientTimeout(total=30),
+            ) as response:
+                if response.status != 200:
+                    raise Exception(f"Gitee server error: {response.status}")
+                result = await response.json(content_type=None)
+
+            if result.get("success"):
+                return result.get("result")[0]
+            raise Exception(f"Gitee upload failed: {result.get('msg')}")
+
+        except asyncio.TimeoutError:
+            raise Exception("Gitee upload timeout")
+        except aiohttp.ClientError as e:
+            raise Exception(f"Gitee request error: {str(e)}")
+
     def validate_config(self, config: Dict[str, Any]) -> bool:
         """
         验证配置是否有效
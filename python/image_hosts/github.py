@@ -1,16 +1,20 @@
 """
 GitHub图床适配器
 """
-import os
+import asyncio
 import base64
 import requests
 from typing import Dict, Any, List
+from file_memo import file_memo
+from image_formats import upload_name
 from .base import ImageHostBase
 
 
 class GitHubHost(ImageHostBase):
     """GitHub图床适配器"""
 
+    IDENTITY_FIELDS = ("repo", "branch", "path")
+
     API_BASE = "https://api.github.com"
 
     def upload(self, image_path: str) -> str:
@@ -23,7 +27,7 @@ class GitHubHost(ImageHostBase):
         Returns:
             上传后的图片URL
         """
-        if not os.path.exists(image_path):
+        if not file_memo.exists(image_path):
             raise FileNotFoundError(f"Image file not found: {image_path}")
 
         token = self.config["token"]
@@ -36,7 +40,7 @@ class GitHubHost(ImageHostBase):
             content = base64.b64encode(f.read()).decode("utf-8")
 
         # 生成文件路径
-        file_name = os.path.basename(image_path)
+        file_name = upload_name(image_path)
         file_path = f"{path_prefix}/{file_name}".strip("/")
 
         # 构建API URL
@@ -71,6 +75,59 @@ class GitHubHost(ImageHostBase):
         except requests.RequestException as e:
             raise Exception(f"GitHub request error: {str(e)}")
 
+    async def upload_async(self, image_path: str, session=None) -> str:
+        """
+        通过 aiohttp 异步上传图片到GitHub
+
+        Args:
+            image_path: 图片本地路径
+            session: aiohttp.ClientSession
+
+        Returns:
+            上传后的图片URL
+        """
+        import aiohttp
+
+        token = self.config["token"]
+        repo = self.config["repo"]
+        branch = self.config.get("branch", "main")
+        path_prefix = self.config.get("path", "images")
+
+        data = await self.read_file_async(image_path)
+        content = base64.b64encode(data).decode("utf-8")
+
+        file_name = upload_name(image_path)
+        file_path = f"{path_prefix}/{file_name}".strip("/")
+        api_url = f"{self.API_BASE}/repos/{repo}/contents/{file_path}"
+
+        headers = {
+            "Authorization": f"token {token}",
+            "Accept": "application/vnd.github.v3+json",
+        }
+        payload = {
+            "message": f"Upload {file_name}",
+            "content": content,
+            "branch": branch,
+        }
+
+        try:
+            async with session.put(
+                api_url,
+                json=payload,
+                headers=headers,
+                timeout=aiohttp.ClientTimeout(total=30),
+            ) as response:
+                result = await response.json(content_type=None)
+                if response.status in [200, 201]:
+                    return result["content"]["download_url"]
+                error_msg = result.get("message", "Unknown error")
+                raise Exception(f"GitHub upload failed: {error_msg}")
+
+        except asyncio.TimeoutError:
+            raise Exception("GitHub upload timeout")
+        except aiohttp.ClientError as e:
+            raise Exception(f"GitHub request error: {str(e)}")
+
     def validate_config(self, config: Dict[str, Any]) -> bool:
         """
         验证配置是否有效
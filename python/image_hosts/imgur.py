@@ -1,16 +1,19 @@
 """
 Imgur图床适配器
 """
-import os
+import asyncio
 import base64
 import requests
 from typing import Dict, Any, List
+from file_memo import file_memo
 from .base import ImageHostBase
 
 
 class ImgurHost(ImageHostBase):
     """Imgur图床适配器"""
 
+    IDENTITY_FIELDS = ("client_id",)
+
     API_URL = "https://api.imgur.com/3/image"
 
     def upload(self, image_path: str) -> str:
@@ -23,7 +26,7 @@ class ImgurHost(ImageHostBase):
         Returns:
             上传后的图片URL
         """
-        if not os.path.exists(image_path):
+        if not file_memo.exists(image_path):
             raise FileNotFoundError(f"Image file not found: {image_path}")
 
         client_id = self.config["client_id"]
@@ -54,6 +57,46 @@ class ImgurHost(ImageHostBase):
         except requests.RequestException as e:
             raise Exception(f"Imgur request error: {str(e)}")
 
+    async def upload_async(self, image_path: str, session=None) -> str:
+        """
+        通过 aiohttp 异步上传图片到Imgur
+
+        Args:
+            image_path: 图片本地路径
+            session: aiohttp.ClientSession
+
+        Returns:
+            上传后的图片URL
+        """
+        import aiohttp
+
+        client_id = self.config["client_id"]
+
+        headers = {"Authorization": f"Client-ID {client_id}"}
+
+        data = await self.read_file_async(image_path)
+        payload = {"image": base64.b64encode(data).decode("utf-8"), "type": "base64"}
+
+        try:
+            async with session.post(
+                self.API_URL,
+                data=payload,
+                headers=headers,
+                timeout=aiohttp.ClientTimeout(total=30),
+            ) as response:
+                if response.status != 200:
+                    raise Exception(f"Imgur server error: {response.status}")
+                result = await response.json(content_type=None)
+
+            if result.get("success"):
+                return result["data"]["link"]
+            raise Exception("Imgur upload failed")
+
+        except asyncio.TimeoutError:
+            raise Exception("Imgur upload timeout")
+        except aiohttp.ClientError as e:
+            raise Exception(f"Imgur request error: {str(e)}")
+
     def validate_config(self, config: Dict[str, Any]) -> bool:
         """
         验证配置是否有效
@@ -1,14 +1,17 @@
 """
 七牛云图床适配器
 """
-import os
 from typing import Dict, Any, List
+from file_memo import file_memo
+from image_formats import content_type, upload_name
 from .base import ImageHostBase
 
 
 class QiniuHost(ImageHostBase):
     """七牛云图床适配器"""
 
+    IDENTITY_FIELDS = ("bucket", "domain")
+
     def upload(self, image_path: str) -> str:
         """
         上传图片到七牛云
@@ -24,7 +27,7 @@ class QiniuHost(ImageHostBase):
         except ImportError:
             raise Exception("七牛云SDK未安装，请运行: pip install qiniu")
 
-        if not os.path.exists(image_path):
+        if not file_memo.exists(image_path):
             raise FileNotFoundError(f"Image file not found: {image_path}")
 
         access_key = self.config["access_key"]
@@ -36,13 +39,13 @@ class QiniuHost(ImageHostBase):
         q = Auth(access_key, secret_key)
 
         # 生成上传Token
-        file_name = os.path.basename(image_path)
+        file_name = upload_name(image_path)
         key = f"images/{file_name}"
         token = q.upload_token(bucket_name, key, 3600)
 
         try:
             # 上传文件
-            ret, info = put_file(token, key, image_path)
+            ret, info = put_file(token, key, image_path, mime_type=content_type(image_path))
 
             if info.status_code == 200:
                 # 构建URL
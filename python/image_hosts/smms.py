@@ -1,15 +1,19 @@
 """
 SM.MS图床适配器
 """
-import os
+import asyncio
 import requests
 from typing import Dict, Any, List
+from file_memo import file_memo
+from image_formats import content_type, upload_name
 from .base import ImageHostBase
 
 
 class SMHost(ImageHostBase):
     """SM.MS图床适配器"""
 
+    IDENTITY_FIELDS = ("token",)
+
     API_URL = "https://sm.ms/api/v2/upload"
 
     def upload(self, image_path: str) -> str:
@@ -22,7 +26,7 @@ class SMHost(ImageHostBase):
         Returns:
             上传后的图片URL
         """
-        if not os.path.exists(image_path):
+        if not file_memo.exists(image_path):
             raise FileNotFoundError(f"Image file not found: {image_path}")
 
         token = self.config.get("token", "")
@@ -33,7 +37,7 @@ class SMHost(ImageHostBase):
 
         try:
             with open(image_path, "rb") as f:
-                files = {"smfile": f}
+                files = {"smfile": (upload_name(image_path), f, content_type(image_path))}
                 response = requests.post(
                     self.API_URL, files=files, headers=headers, timeout=30
                 )
@@ -53,6 +57,55 @@ class SMHost(ImageHostBase):
         except requests.RequestException as e:
             raise Exception(f"SM.MS request error: {str(e)}")
 
+    async def upload_async(self, image_path: str, session=None) -> str:
+        """
+        通过 aiohttp 异步上传图片到SM.MS
+
+        Args:
+            image_path: 图片本地路径
+            session: aiohttp.ClientSession
+
+        Returns:
+            上传后的图片URL
+        """
+        import aiohttp
+
+        token = self.config.get("token", "")
+
+        headers = {}
+        if token:
+            headers["Authorization"] = token
+
+        data = await self.read_file_async(image_path)
+        form = aiohttp.FormData()
+        form.add_field(
+            "smfile",
+            data,
+            filename=upload_name(image_path),
+            content_type=content_type(image_path),
+        )
+
+        try:
+            async with session.post(
+                self.API_URL,
+                data=form,
+                headers=headers,
+                timeout=aiohttp.ClientTimeout(total=30),
+            ) as response:
+                if response.status != 200:
+                    raise Exception(f"SM.MS server error: {response.status}")
+                result = await response.json(content_type=None)
+
+            if result.get("success"):
+                return result["data"]["url"]
+            error_msg = result.get("message", "Unknown error")
+            raise Exception(f"SM.MS upload failed: {error_msg}")
+
+        except asyncio.TimeoutError:
+            raise Exception("SM.MS upload timeout")
+        except aiohttp.ClientError as e:
+            raise Exception(f"SM.MS request error: {str(e)}")
+
     def validate_config(self, config: Dict[str, Any]) -> bool:
         """
         验证配置是否有效
@@ -1,14 +1,17 @@
 """
 腾讯云COS图床适配器
 """
-import os
 from typing import Dict, Any, List
+from file_memo import file_memo
+from image_formats import content_type, upload_name
 from .base import ImageHostBase
 
 
 class TencentCOSHost(ImageHostBase):
     """腾讯云COS图床适配器"""
 
+    IDENTITY_FIELDS = ("region", "bucket")
+
     def upload(self, image_path: str) -> str:
         """
         上传图片到腾讯云COS
@@ -26,7 +29,7 @@ class TencentCOSHost(ImageHostBase):
                 "腾讯云COS SDK未安装，请运行: pip install cos-python-sdk-v5"
             )
 
-        if not os.path.exists(image_path):
+        if not file_memo.exists(image_path):
             raise FileNotFoundError(f"Image file not found: {image_path}")
 
         secret_id = self.config["secret_id"]
@@ -39,14 +42,18 @@ class TencentCOSHost(ImageHostBase):
         client = CosS3Client(config)
 
         # 生成对象键（文件名）
-        file_name = os.path.basename(image_path)
+        file_name = upload_name(image_path)
         object_key = f"images/{file_name}"
 
         try:
             # 上传文件
             with open(image_path, "rb") as f:
                 response = client.put_object(
-                    Bucket=bucket, Body=f, Key=object_key, EnableMD5=False
+                    Bucket=bucket,
+                    Body=f,
+                    Key=object_key,
+                    EnableMD5=False,
+                    ContentType=content_type(image_path),
                 )
 
             # 构建URL
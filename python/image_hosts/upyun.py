@@ -1,16 +1,20 @@
 """
 又拍云图床适配器
 """
-import os
+import asyncio
 import hashlib
 import requests
 from typing import Dict, Any, List
+from file_memo import file_memo
+from image_formats import content_type, upload_name
 from .base import ImageHostBase
 
 
 class UpyunHost(ImageHostBase):
     """又拍云图床适配器"""
 
+    IDENTITY_FIELDS = ("bucket", "domain")
+
     def upload(self, image_path: str) -> str:
         """
         上传图片到又拍云
@@ -21,7 +25,7 @@ class UpyunHost(ImageHostBase):
         Returns:
             上传后的图片URL
         """
-        if not os.path.exists(image_path):
+        if not file_memo.exists(image_path):
             raise FileNotFoundError(f"Image file not found: {image_path}")
 
         operator = self.config["operator"]
@@ -30,7 +34,7 @@ class UpyunHost(ImageHostBase):
         domain = self.config["domain"]
 
         # 生成文件路径
-        file_name = os.path.basename(image_path)
+        file_name = upload_name(image_path)
         remote_path = f"/images/{file_name}"
 
         # 构建上传URL
@@ -40,7 +44,10 @@ class UpyunHost(ImageHostBase):
         password_md5 = hashlib.md5(password.encode()).hexdigest()
 
         # 构建认证头
-        headers = {"Authorization": f"Basic {operator}:{password_md5}"}
+        headers = {
+            "Authorization": f"Basic {operator}:{password_md5}",
+            "Content-Type": content_type(image_path),
+        }
 
         try:
             with open(image_path, "rb") as f:
@@ -60,6 +67,52 @@ class UpyunHost(ImageHostBase):
         except requests.RequestException as e:
             raise Exception(f"又拍云请求错误: {str(e)}")
 
+    async def upload_async(self, image_path: str, session=None) -> str:
+        """
+        通过 aiohttp 异步上传图片到又拍云
+
+        Args:
+            image_path: 图片本地路径
+            session: aiohttp.ClientSession
+
+        Returns:
+            上传后的图片URL
+        """
+        import aiohttp
+
+        operator = self.config["operator"]
+        password = self.config["password"]
+        bucket = self.config["bucket"]
+        domain = self.config["domain"]
+
+        file_name = upload_name(image_path)
+        remote_path = f"/images/{file_name}"
+        upload_url = f"http://v0.api.upyun.com/{bucket}{remote_path}"
+
+        password_md5 = hashlib.md5(password.encode()).hexdigest()
+        headers = {
+            "Authorization": f"Basic {operator}:{password_md5}",
+            "Content-Type": content_type(image_path),
+        }
+
+        data = await self.read_file_async(image_path)
+
+        try:
+            async with session.put(
+                upload_url,
+                data=data,
+                headers=headers,
+                timeout=aiohttp.ClientTimeout(total=30),
+            ) as response:
+                if response.status == 200:
+                    return f"http://{domain}{remote_path}"
+                raise Exception(f"又拍云上传失败，状态码: {response.status}")
+
+        except asyncio.TimeoutError:
+            raise Exception("又拍云上传超时")
+        except aiohttp.ClientError as e:
+            raise Exception(f"又拍云请求错误: {str(e)}")
+
     def validate_config(self, config: Dict[str, Any]) -> bool:
         """
         验证配置是否有效
@@ -0,0 +1,475 @@
+"""
+分布式任务队列
+扫描仓库后把上传任务（每张不同的图片一个）和改写任务（每篇笔记一个）写入SQLite数据库，
+多台机器上的 worker 通过租约领取任务、定期续约并提交结果，可以随时加入或退出
+
+数据库放在共享网络盘上时使用默认的回滚日志模式（WAL 不支持网络文件系统）
+"""
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Set
+
+from note_writer import NoteWriter, apply_edits, read_note, write_note
+from uploader import (
+    safe_print,
+    find_local_images,
+    resolve_image_path,
+    upload_with_host,
+    apply_wordpress_links,
+    collect_markdown_files,
+)
+
+UPLOAD = "upload"
+REWRITE = "rewrite"
+
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+
+class JobQueue:
+    """基于SQLite的任务队列，支持多进程、多机器同时领取任务"""
+
+    def __init__(self, db_path: str = "jobs.db", lease_timeout: float = 60):
+        """
+        初始化任务队列
+
+        Args:
+            db_path: 数据库文件路径
+            lease_timeout: 租约有效期（秒），超时未续约的任务可被其他 worker 领取
+        """
+        self.db_path = db_path
+        self.lease_timeout = lease_timeout
+        self._local = threading.local()
+        conn = self._connect()
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                key TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                owner TEXT,
+                lease_expires REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                result TEXT,
+                error TEXT,
+                UNIQUE (kind, key)
+            );
+            CREATE TABLE IF NOT EXISTS job_deps (
+                job_id INTEGER NOT NULL,
+                digest TEXT NOT NULL,
+                PRIMARY KEY (job_id, digest)
+            );
+            CREATE INDEX IF NOT EXISTS jobs_status ON jobs (kind, status);
+            """
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        """每个线程使用独立的连接"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=60, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self):
+        """开启写事务（BEGIN IMMEDIATE 在开始时即获取写锁，避免并发领取同一任务）"""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        return conn
+
+    def enqueue_vault(
+        self, vault_root: str, image_path_prefix: str = ""
+    ) -> Dict[str, int]:
+        """
+        扫描仓库并写入任务（可重复执行：已完成的上传不会重复，失败的上传会重新排队）
+
+        图片和笔记路径在仓库内时保存为相对路径，各机器可以把共享盘挂载到不同位置
+
+        Args:
+            vault_root: 仓库根目录（或单个笔记文件）
+            image_path_prefix: 图片路径前缀
+
+        Returns:
+            {"notes": 笔记任务数, "images": 不同图片数}
+        """
+        from pipeline import hash_file
+
+        root = vault_root if os.path.isdir(vault_root) else os.path.dirname(vault_root)
+        root = os.path.abspath(root)
+
+        def relative(path: str) -> str:
+            path = os.path.abspath(path)
+            try:
+                if os.path.commonpath([root, path]) == root:
+                    return os.path.relpath(path, root).replace(os.sep, "/")
+            except ValueError:
+                # Windows 下不同盘符的路径
+                pass
+            return path
+
+        digests: Dict[str, Optional[str]] = {}
+        rewrite_jobs = []
+        for file_path in collect_markdown_files(vault_root):
+            try:
+                with open(file_path, "r", encoding="utf-8") as f:
+                    content = f.read()
+            except (OSError, UnicodeDecodeError) as e:
+                safe_print(f"读取文件失败: {file_path} {str(e)} ❌", level="error")
+                continue
+            spans = []
+            for match in find_local_images(content, file_path, image_path_prefix):
+                local_path = resolve_image_path(match.group(1), file_path, image_path_prefix)
+                if local_path not in digests:
+                    try:
+                        digests[local_path] = hash_file(local_path)
+                    except OSError as e:
+                        digests[local_path] = None
+                        safe_print(f"读取图片失败: {str(e)} ❌", level="error")
+                if digests[local_path]:
+                    spans.append([match.group(0), digests[local_path]])
+            if spans:
+                rewrite_jobs.append((relative(file_path), spans))
+
+        conn = self._transaction()
+        try:
+            uploads = {}
+            for local_path, digest in digests.items():
+                if digest and digest not in uploads:
+                    uploads[digest] = relative(local_path)
+            for digest, path in uploads.items():
+                conn.execute(
+                    "INSERT INTO jobs (kind, key, payload, status) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (kind, key) DO UPDATE SET status = excluded.status, "
+                    "attempts = 0, error = NULL WHERE jobs.status = ?",
+                    (UPLOAD, digest, json.dumps({"path": path}), PENDING, FAILED),
+                )
+            for note, spans in rewrite_jobs:
+                conn.execute(
+                    "INSERT INTO jobs (kind, key, payload, status) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (kind, key) DO UPDATE SET payload = excluded.payload, "
+                    "status = excluded.status, attempts = 0, error = NULL "
+                    "WHERE jobs.status != ?",
+                    (REWRITE, note, json.dumps({"spans": spans}), PENDING, LEASED),
+                )
+                job_id = conn.execute(
+                    "SELECT id FROM jobs WHERE kind = ? AND key = ?", (REWRITE, note)
+                ).fetchone()[0]
+                conn.execute("DELETE FROM job_deps WHERE job_id = ?", (job_id,))
+                conn.executemany(
+                    "INSERT OR IGNORE INTO job_deps (job_id, digest) VALUES (?, ?)",
+                    [(job_id, digest) for _, digest in spans],
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return {"notes": len(rewrite_jobs), "images": len(uploads)}
+
+    def lease(self, owner: str, kind: str) -> Optional[Dict[str, Any]]:
+        """
+        领取一个任务；改写任务要等它依赖的图片全部上传结束（成功或失败）后才能领取
+
+        Args:
+            owner: worker 标识
+            kind: 任务类型（upload 或 rewrite）
+
+        Returns:
+            任务字典，没有可领取的任务时返回None
+        """
+        now = time.time()
+        query = (
+            "SELECT id, key, payload, attempts FROM jobs AS j WHERE kind = ? "
+            "AND (status = ? OR (status = ? AND lease_expires < ?))"
+        )
+        if kind == REWRITE:
+            query += (
+                " AND NOT EXISTS (SELECT 1 FROM job_deps AS d JOIN jobs AS u "
+                "ON u.kind = 'upload' AND u.key = d.digest "
+                "WHERE d.job_id = j.id AND u.status NOT IN ('done', 'failed'))"
+            )
+        query += " ORDER BY id LIMIT 1"
+
+        conn = self._transaction()
+        try:
+            row = conn.execute(query, (kind, PENDING, LEASED, now)).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            job_id, key, payload, attempts = row
+            conn.execute(
+                "UPDATE jobs SET status = ?, owner = ?, lease_expires = ? WHERE id = ?",
+                (LEASED, owner, now + self.lease_timeout, job_id),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return {
+            "id": job_id,
+            "kind": kind,
+            "key": key,
+            "payload": json.loads(payload),
+            "attempts": attempts,
+        }
+
+    def heartbeat(self, owner: str, job_ids: List[int]):
+        """为正在执行的任务续约"""
+        if not job_ids:
+            return
+        placeholders = ",".join("?" * len(job_ids))
+        self._connect().execute(
+            f"UPDATE jobs SET lease_expires = ? WHERE owner = ? AND status = ? "
+            f"AND id IN ({placeholders})",
+            (time.time() + self.lease_timeout, owner, LEASED, *job_ids),
+        )
+
+    def complete(self, job_id: int, owner: str, result: Any = None) -> bool:
+        """
+        提交任务结果；租约已被其他 worker 接手时提交无效
+
+        Returns:
+            是否提交成功
+        """
+        cursor = self._connect().execute(
+            "UPDATE jobs SET status = ?, result = ?, error = NULL, owner = NULL, "
+            "lease_expires = NULL WHERE id = ? AND owner = ? AND status = ?",
+            (DONE, json.dumps(result), job_id, owner, LEASED),
+        )
+        return cursor.rowcount == 1
+
+    def fail(self, job_id: int, owner: str, error: str, max_attempts: int = 3):
+        """记录任务失败，未达到最大尝试次数时重新排队"""
+        self._connect().execute(
+            "UPDATE jobs SET attempts = attempts + 1, error = ?, owner = NULL, "
+            "lease_expires = NULL, "
+            "status = CASE WHEN attempts + 1 >= ? THEN ? ELSE ? END "
+            "WHERE id = ? AND owner = ? AND status = ?",
+            (error, max_attempts, FAILED, PENDING, job_id, owner, LEASED),
+        )
+
+    def upload_results(self, digests: List[str]) -> Dict[str, str]:
+        """查询已上传图片的URL"""
+        if not digests:
+            return {}
+        placeholders = ",".join("?" * len(digests))
+        rows = self._connect().execute(
+            f"SELECT key, result FROM jobs WHERE kind = ? AND status = ? "
+            f"AND key IN ({placeholders})",
+            (UPLOAD, DONE, *digests),
+        ).fetchall()
+        return {key: json.loads(result) for key, result in rows}
+
+    def counts(self) -> Dict[str, Dict[str, int]]:
+        """
+        统计各类任务的状态
+
+        Returns:
+            {任务类型: {状态: 数量}}
+        """
+        counts: Dict[str, Dict[str, int]] = {UPLOAD: {}, REWRITE: {}}
+        now = time.time()
+        for kind, status, expired, count in self._connect().execute(
+            "SELECT kind, status, lease_expires < ?, COUNT(*) FROM jobs "
+            "GROUP BY kind, status, lease_expires < ?",
+            (now, now),
+        ):
+            # 租约过期的任务视为待领取
+            if status == LEASED and expired:
+                status = PENDING
+            counts[kind][status] = counts[kind].get(status, 0) + count
+        return counts
+
+    def is_finished(self) -> bool:
+        """所有任务是否都已结束（成功或失败）"""
+        row = self._connect().execute(
+            "SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)", (PENDING, LEASED)
+        ).fetchone()
+        return row[0] == 0
+
+    def failures(self) -> List[Dict[str, Any]]:
+        """获取失败的任务"""
+        rows = self._connect().execute(
+            "SELECT kind, key, payload, error FROM jobs WHERE status = ? ORDER BY id",
+            (FAILED,),
+        ).fetchall()
+        return [
+            {"kind": kind, "key": key, "payload": json.loads(payload), "error": error}
+            for kind, key, payload, error in rows
+        ]
+
+
+class QueueWorker:
+    """从任务队列领取并执行任务的 worker（多线程）"""
+
+    def __init__(
+        self,
+        job_queue: JobQueue,
+        vault_root: str,
+        image_host=None,
+        threads: int = 3,
+        convert_to_wp: bool = False,
+        remove_wp: bool = False,
+        max_attempts: int = 3,
+        poll_interval: float = 1.0,
+    ):
+        """
+        初始化 worker
+
+        Args:
+            job_queue: 任务队列
+            vault_root: 本机上的仓库根目录（用于解析任务中的相对路径）
+            image_host: 图床适配器实例
+            threads: 执行任务的线程数
+            convert_to_wp: 是否转换为WordPress格式
+            remove_wp: 是否移除WordPress前缀
+            max_attempts: 每个任务的最大尝试次数
+            poll_interval: 暂无可领取任务时的等待间隔（秒）
+        """
+        self.job_queue = job_queue
+        root = vault_root if os.path.isdir(vault_root) else os.path.dirname(vault_root)
+        self.vault_root = os.path.abspath(root)
+        self.image_host = image_host
+        self.threads = max(1, threads)
+        self.convert_to_wp = convert_to_wp
+        self.remove_wp = remove_wp
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.stats = {"uploaded": 0, "rewritten": 0, "failed": 0}
+        self._active: Set[int] = set()
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+
+    def _path(self, path: str) -> str:
+        if os.path.isabs(path):
+            return path
+        return os.path.join(self.vault_root, *path.split("/"))
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _heartbeat_loop(self):
+        interval = max(1.0, self.job_queue.lease_timeout / 3)
+        while not self._stop_event.wait(interval):
+            with self._lock:
+                job_ids = list(self._active)
+            try:
+                self.job_queue.heartbeat(self.owner, job_ids)
+            except sqlite3.Error as e:
+                safe_print(f"任务续约失败: {str(e)}", level="warning")
+
+    def _run_upload(self, job: Dict[str, Any]):
+        image_path = self._path(job["payload"]["path"])
+        file_name = os.path.basename(image_path)
+        safe_print(f"上传图片: {file_name}", level="info")
+        try:
+            url = upload_with_host(image_path, self.image_host)
+            error = "" if url else "upload failed"
+        except Exception as e:
+            url = None
+            error = str(e)
+
+        if url:
+            if self.job_queue.complete(job["id"], self.owner, url):
+                self._count("uploaded")
+                safe_print(f"图片 {file_name} 上传成功 ✅", level="success")
+        else:
+            self.job_queue.fail(job["id"], self.owner, error, self.max_attempts)
+            self._count("failed")
+            safe_print(f"图片 {file_name} 上传失败: {error} ❌", level="error")
+
+    def _run_rewrite(self, job: Dict[str, Any]):
+        note_path = self._path(job["key"])
+        file_name = os.path.basename(note_path)
+        spans = job["payload"]["spans"]
+        urls = self.job_queue.upload_results([digest for _, digest in spans])
+        edits = [(span, f"![]({urls[digest]})") for span, digest in spans if digest in urls]
+
+        def rewrite(text):
+            return apply_wordpress_links(
+                apply_edits(text, edits),
+                convert_to_wp=self.convert_to_wp,
+                remove_wp=self.remove_wp,
+            )
+
+        try:
+            content, version = read_note(note_path)
+            new_content = rewrite(content)
+            if new_content != content:
+                if write_note(note_path, new_content, version, rewrite) == NoteWriter.FAILED:
+                    raise OSError("write failed")
+        except (OSError, UnicodeDecodeError) as e:
+            self.job_queue.fail(job["id"], self.owner, str(e), self.max_attempts)
+            self._count("failed")
+            safe_print(f"改写笔记失败: {file_name} {str(e)} ❌", level="error")
+            return
+
+        if self.job_queue.complete(job["id"], self.owner, len(urls)):
+            self._count("rewritten")
+
+    def _work_loop(self, watch: bool):
+        while not self._stop_event.is_set():
+            job = self.job_queue.lease(self.owner, UPLOAD) or self.job_queue.lease(
+                self.owner, REWRITE
+            )
+            if job is None:
+                if not watch and self.job_queue.is_finished():
+                    return
+                # 其他 worker 持有的任务尚未结束，稍后再试
+                time.sleep(self.poll_interval)
+                continue
+
+            with self._lock:
+                self._active.add(job["id"])
+            try:
+                if job["kind"] == UPLOAD:
+                    self._run_upload(job)
+                else:
+                    self._run_rewrite(job)
+            except Exception as e:
+                self.job_queue.fail(job["id"], self.owner, str(e), self.max_attempts)
+                safe_print(f"任务执行出错: {str(e)} ❌", level="error")
+            finally:
+                with self._lock:
+                    self._active.discard(job["id"])
+
+    def run(self, watch: bool = False) -> Dict[str, int]:
+        """
+        领取并执行任务，直到队列中的任务全部结束
+
+        Args:
+            watch: 为True时队列清空后继续等待新任务
+
+        Returns:
+            本 worker 的统计信息
+        """
+        safe_print(f"worker {self.owner} 开始领取任务", level="info")
+        heartbeat = threading.Thread(target=self._heartbeat_loop, daemon=True)
+        heartbeat.start()
+        workers = [
+            threading.Thread(target=self._work_loop, args=(watch,), daemon=True)
+            for _ in range(self.threads)
+        ]
+        for worker in workers:
+            worker.start()
+        try:
+            for worker in workers:
+                while worker.is_alive():
+                    worker.join(0.5)
+        finally:
+            self._stop_event.set()
+        return self.stats
+
+    def stop(self):
+        """停止领取新任务"""
+        self._stop_event.set()
@@ -0,0 +1,292 @@
+"""
+远程图片链接检查模块
+并发检查笔记中的远程图片链接是否可用，检查结果带TTL持久化缓存
+"""
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+from urllib.parse import urlparse
+
+import requests
+
+from wordpress_processor import WordPressLinkProcessor
+
+
+# 视为暂时性失败的HTTP状态码（超时、限流、服务器错误），结果不缓存
+TRANSIENT_STATUSES = (408, 429, 500, 502, 503, 504)
+
+
+def is_transient(result: Dict[str, Any]) -> bool:
+    """检查结果是否为暂时性失败（网络错误、超时、限流或服务器错误）"""
+    if result.get("ok"):
+        return False
+    return result.get("status") is None or result["status"] in TRANSIENT_STATUSES
+
+
+class LinkCheckCache:
+    """
+    链接检查结果缓存，按URL保存，过期条目在下次检查时重新请求；
+    暂时性失败不缓存，下次检查时重新请求
+    """
+
+    def __init__(self, cache_path: str, ttl: int = 86400):
+        """
+        初始化缓存
+
+        Args:
+            cache_path: 缓存文件路径
+            ttl: 缓存有效期（秒）
+        """
+        self.cache_path = cache_path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = self._load()
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if not os.path.exists(self.cache_path):
+            return {}
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+            return entries if isinstance(entries, dict) else {}
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """
+        获取未过期的检查结果
+
+        Args:
+            url: 图片URL
+
+        Returns:
+            检查结果，不存在或已过期时返回None
+        """
+        with self._lock:
+            entry = self._entries.get(url)
+        if (
+            entry
+            and not is_transient(entry)
+            and time.time() - entry.get("checked_at", 0) < self.ttl
+        ):
+            return entry
+        return None
+
+    def set(self, url: str, result: Dict[str, Any]):
+        """
+        写入检查结果
+
+        Args:
+            url: 图片URL
+            result: 检查结果，暂时性失败不写入
+        """
+        if is_transient(result):
+            return
+        with self._lock:
+            self._entries[url] = result
+
+    def save(self):
+        """保存缓存到文件（先写临时文件再替换，避免中断时损坏；每次写入使用独立的临时文件）"""
+        with self._lock:
+            data = dict(self._entries)
+        tmp_path = f"{self.cache_path}.{os.getpid()}-{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.cache_path)
+
+
+class LinkChecker:
+    """远程图片链接检查器"""
+
+    # 匹配Markdown图片链接：![alt](url "title")
+    IMAGE_PATTERN = re.compile(r"!\[[^\]]*\]\(\s*<?([^)\s>]+)>?[^)]*\)")
+
+    def __init__(
+        self,
+        max_workers: int = 16,
+        per_domain_limit: int = 4,
+        timeout: int = 10,
+        cache: Optional[LinkCheckCache] = None,
+    ):
+        """
+        初始化检查器
+
+        Args:
+            max_workers: 最大并发检查数
+            per_domain_limit: 每个域名的最大并发连接数
+            timeout: 单个请求超时时间（秒）
+            cache: 检查结果缓存，为None时不缓存
+        """
+        self.max_workers = max_workers
+        self.per_domain_limit = per_domain_limit
+        self.timeout = timeout
+        self.cache = cache
+        self._domain_locks: Dict[str, threading.BoundedSemaphore] = {}
+        self._domain_lock_guard = threading.Lock()
+        self._local = threading.local()
+
+    @staticmethod
+    def normalize_url(url: str) -> Optional[str]:
+        """
+        将链接规范化为可请求的URL，WordPress格式的链接还原为原始地址
+
+        Args:
+            url: Markdown中的链接
+
+        Returns:
+            规范化后的URL，非远程链接返回None
+        """
+        if WordPressLinkProcessor.is_wordpress_link(url):
+            url = WordPressLinkProcessor.remove_wordpress_prefix(url)
+        if url.startswith("//"):
+            url = f"https:{url}"
+        if url.startswith(("http://", "https://")):
+            return url
+        return None
+
+    @classmethod
+    def extract_remote_urls(cls, content: str) -> List[str]:
+        """
+        提取内容中的远程图片URL（去重并保持出现顺序）
+
+        Args:
+            content: Markdown内容
+
+        Returns:
+            规范化后的URL列表
+        """
+        urls = []
+        seen = set()
+        for match in cls.IMAGE_PATTERN.finditer(content):
+            url = cls.normalize_url(match.group(1))
+            if url and url not in seen:
+                seen.add(url)
+                urls.append(url)
+        return urls
+
+    def collect(self, path: str) -> Dict[str, List[str]]:
+        """
+        收集路径下每篇笔记引用的远程图片URL
+
+        Args:
+            path: Markdown文件或目录路径
+
+        Returns:
+            {笔记路径: URL列表}，不含远程图片的笔记不出现在结果中
+        """
+        path = Path(path)
+        md_files = [path] if path.is_file() else path.rglob("*.md")
+
+        notes = {}
+        for md_file in md_files:
+            try:
+                with open(md_file, "rb") as f:
+                    data = f.read()
+                # 不含图片语法的笔记无需解码
+                if b"![" not in data:
+                    continue
+                urls = self.extract_remote_urls(data.decode("utf-8", errors="replace"))
+            except OSError:
+                continue
+            if urls:
+                notes[str(md_file)] = urls
+        return notes
+
+    def _get_session(self) -> requests.Session:
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(
+                pool_connections=self.max_workers, pool_maxsize=self.per_domain_limit
+            )
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            self._local.session = session
+        return session
+
+    def _get_domain_lock(self, url: str) -> threading.BoundedSemaphore:
+        domain = urlparse(url).netloc.lower()
+        with self._domain_lock_guard:
+            if domain not in self._domain_locks:
+                self._domain_locks[domain] = threading.BoundedSemaphore(
+                    self.per_domain_limit
+                )
+            return self._domain_locks[domain]
+
+    def check_url(self, url: str) -> Dict[str, Any]:
+        """
+        检查单个URL是否可访问，优先使用缓存
+
+        Args:
+            url: 图片URL
+
+        Returns:
+            检查结果 {"ok", "status", "error", "checked_at"}
+        """
+        if self.cache:
+            cached = self.cache.get(url)
+            if cached:
+                return cached
+
+        result = {"ok": False, "status": None, "error": None}
+        session = self._get_session()
+        with self._get_domain_lock(url):
+            try:
+                response = session.head(
+                    url, timeout=self.timeout, allow_redirects=True
+                )
+                # 部分服务器不支持HEAD，退回到只读取响应头的GET
+                if response.status_code in (403, 405, 501):
+                    response = session.get(
+                        url, timeout=self.timeout, allow_redirects=True, stream=True
+                    )
+                    response.close()
+                result["status"] = response.status_code
+                result["ok"] = response.status_code < 400
+            except requests.Timeout:
+                result["error"] = "timeout"
+            except requests.RequestException as e:
+                result["error"] = str(e)
+
+        result["checked_at"] = time.time()
+        if self.cache:
+            self.cache.set(url, result)
+        return result
+
+    def check_vault(self, path: str) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        检查路径下所有笔记的远程图片链接
+
+        Args:
+            path: Markdown文件或目录路径
+
+        Returns:
+            {笔记路径: [{"url", "ok", "status", "error"}, ...]}
+        """
+        notes = self.collect(path)
+
+        unique_urls = list({url for urls in notes.values() for url in urls})
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                results = dict(zip(unique_urls, executor.map(self.check_url, unique_urls)))
+        finally:
+            if self.cache:
+                self.cache.save()
+
+        report = {}
+        for note, urls in notes.items():
+            report[note] = [
+                {
+                    "url": url,
+                    "ok": results[url]["ok"],
+                    "status": results[url]["status"],
+                    "error": results[url]["error"],
+                }
+                for url in urls
+            ]
+        return report
@@ -2,12 +2,20 @@ import sys
 from PyQt5.QtWidgets import QApplication
 from PyQt5.QtGui import QIcon
 from ui import MainWindow
-from uploader import set_ui_window
+from uploader import set_ui_window, safe_print
 from config_manager import ConfigManager
-from image_hosts import ImageHostFactory
-
-
-def create_process_functions(config_manager):
+from metrics import report_run, start_metrics_server
+from runtime import (
+    configure_runtime,
+    create_image_host,
+    create_near_duplicates,
+    create_offline_queue,
+    create_reference_index,
+)
+from tracing import trace_to
+
+
+def create_process_functions(config_manager, offline_queue=None):
     """创建处理函数，使用配置管理器"""
 
     def process_markdown_file(
@@ -15,56 +23,142 @@ def create_process_functions(config_manager):
     ):
         from uploader import process_markdown_file as _process_markdown_file
 
-        # 获取图床配置
-        image_host_config = config_manager.get_image_host_config()
-        host_type = image_host_config.get("type", "gitee")
-        host_config = image_host_config.get("config", {})
-
         # 创建图床实例
-        try:
-            image_host = ImageHostFactory.create(host_type, host_config)
-        except Exception as e:
-            print(f"创建图床实例失败: {e}，使用默认Gitee")
-            image_host = None
+        image_host = create_image_host(config_manager)
 
         # 调用处理函数
-        _process_markdown_file(
-            file_path,
-            image_host=image_host,
-            max_workers=config_manager.get_max_workers(),
-            convert_to_wp=convert_to_wp,
-            remove_wp=remove_wp,
-            image_path_prefix=image_path_prefix,
-        )
+        near_duplicates = create_near_duplicates(config_manager)
+        try:
+            with trace_to(config_manager.get_trace_file()), report_run(safe_print):
+                _process_markdown_file(
+                    file_path,
+                    image_host=image_host,
+                    max_workers=config_manager.get_max_workers(),
+                    convert_to_wp=convert_to_wp,
+                    remove_wp=remove_wp,
+                    image_path_prefix=image_path_prefix,
+                    offline_queue=offline_queue,
+                    near_duplicates=near_duplicates,
+                )
+        finally:
+            # 关闭计算指纹的进程池
+            if near_duplicates is not None:
+                near_duplicates.close()
 
     def process_vault(
         path, convert_to_wp=False, remove_wp=False, image_path_prefix=""
     ):
         from uploader import process_vault as _process_vault
 
-        # 获取图床配置
-        image_host_config = config_manager.get_image_host_config()
-        host_type = image_host_config.get("type", "gitee")
-        host_config = image_host_config.get("config", {})
-
         # 创建图床实例
-        try:
-            image_host = ImageHostFactory.create(host_type, host_config)
-        except Exception as e:
-            print(f"创建图床实例失败: {e}，使用默认Gitee")
-            image_host = None
+        image_host = create_image_host(config_manager)
 
         # 调用处理函数
-        _process_vault(
-            path,
+        async_config = config_manager.get_async_engine_config()
+        multiprocess_config = config_manager.get_multiprocess_config()
+        output_dir = config_manager.get_output_dir()
+        with trace_to(config_manager.get_trace_file()), report_run(safe_print):
+            # 输出目录模式只由流水线引擎支持
+            if multiprocess_config.get("enabled") and not output_dir:
+                from multiprocess_vault import process_vault_multiprocess
+
+                process_vault_multiprocess(
+                    path,
+                    config_manager,
+                    processes=multiprocess_config["processes"],
+                    chunk_size=multiprocess_config["chunk_size"],
+                    max_workers=config_manager.get_max_workers(),
+                    convert_to_wp=convert_to_wp,
+                    remove_wp=remove_wp,
+                    image_path_prefix=image_path_prefix,
+                    cache_path=config_manager.get_upload_cache_path(),
+                    offline_queue=offline_queue,
+                )
+                return
+            if async_config.get("enabled") and not output_dir:
+                from async_uploader import process_vault_sync
+
+                process_vault_sync(
+                    path,
+                    image_host=image_host,
+                    max_concurrency=async_config["max_concurrency"],
+                    convert_to_wp=convert_to_wp,
+                    remove_wp=remove_wp,
+                    image_path_prefix=image_path_prefix,
+                    offline_queue=offline_queue,
+                )
+                return
+            near_duplicates = create_near_duplicates(config_manager)
+            try:
+                _process_vault(
+                    path,
+                    image_host=image_host,
+                    max_workers=config_manager.get_max_workers(),
+                    convert_to_wp=convert_to_wp,
+                    remove_wp=remove_wp,
+                    image_path_prefix=image_path_prefix,
+                    pipeline_config=config_manager.get_pipeline_config(),
+                    offline_queue=offline_queue,
+                    output_dir=output_dir,
+                    reference_index=create_reference_index(config_manager),
+                    near_duplicates=near_duplicates,
+                )
+            finally:
+                if near_duplicates is not None:
+                    near_duplicates.close()
+
+    return process_markdown_file, process_vault
+
+
+def create_batch_job(config_manager, offline_queue=None, on_finish=None):
+    """
+    创建图形界面使用的合并处理任务：多次拖入的路径共用一个流水线、图床实例和缓存
+
+    配置了输出目录、异步引擎或多进程模式时不使用（enabled 返回False），界面回退到逐个处理
+    """
+    from batch_job import BatchJob
+
+    def enabled():
+        return not (
+            config_manager.get_output_dir()
+            or config_manager.get_async_engine_config().get("enabled")
+            or config_manager.get_multiprocess_config().get("enabled")
+        )
+
+    def create_pipeline(image_host):
+        from pipeline import VaultPipeline
+
+        wp_config = config_manager.get_wordpress_config()
+        pipeline_config = config_manager.get_pipeline_config()
+        return VaultPipeline(
             image_host=image_host,
             max_workers=config_manager.get_max_workers(),
-            convert_to_wp=convert_to_wp,
-            remove_wp=remove_wp,
-            image_path_prefix=image_path_prefix,
+            convert_to_wp=wp_config.get("enabled", False),
+            remove_wp=wp_config.get("remove_prefix", False),
+            image_path_prefix=config_manager.get_image_path_prefix(),
+            stage_config=pipeline_config.get("stages"),
+            queue_size=pipeline_config.get("queue_size", 64),
+            large_file_threshold=pipeline_config.get("large_file_threshold", 5 * 1024 * 1024),
+            offline_queue=offline_queue,
+            reference_index=create_reference_index(config_manager),
+            near_duplicates=create_near_duplicates(config_manager),
         )
 
-    return process_markdown_file, process_vault
+    def run_context():
+        from contextlib import ExitStack
+
+        stack = ExitStack()
+        stack.enter_context(trace_to(config_manager.get_trace_file()))
+        stack.enter_context(report_run(safe_print))
+        return stack
+
+    return BatchJob(
+        lambda: create_image_host(config_manager),
+        create_pipeline,
+        on_finish=on_finish,
+        run_context=run_context,
+        enabled=enabled,
+    )
 
 
 def main():
@@ -76,9 +170,20 @@ def main():
 
     # 初始化配置管理器
     config_manager = ConfigManager("config.json")
+    configure_runtime(config_manager)
+
+    # 可选的 Prometheus 指标接口
+    metrics_port = config_manager.get_metrics_port()
+    if metrics_port:
+        start_metrics_server(metrics_port)
+
+    # 离线上传队列：上传失败的图片在图床恢复后由后台线程补传
+    offline_queue = create_offline_queue(config_manager)
 
     # 创建处理函数
-    process_markdown_file, process_vault = create_process_functions(config_manager)
+    process_markdown_file, process_vault = create_process_functions(
+        config_manager, offline_queue
+    )
 
     # 创建主窗口
     window = MainWindow(process_markdown_file, process_vault, config_manager)
@@ -88,12 +193,29 @@ def main():
     # 从配置加载图片路径前缀
     window.image_path_prefix = config_manager.get_image_path_prefix()
 
+    # 拖入的路径合并为一个后台任务，处理期间新拖入的路径直接加入
+    window.batch_job = create_batch_job(
+        config_manager, offline_queue, on_finish=window.batch_finished.emit
+    )
+
+    # 显示笔记仓库的待处理统计，并在后台增量刷新
+    window.start_inventory()
+
     # 显式设置任务栏图标
     import ctypes
 
     myappid = "sherry.md2picgo.1.0"  # 任意字符串，作为应用程序ID
     ctypes.windll.shell32.SetCurrentProcessExplicitAppUserModelID(myappid)
 
+    if offline_queue is not None:
+        from offline_queue import OfflineFlusher
+
+        OfflineFlusher(
+            offline_queue,
+            lambda: create_image_host(config_manager),
+            interval=config_manager.get_offline_queue_config()["flush_interval"],
+        ).start()
+
     window.show()
     sys.exit(app.exec_())
 
@@ -0,0 +1,326 @@
+"""
+运行指标模块
+线程安全的计数器和直方图，可通过 Prometheus 文本格式的 HTTP 接口导出，
+每次运行结束时输出性能汇总表
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+# 上传耗时直方图的默认分桶（秒）
+DEFAULT_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _label_key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    body = ",".join(f'{name}="{value}"' for name, value in pairs)
+    return "{" + body + "}"
+
+
+class Counter:
+    """带标签的累加计数器"""
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        """增加计数"""
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        """获取指定标签的当前值"""
+        with self._lock:
+            return self._values.get(_label_key(labels), 0)
+
+    def total(self) -> float:
+        """获取所有标签的合计"""
+        with self._lock:
+            return sum(self._values.values())
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+
+class Histogram:
+    """带标签的直方图"""
+
+    def __init__(self, name: str, help_text: str, buckets=DEFAULT_LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(sorted(buckets))
+        # {标签: [各分桶计数..., 总数, 总和]}
+        self._values: Dict[LabelKey, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        """记录一个观测值"""
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            data = self._values.setdefault(key, [0] * (len(self.buckets) + 2))
+            if index < len(self.buckets):
+                data[index] += 1
+            data[-2] += 1
+            data[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((key, list(data)) for key, data in self._values.items())
+        for key, data in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, data):
+                cumulative += count
+                labels = _format_labels(key, ("le", str(bound)))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(key, ("le", "+Inf"))
+            lines.append(f"{self.name}_bucket{labels} {data[-2]}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {data[-2]}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {data[-1]}")
+        return lines
+
+
+class UploadMetrics:
+    """上传相关的全部指标，以及单次运行的明细记录（用于汇总表）"""
+
+    def __init__(self):
+        self.uploads_attempted = Counter(
+            "md2picgo_uploads_attempted_total", "Uploads attempted"
+        )
+        self.uploads_succeeded = Counter(
+            "md2picgo_uploads_succeeded_total", "Uploads succeeded"
+        )
+        self.uploads_failed = Counter("md2picgo_uploads_failed_total", "Uploads failed")
+        self.cache_hits = Counter(
+            "md2picgo_upload_cache_hits_total", "Images reused without uploading"
+        )
+        self.bytes_sent = Counter("md2picgo_upload_bytes_total", "Image bytes uploaded")
+        self.retries = Counter("md2picgo_upload_retries_total", "Upload retries")
+        self.notes_rewritten = Counter(
+            "md2picgo_notes_rewritten_total", "Notes written back with new links"
+        )
+        self.upload_latency = Histogram(
+            "md2picgo_upload_latency_seconds", "Upload latency per host"
+        )
+        self._metrics = [
+            self.uploads_attempted,
+            self.uploads_succeeded,
+            self.uploads_failed,
+            self.cache_hits,
+            self.bytes_sent,
+            self.retries,
+            self.notes_rewritten,
+            self.upload_latency,
+        ]
+
+        # 单次运行的明细：(完成时间, 图床, 文件名, 耗时, 是否成功, 大小)
+        self._run_lock = threading.Lock()
+        self._run_started = time.time()
+        self._run_uploads: List[Tuple[float, str, str, float, bool, int]] = []
+        self._run_cache_hits = 0
+
+    def start_run(self):
+        """开始新的一次运行，清空运行明细（累计指标保留）"""
+        with self._run_lock:
+            self._run_started = time.time()
+            self._run_uploads = []
+            self._run_cache_hits = 0
+
+    def record_cache_hit(self):
+        """记录一次复用已上传图片（未实际上传）"""
+        self.cache_hits.inc()
+        with self._run_lock:
+            self._run_cache_hits += 1
+
+    def record_upload(self, host: str, file_name: str, size: int, latency: float, ok: bool):
+        """
+        记录一次上传
+
+        Args:
+            host: 图床名称
+            file_name: 图片文件名
+            size: 图片大小（字节）
+            latency: 上传耗时（秒）
+            ok: 是否成功
+        """
+        self.uploads_attempted.inc(host=host)
+        self.upload_latency.observe(latency, host=host)
+        if ok:
+            self.uploads_succeeded.inc(host=host)
+            self.bytes_sent.inc(size, host=host)
+        else:
+            self.uploads_failed.inc(host=host)
+        with self._run_lock:
+            self._run_uploads.append((time.time(), host, file_name, latency, ok, size))
+
+    def run_records(self) -> Tuple[List[Tuple[str, str, int, float, bool]], int]:
+        """
+        导出本次运行的上传明细（用于把子进程的记录汇总到主进程）
+
+        Returns:
+            ([(图床, 文件名, 大小, 耗时, 是否成功), ...], 复用次数)
+        """
+        with self._run_lock:
+            uploads = list(self._run_uploads)
+            cache_hits = self._run_cache_hits
+        return [
+            (host, file_name, size, latency, ok)
+            for _, host, file_name, latency, ok, size in uploads
+        ], cache_hits
+
+    def merge_run(
+        self, uploads: List[Tuple[str, str, int, float, bool]], cache_hits: int = 0
+    ):
+        """
+        合并其他进程导出的上传明细
+
+        Args:
+            uploads: run_records 返回的上传明细
+            cache_hits: 复用次数
+        """
+        for host, file_name, size, latency, ok in uploads:
+            self.record_upload(host, file_name, size, latency, ok)
+        for _ in range(cache_hits):
+            self.record_cache_hit()
+
+    def render_prometheus(self) -> str:
+        """生成 Prometheus 文本格式的指标"""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def format_summary(self, top: int = 5) -> List[str]:
+        """
+        生成本次运行的汇总表
+
+        Args:
+            top: 显示最慢图片的数量
+
+        Returns:
+            汇总表的文本行
+        """
+        with self._run_lock:
+            started = self._run_started
+            uploads = list(self._run_uploads)
+            cache_hits = self._run_cache_hits
+
+        if not uploads:
+            return [f"本次运行没有上传图片，复用 {cache_hits} 次"]
+
+        elapsed = max(time.time() - started, 1e-6)
+        succeeded = [entry for entry in uploads if entry[4]]
+        lines = [
+            f"上传 {len(uploads)} 次，成功 {len(succeeded)}，失败 {len(uploads) - len(succeeded)}，"
+            f"复用 {cache_hits} 次，"
+            f"耗时 {elapsed:.1f} 秒，平均 {len(succeeded) / elapsed:.2f} 张/秒"
+        ]
+
+        lines.append("最慢的图片:")
+        for _, host, file_name, latency, ok, _ in sorted(uploads, key=lambda e: -e[3])[:top]:
+            status = "✅" if ok else "❌"
+            lines.append(f"  {latency:8.2f}s  {host:<10} {file_name} {status}")
+
+        lines.append("各图床耗时:")
+        by_host: Dict[str, List[float]] = {}
+        for _, host, _, latency, _, _ in uploads:
+            by_host.setdefault(host, []).append(latency)
+        for host, latencies in sorted(by_host.items()):
+            latencies.sort()
+            p50 = latencies[int((len(latencies) - 1) * 0.50)]
+            p95 = latencies[int((len(latencies) - 1) * 0.95)]
+            lines.append(
+                f"  {host:<10} {len(latencies):>5} 次  p50 {p50:.2f}s  p95 {p95:.2f}s"
+            )
+
+        # 吞吐量随时间变化，最多分为10段
+        interval = max(1.0, elapsed / 10)
+        buckets: Dict[int, int] = {}
+        for finished, *_ in succeeded:
+            index = int((finished - started) // interval)
+            buckets[index] = buckets.get(index, 0) + 1
+        lines.append("吞吐量:")
+        for index in range(int(elapsed // interval) + 1):
+            count = buckets.get(index, 0)
+            start = index * interval
+            lines.append(
+                f"  {start:7.1f}s ~ {start + interval:7.1f}s  {count:>5} 张  "
+                f"{count / interval:.2f} 张/秒"
+            )
+        return lines
+
+
+# 全局指标
+metrics = UploadMetrics()
+
+
+@contextmanager
+def report_run(printer: Callable[..., None]):
+    """
+    在代码块结束后输出本次运行的性能汇总
+
+    Args:
+        printer: 输出函数，如 safe_print
+    """
+    metrics.start_run()
+    try:
+        yield
+    finally:
+        printer("性能汇总:", level="info")
+        for line in metrics.format_summary():
+            printer(line, level="info")
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = metrics.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_metrics_server(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """
+    在后台线程启动 Prometheus 指标接口（GET /metrics）
+
+    Args:
+        port: 监听端口
+        host: 监听地址，默认只监听本机
+
+    Returns:
+        HTTP服务器实例，调用 shutdown() 停止
+    """
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
@@ -0,0 +1,245 @@
+"""
+多进程处理模式
+把笔记列表分片交给进程池，每个进程独立完成读取、扫描、上传和改写，
+进程之间通过 SQLite 上传缓存去重，扫描和改写的吞吐量随CPU核心数增长
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List
+
+from image_hosts import ImageHostFactory
+from metrics import metrics
+from note_writer import NoteWriter, apply_edits, read_note
+from uploader import (
+    safe_print,
+    set_ui_window,
+    find_local_images,
+    resolve_image_path,
+    upload_with_host,
+    apply_wordpress_links,
+    collect_markdown_files,
+)
+
+# 每个分片包含的笔记数量
+DEFAULT_CHUNK_SIZE = 50
+
+# 子进程内的状态（由 _init_worker 设置）
+_worker: Dict[str, Any] = {}
+
+
+def _init_worker(config_manager, processes: int, settings: Dict[str, Any]):
+    """子进程初始化：创建图床实例和上传缓存连接"""
+    from runtime import create_image_host
+    from rate_limit import configure_rate_limits
+    from upload_cache import UploadCache
+
+    # 子进程不更新界面
+    set_ui_window(None)
+    _worker["image_host"] = create_image_host(config_manager)
+    # 令牌桶无法跨进程共享，按进程数平分限速配额
+    configure_rate_limits(
+        {
+            host_type: {field: value / processes for field, value in limit.items()}
+            for host_type, limit in config_manager.get_rate_limits().items()
+        }
+    )
+    _worker["cache"] = UploadCache(
+        settings["cache_path"], namespace=settings["cache_namespace"]
+    )
+    _worker["settings"] = settings
+
+
+def _process_chunk(file_paths: List[str]) -> Dict[str, Any]:
+    """
+    在子进程中处理一个分片的笔记
+
+    Returns:
+        {"stats": 统计信息, "failed": 失败的图片引用,
+         "uploads": 上传明细, "cache_hits": 复用次数}
+    """
+    from pipeline import hash_file
+
+    settings = _worker["settings"]
+    image_host = _worker["image_host"]
+    cache = _worker["cache"]
+    metrics.start_run()
+    stats = dict.fromkeys(
+        ("notes", "changed_notes", "images", "uploaded", "reused", "failed"), 0
+    )
+    failed = []
+
+    # 读取并扫描全部笔记
+    notes = []
+    for file_path in file_paths:
+        try:
+            content, version = read_note(file_path)
+        except (OSError, UnicodeDecodeError) as e:
+            file_name = os.path.basename(file_path)
+            safe_print(f"读取文件失败: {file_name} {str(e)} ❌", level="error")
+            continue
+        stats["notes"] += 1
+        prefix = settings["image_path_prefix"]
+        images = [
+            (match, resolve_image_path(match.group(1), file_path, prefix))
+            for match in find_local_images(content, file_path, prefix)
+        ]
+        stats["images"] += len(images)
+        notes.append((file_path, content, version, images))
+
+    # 计算哈希并上传分片内的每张不同图片
+    digests = {}
+    for _, _, _, images in notes:
+        for _, local_path in images:
+            if local_path in digests:
+                continue
+            try:
+                digests[local_path] = hash_file(local_path)
+            except OSError as e:
+                digests[local_path] = None
+                safe_print(f"读取图片失败: {str(e)} ❌", level="error")
+
+    def upload(local_path):
+        return cache.upload_once(
+            digests[local_path], lambda: upload_with_host(local_path, image_host)
+        )
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=settings["max_workers"]) as executor:
+        futures = {
+            executor.submit(upload, local_path): local_path
+            for local_path, digest in digests.items()
+            if digest
+        }
+        for future in as_completed(futures):
+            local_path = futures[future]
+            try:
+                results[local_path] = future.result()
+            except Exception as e:
+                results[local_path] = (None, False, str(e))
+
+    # 改写笔记，写入临时文件后批量提交
+    counted = set()
+    note_writer = NoteWriter()
+    for file_path, content, version, images in notes:
+        edits = []
+        for match, local_path in images:
+            url, reused, error = results.get(local_path, (None, False, "file not found"))
+            if not url:
+                stats["failed"] += 1
+                failed.append((local_path, file_path, match.group(0), error))
+                continue
+            if reused or local_path in counted:
+                stats["reused"] += 1
+                metrics.record_cache_hit()
+            else:
+                stats["uploaded"] += 1
+            counted.add(local_path)
+            edits.append((match.group(0), f"![]({url})"))
+
+        def rewrite(text, edits=edits):
+            return apply_wordpress_links(
+                apply_edits(text, edits),
+                convert_to_wp=settings["convert_to_wp"],
+                remove_wp=settings["remove_wp"],
+            )
+
+        new_content = rewrite(content)
+        if new_content != content:
+            note_writer.write(file_path, new_content, version, rewrite)
+    note_writer.flush()
+    stats["changed_notes"] = note_writer.stats[NoteWriter.WRITTEN]
+
+    uploads, cache_hits = metrics.run_records()
+    return {
+        "stats": stats,
+        "failed": failed,
+        "uploads": uploads,
+        "cache_hits": cache_hits,
+    }
+
+
+def process_vault_multiprocess(
+    path,
+    config_manager,
+    processes: int = 0,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    max_workers: int = 3,
+    convert_to_wp: bool = False,
+    remove_wp: bool = False,
+    image_path_prefix: str = "",
+    cache_path: str = "upload_cache.db",
+    offline_queue=None,
+) -> Dict[str, int]:
+    """
+    多进程处理路径（单个文件或目录）
+
+    图床实例无法跨进程传递，每个子进程根据 config_manager 各自创建
+
+    Args:
+        path: 文件或目录路径
+        config_manager: 配置管理器
+        processes: 进程数，0表示CPU核心数
+        chunk_size: 每个分片的笔记数量
+        max_workers: 每个进程的上传线程数
+        convert_to_wp: 是否转换为WordPress格式
+        remove_wp: 是否移除WordPress前缀
+        image_path_prefix: 图片路径前缀
+        cache_path: 上传缓存数据库路径（进程间去重）
+        offline_queue: 离线上传队列，上传失败的图片会加入队列等待补传
+
+    Returns:
+        统计信息
+    """
+    safe_print(f"处理路径: {path}", level="info")
+    md_files = collect_markdown_files(path)
+    chunk_size = max(1, chunk_size)
+    chunks = [md_files[i : i + chunk_size] for i in range(0, len(md_files), chunk_size)]
+    processes = max(1, min(processes or os.cpu_count() or 1, len(chunks) or 1))
+    settings = {
+        "cache_path": os.path.abspath(cache_path),
+        "cache_namespace": ImageHostFactory.cache_namespace(
+            config_manager.get_image_host_config()
+        ),
+        "max_workers": max_workers,
+        "convert_to_wp": convert_to_wp,
+        "remove_wp": remove_wp,
+        "image_path_prefix": image_path_prefix,
+    }
+    safe_print(f"使用 {processes} 个进程处理 {len(chunks)} 个分片", level="info")
+
+    stats = dict.fromkeys(
+        ("notes", "changed_notes", "images", "uploaded", "reused", "failed"), 0
+    )
+    done_files = 0
+    with ProcessPoolExecutor(
+        max_workers=processes,
+        initializer=_init_worker,
+        initargs=(config_manager, processes, settings),
+    ) as executor:
+        futures = {executor.submit(_process_chunk, chunk): chunk for chunk in chunks}
+        for future in as_completed(futures):
+            done_files += len(futures[future])
+            try:
+                result = future.result()
+            except Exception as e:
+                safe_print(f"分片处理失败: {str(e)} ❌", level="error")
+                continue
+            for key, value in result["stats"].items():
+                stats[key] += value
+            metrics.merge_run(result["uploads"], result["cache_hits"])
+            if offline_queue is not None:
+                for local_path, file_path, span, error in result["failed"]:
+                    offline_queue.add(
+                        local_path, file_path, span, error, convert_to_wp=convert_to_wp
+                    )
+            safe_print(f"已处理 {done_files}/{len(md_files)} 个文件", level="info")
+
+    if offline_queue is not None:
+        offline_queue.save()
+    safe_print(
+        f"共处理 {stats['notes']} 个文件，更新 {stats['changed_notes']} 个，"
+        f"上传 {stats['uploaded']} 张图片，复用 {stats['reused']} 张，"
+        f"失败 {stats['failed']} 张",
+        level="info",
+    )
+    return stats
@@ -0,0 +1,277 @@
+"""
+笔记写回
+改写结果先写入同目录的临时文件，批量 fsync 后再重命名替换原笔记（原子写入，崩溃不会留下截断的笔记）；
+替换前检查笔记自读取以来是否被修改（如上传期间 Obsidian 保存了笔记），
+被修改时在最新内容上重新应用改写，而不是覆盖用户的编辑
+"""
+import os
+import shutil
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from metrics import metrics
+from uploader import safe_print
+
+# 累计多少个待写入的笔记后执行一次 fsync 和替换
+DEFAULT_BATCH_SIZE = 32
+
+# 笔记版本：(修改时间纳秒, 文件大小)
+NoteVersion = Tuple[int, int]
+
+
+def note_version(file_path: str) -> Optional[NoteVersion]:
+    """获取笔记当前版本，文件不存在时返回None"""
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def read_note(file_path: str) -> Tuple[str, Optional[NoteVersion]]:
+    """
+    读取笔记内容和版本（先取版本再读取，读取期间发生的修改会在写回时被发现）
+
+    Args:
+        file_path: 笔记路径
+
+    Returns:
+        (内容, 版本)
+    """
+    version = note_version(file_path)
+    with open(file_path, "r", encoding="utf-8") as f:
+        return f.read(), version
+
+
+def apply_edits(content: str, edits: Iterable[Tuple[str, str]]) -> str:
+    """
+    依次应用替换（原始图片标记 → 上传后的链接）
+
+    Args:
+        content: 笔记内容
+        edits: [(原文本, 新文本), ...]
+
+    Returns:
+        替换后的内容
+    """
+    for old_text, new_text in edits:
+        content = content.replace(old_text, new_text)
+    return content
+
+
+class _PendingWrite:
+    """已写入临时文件、等待替换的笔记"""
+
+    def __init__(self, file_path, tmp_path, handle, version, reapply):
+        self.file_path = file_path
+        self.tmp_path = tmp_path
+        self.handle = handle
+        self.version = version
+        self.reapply = reapply
+
+
+class NoteWriter:
+    """批量原子写回笔记，写回前检测并合并并发修改（线程安全）"""
+
+    WRITTEN = "written"
+    MERGED = "merged"
+    SKIPPED = "skipped"
+    FAILED = "failed"
+
+    def __init__(
+        self,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        durable: bool = True,
+        on_commit: Optional[Callable[[str, str], None]] = None,
+    ):
+        """
+        初始化写回器
+
+        Args:
+            batch_size: 待写入的笔记达到该数量时自动执行一次批量提交
+            durable: 是否在替换前 fsync 临时文件、替换后 fsync 目录
+            on_commit: 每篇笔记提交（或写入失败）后的回调，参数为 (笔记路径, 结果)
+        """
+        self.batch_size = max(1, batch_size)
+        self.durable = durable
+        self.on_commit = on_commit
+        self.stats = dict.fromkeys((self.WRITTEN, self.MERGED, self.SKIPPED, self.FAILED), 0)
+        self._pending: List[_PendingWrite] = []
+        self._lock = threading.Lock()
+
+    def write(
+        self,
+        file_path: str,
+        new_content: str,
+        version: Optional[NoteVersion],
+        reapply: Callable[[str], str],
+    ):
+        """
+        写入临时文件，等待批量提交
+
+        Args:
+            file_path: 笔记路径
+            new_content: 改写后的内容
+            version: 读取笔记时的版本（read_note 的返回值）
+            reapply: 笔记被修改时，在最新内容上重新应用改写的函数
+        """
+        tmp_path = f"{file_path}.md2picgo-{os.getpid()}-{threading.get_ident()}.tmp"
+        handle = None
+        try:
+            handle = open(tmp_path, "w", encoding="utf-8")
+            handle.write(new_content)
+            handle.flush()
+        except OSError as e:
+            if handle is not None:
+                handle.close()
+            self._discard(tmp_path)
+            self._fail(file_path, e)
+            if self.on_commit is not None:
+                self.on_commit(file_path, self.FAILED)
+            return
+        try:
+            shutil.copymode(file_path, tmp_path)
+        except OSError:
+            pass
+
+        with self._lock:
+            self._pending.append(_PendingWrite(file_path, tmp_path, handle, version, reapply))
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self.flush()
+
+    def flush(self) -> Dict[str, str]:
+        """
+        提交所有待写入的笔记：批量 fsync 临时文件，检查冲突后逐个替换，最后 fsync 目录
+
+        Returns:
+            {笔记路径: 结果}，结果为 written、merged、skipped 或 failed
+        """
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return {}
+
+        for item in pending:
+            try:
+                if self.durable:
+                    os.fsync(item.handle.fileno())
+            except OSError:
+                pass
+            finally:
+                item.handle.close()
+
+        results = {}
+        directories = set()
+        for item in pending:
+            status = self._commit(item)
+            results[item.file_path] = status
+            with self._lock:
+                self.stats[status] += 1
+                if status == self.MERGED:
+                    self.stats[self.WRITTEN] += 1
+            if status in (self.WRITTEN, self.MERGED):
+                directories.add(os.path.dirname(os.path.abspath(item.file_path)))
+                metrics.notes_rewritten.inc()
+            if self.on_commit is not None:
+                self.on_commit(item.file_path, status)
+
+        if self.durable:
+            for directory in directories:
+                self._fsync_directory(directory)
+        return results
+
+    def _commit(self, item: _PendingWrite) -> str:
+        """检查冲突并替换一篇笔记"""
+        file_name = os.path.basename(item.file_path)
+        status = self.WRITTEN
+        try:
+            current = note_version(item.file_path)
+            if current is None:
+                # 笔记在处理期间被删除或移动，不重新创建
+                self._discard(item.tmp_path)
+                safe_print(f"笔记已被删除或移动，跳过写回: {file_name} ⚠️", level="warning")
+                return self.SKIPPED
+            if current != item.version:
+                fresh, _ = read_note(item.file_path)
+                merged = item.reapply(fresh)
+                if merged == fresh:
+                    self._discard(item.tmp_path)
+                    safe_print(f"笔记已被修改且无需改写: {file_name} ℹ️", level="info")
+                    return self.SKIPPED
+                with open(item.tmp_path, "w", encoding="utf-8") as f:
+                    f.write(merged)
+                    if self.durable:
+                        f.flush()
+                        os.fsync(f.fileno())
+                status = self.MERGED
+            os.replace(item.tmp_path, item.file_path)
+        except (OSError, UnicodeDecodeError) as e:
+            self._discard(item.tmp_path)
+            self._fail(item.file_path, e, count=False)
+            return self.FAILED
+
+        if status == self.MERGED:
+            safe_print(
+                f"笔记在处理期间被修改，已在最新内容上重新应用改写: {file_name} ✅",
+                level="success",
+            )
+        else:
+            safe_print(f"文件已更新: {file_name} ✅", level="success")
+        return status
+
+    def _fail(self, file_path: str, error: Exception, count: bool = True):
+        if count:
+            with self._lock:
+                self.stats[self.FAILED] += 1
+        safe_print(
+            f"写入文件失败: {os.path.basename(file_path)} {str(error)} ❌", level="error"
+        )
+
+    @staticmethod
+    def _discard(tmp_path: str):
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+    @staticmethod
+    def _fsync_directory(directory: str):
+        """fsync 目录，确保重命名持久化（Windows 不支持打开目录，忽略）"""
+        try:
+            fd = os.open(directory, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+    def close(self):
+        """提交剩余的笔记"""
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def write_note(
+    file_path: str,
+    new_content: str,
+    version: Optional[NoteVersion],
+    reapply: Callable[[str], str],
+) -> str:
+    """
+    原子写回单篇笔记（检测并合并并发修改）
+
+    Returns:
+        结果：written、merged、skipped 或 failed
+    """
+    writer = NoteWriter()
+    writer.write(file_path, new_content, version, reapply)
+    return writer.flush().get(file_path, NoteWriter.FAILED)
@@ -0,0 +1,296 @@
+"""
+离线上传队列
+图床不可达时把失败的图片及引用它的笔记位置保存到本地，
+图床恢复后由后台线程补传并改写笔记
+"""
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import requests
+
+from file_memo import file_memo
+from image_hosts.circuit_breaker import CircuitOpenError
+from note_writer import NoteWriter, read_note, write_note
+from uploader import picgo_breaker, safe_print, upload_with_host
+from wordpress_processor import WordPressLinkProcessor
+
+# 补传失败达到该次数的图片不再自动重试（保留在队列文件中，标记为 parked）
+DEFAULT_MAX_ATTEMPTS = 5
+
+# 说明图床不可达的异常，遇到时停止本轮补传
+UNREACHABLE_ERRORS = (
+    CircuitOpenError,
+    ConnectionError,
+    TimeoutError,
+    requests.ConnectionError,
+    requests.Timeout,
+)
+
+
+def is_unreachable(error: BaseException) -> bool:
+    """
+    判断上传失败是否因为图床不可达（检查异常及其 __cause__、__context__）
+
+    Args:
+        error: 上传时抛出的异常
+
+    Returns:
+        是否为网络不可达或熔断
+    """
+    seen = set()
+    while error is not None and id(error) not in seen:
+        if isinstance(error, UNREACHABLE_ERRORS):
+            return True
+        seen.add(id(error))
+        error = error.__cause__ or error.__context__
+    return False
+
+
+class OfflineQueue:
+    """持久化的离线上传队列（JSON文件），按图片路径合并引用"""
+
+    def __init__(
+        self, queue_path: str = "offline_queue.json", max_attempts: int = DEFAULT_MAX_ATTEMPTS
+    ):
+        """
+        初始化队列
+
+        Args:
+            queue_path: 队列文件路径
+            max_attempts: 补传失败达到该次数后不再自动重试
+        """
+        self.queue_path = queue_path
+        self.max_attempts = max(1, max_attempts)
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._dirty = False
+        self._entries: Dict[str, Dict[str, Any]] = self._load()
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if not os.path.exists(self.queue_path):
+            return {}
+        try:
+            with open(self.queue_path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+            return entries if isinstance(entries, dict) else {}
+        except (OSError, json.JSONDecodeError) as e:
+            safe_print(f"离线队列文件损坏，已忽略: {str(e)}", level="warning")
+            return {}
+
+    def __len__(self) -> int:
+        """等待补传的图片数（不含已放弃自动重试的图片）"""
+        with self._lock:
+            return sum(not entry.get("parked") for entry in self._entries.values())
+
+    def add(
+        self,
+        image_path: str,
+        note_path: str,
+        span: str,
+        error: str = "",
+        convert_to_wp: bool = False,
+    ):
+        """
+        加入一条待上传记录
+
+        Args:
+            image_path: 图片本地路径
+            note_path: 引用该图片的笔记路径
+            span: 笔记中的原始图片标记，上传成功后被替换
+            error: 失败原因
+            convert_to_wp: 补传后是否转换为WordPress格式
+        """
+        reference = {"note": note_path, "span": span, "wordpress": convert_to_wp}
+        with self._lock:
+            entry = self._entries.setdefault(
+                image_path,
+                {"image_path": image_path, "notes": [], "attempts": 0, "queued_at": time.time()},
+            )
+            if reference not in entry["notes"]:
+                entry["notes"].append(reference)
+            entry["last_error"] = error
+            # 重新处理时再次失败，重新开始自动重试
+            if entry.pop("parked", False):
+                entry["attempts"] = 0
+            self._dirty = True
+
+    def save(self):
+        """保存队列到文件（有改动时才写入；多个线程同时保存时依次写入，后写入的是较新的内容）"""
+        with self._save_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                data = json.loads(json.dumps(self._entries))
+                self._dirty = False
+            # 临时文件名区分进程和线程，多个进程共用同一队列文件时不会互相覆盖
+            tmp_path = f"{self.queue_path}.{os.getpid()}-{threading.get_ident()}.tmp"
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(data, f, indent=2, ensure_ascii=False)
+                os.replace(tmp_path, self.queue_path)
+            except OSError:
+                with self._lock:
+                    self._dirty = True
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+                raise
+
+    def pending(self) -> List[Dict[str, Any]]:
+        """获取所有待上传记录（按加入时间排序，不含已放弃自动重试的图片）"""
+        with self._lock:
+            entries = [
+                dict(entry) for entry in self._entries.values() if not entry.get("parked")
+            ]
+        return sorted(entries, key=lambda entry: entry["queued_at"])
+
+    def parked(self) -> List[Dict[str, Any]]:
+        """获取补传失败次数达到上限、不再自动重试的记录"""
+        with self._lock:
+            entries = [dict(entry) for entry in self._entries.values() if entry.get("parked")]
+        return sorted(entries, key=lambda entry: entry["queued_at"])
+
+    def _remove(self, image_path: str):
+        with self._lock:
+            self._entries.pop(image_path, None)
+            self._dirty = True
+
+    def _record_attempt(self, image_path: str, error: str):
+        with self._lock:
+            entry = self._entries.get(image_path)
+            if not entry:
+                return
+            entry["attempts"] += 1
+            entry["last_error"] = error
+            self._dirty = True
+            parked = entry["attempts"] >= self.max_attempts
+            if parked:
+                entry["parked"] = True
+        if parked:
+            safe_print(
+                f"离线队列中的图片补传失败 {self.max_attempts} 次，不再自动重试: "
+                f"{os.path.basename(image_path)} ({error}) ❌",
+                level="error",
+            )
+
+    @staticmethod
+    def _patch_note(reference: Dict[str, Any], url: str) -> bool:
+        """把笔记中的原始图片标记替换为上传后的链接"""
+        note_path = reference["note"]
+        if reference.get("wordpress"):
+            url = WordPressLinkProcessor.convert_to_wordpress(url)
+        try:
+            content, version = read_note(note_path)
+        except (OSError, UnicodeDecodeError) as e:
+            safe_print(f"读取笔记失败: {note_path} {str(e)} ❌", level="error")
+            return False
+
+        # 笔记在排队期间可能已被修改，原始标记不存在时不做处理
+        if reference["span"] not in content:
+            return False
+
+        def rewrite(text):
+            return text.replace(reference["span"], f"![]({url})")
+
+        status = write_note(note_path, rewrite(content), version, rewrite)
+        return status in (NoteWriter.WRITTEN, NoteWriter.MERGED)
+
+    def flush(self, image_host=None) -> int:
+        """
+        补传队列中的图片并改写笔记；图床不可达或已熔断时停止，其他原因的失败
+        （文件损坏、格式或大小被拒绝等）只记录失败次数并继续补传后面的图片
+
+        Args:
+            image_host: 图床适配器实例
+
+        Returns:
+            成功补传的图片数量
+        """
+        if not self._flush_lock.acquire(blocking=False):
+            return 0
+        uploaded = 0
+        try:
+            for entry in self.pending():
+                image_path = entry["image_path"]
+                if not file_memo.exists(image_path):
+                    safe_print(f"离线队列中的图片已不存在: {image_path}", level="warning")
+                    self._remove(image_path)
+                    continue
+
+                unreachable = False
+                try:
+                    url = upload_with_host(image_path, image_host)
+                    error = "" if url else "upload failed"
+                    # 默认的PicGo上传失败时不抛出异常，按其熔断器判断服务是否可用
+                    unreachable = not url and image_host is None and picgo_breaker.is_open
+                except Exception as e:
+                    url = None
+                    error = str(e)
+                    unreachable = is_unreachable(e)
+
+                if not url:
+                    if unreachable:
+                        safe_print(f"图床不可达，暂停补传: {error}", level="warning")
+                        break
+                    self._record_attempt(image_path, error)
+                    continue
+
+                uploaded += 1
+                patched = sum(self._patch_note(ref, url) for ref in entry["notes"])
+                safe_print(
+                    f"补传成功: {os.path.basename(image_path)}，更新 {patched} 篇笔记 ✅",
+                    level="success",
+                )
+                self._remove(image_path)
+        finally:
+            self.save()
+            self._flush_lock.release()
+        return uploaded
+
+
+class OfflineFlusher(threading.Thread):
+    """后台补传线程，定期尝试清空离线队列"""
+
+    def __init__(
+        self,
+        offline_queue: OfflineQueue,
+        host_factory: Callable[[], Optional[Any]],
+        interval: float = 60,
+    ):
+        """
+        初始化补传线程
+
+        Args:
+            offline_queue: 离线队列
+            host_factory: 创建图床实例的函数（每次补传时调用，以使用最新配置）
+            interval: 检查间隔（秒）
+        """
+        super().__init__(name="offline-flusher", daemon=True)
+        self.offline_queue = offline_queue
+        self.host_factory = host_factory
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            if not len(self.offline_queue):
+                continue
+            try:
+                uploaded = self.offline_queue.flush(self.host_factory())
+            except Exception as e:
+                safe_print(f"离线队列补传出错: {str(e)} ❌", level="error")
+                continue
+            if uploaded:
+                remaining = len(self.offline_queue)
+                safe_print(
+                    f"离线队列已补传 {uploaded} 张图片，剩余 {remaining} 张", level="info"
+                )
+
+    def stop(self):
+        """停止补传线程"""
+        self._stop_event.set()
@@ -0,0 +1,160 @@
+"""
+输出目录模式
+改写后的笔记写入独立的输出目录，源仓库保持不变；
+未改写的笔记和附件以硬链接（或 reflink）方式放入输出目录，无需复制文件内容
+"""
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable
+
+from uploader import safe_print
+
+# 链接文件时的并行线程数（只涉及元数据操作）
+DEFAULT_LINK_WORKERS = 8
+
+# Linux FICLONE ioctl，在支持的文件系统（btrfs、xfs 等）上创建共享数据块的副本
+_FICLONE = 0x40049409
+
+
+def write_atomic(path: str, content: str):
+    """
+    原子写入文本文件：先写临时文件再重命名，中途出错不会留下截断的文件
+
+    目标是指向源文件的硬链接时，重命名只替换输出目录中的链接，不会修改源文件
+
+    Args:
+        path: 目标路径
+        content: 文件内容
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    try:
+        with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _reflink(src: str, dst: str):
+    """创建 reflink 副本，不支持时抛出 OSError"""
+    try:
+        import fcntl
+    except ImportError:
+        raise OSError("reflink is not supported on this platform")
+    with open(src, "rb") as source, open(dst, "wb") as target:
+        try:
+            fcntl.ioctl(target.fileno(), _FICLONE, source.fileno())
+        except OSError:
+            target.close()
+            os.remove(dst)
+            raise
+    shutil.copystat(src, dst)
+
+
+def link_file(src: str, dst: str) -> str:
+    """
+    把源文件放入输出目录：依次尝试硬链接、reflink，都不支持时复制
+
+    Args:
+        src: 源文件路径
+        dst: 目标路径
+
+    Returns:
+        使用的方式：hardlink、reflink、copy，目标已是同一文件时为 unchanged
+    """
+    try:
+        if os.path.samefile(src, dst):
+            return "unchanged"
+    except OSError:
+        pass
+
+    os.makedirs(os.path.dirname(dst) or ".", exist_ok=True)
+    tmp_path = f"{dst}.tmp{os.getpid()}"
+    if os.path.lexists(tmp_path):
+        os.remove(tmp_path)
+    try:
+        try:
+            os.link(src, tmp_path)
+            method = "hardlink"
+        except OSError:
+            try:
+                _reflink(src, tmp_path)
+                method = "reflink"
+            except OSError:
+                shutil.copy2(src, tmp_path)
+                method = "copy"
+        os.replace(tmp_path, dst)
+    except BaseException:
+        if os.path.lexists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return method
+
+
+class OutputTree:
+    """源仓库到输出目录的路径映射"""
+
+    def __init__(self, source_root: str, output_dir: str):
+        """
+        初始化输出目录
+
+        Args:
+            source_root: 源仓库根目录
+            output_dir: 输出目录，保持与源仓库相同的目录结构
+        """
+        self.source_root = os.path.abspath(source_root)
+        self.output_dir = os.path.abspath(output_dir)
+        if os.path.normcase(self.source_root) == os.path.normcase(self.output_dir):
+            raise ValueError("output directory must differ from the source directory")
+
+    def target_for(self, file_path: str) -> str:
+        """计算源文件在输出目录中的路径"""
+        relative = os.path.relpath(os.path.abspath(file_path), self.source_root)
+        return os.path.join(self.output_dir, relative)
+
+    def _source_files(self) -> Iterable[str]:
+        """遍历源仓库中的所有文件（跳过位于源仓库内的输出目录）"""
+        output_dir = os.path.normcase(self.output_dir)
+        for root, dirs, files in os.walk(self.source_root):
+            dirs[:] = [
+                name
+                for name in dirs
+                if os.path.normcase(os.path.join(root, name)) != output_dir
+            ]
+            for name in files:
+                yield os.path.join(root, name)
+
+    def mirror(
+        self, skip: Iterable[str] = (), max_workers: int = DEFAULT_LINK_WORKERS
+    ) -> Dict[str, int]:
+        """
+        把源仓库中的文件并行链接到输出目录
+
+        Args:
+            skip: 不需要链接的源文件（已写入改写结果的笔记）
+            max_workers: 并行线程数
+
+        Returns:
+            {方式: 文件数}
+        """
+        skipped = {os.path.normcase(os.path.abspath(path)) for path in skip}
+        files = [
+            path for path in self._source_files() if os.path.normcase(path) not in skipped
+        ]
+
+        def link(src):
+            try:
+                return link_file(src, self.target_for(src))
+            except OSError as e:
+                safe_print(f"链接文件失败: {src} {str(e)} ❌", level="error")
+                return "failed"
+
+        counts = dict.fromkeys(("hardlink", "reflink", "copy", "unchanged", "failed"), 0)
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            for method in executor.map(link, files):
+                counts[method] += 1
+        return counts
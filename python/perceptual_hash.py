@@ -0,0 +1,208 @@
+"""
+感知哈希近似重复检测
+对图片计算差值哈希（dHash），重新编码、轻微裁剪或缩放后的同一张截图哈希值相近；
+感知哈希和图片尺寸保存在上传缓存中，与已上传图片的汉明距离不超过阈值且宽高比一致时
+直接复用其URL；需要安装 Pillow，未安装时不启用
+"""
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from uploader import safe_print
+
+# 图片指纹：(感知哈希, 宽, 高)
+Fingerprint = Tuple[str, int, int]
+
+# 默认的最大汉明距离（64位哈希中不同的位数）
+DEFAULT_MAX_DISTANCE = 2
+
+# 近似图片宽高比允许的相对误差（缩放后宽高比不变，轻微裁剪只有小幅变化）
+ASPECT_TOLERANCE = 0.05
+
+# 哈希边长，得到 HASH_SIZE * HASH_SIZE 位的哈希
+HASH_SIZE = 8
+
+
+def pillow_available() -> bool:
+    """是否已安装 Pillow"""
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def compute_fingerprint(file_path: str) -> Optional[Fingerprint]:
+    """
+    计算图片的差值哈希和尺寸（模块级函数，可在进程池中执行）
+
+    Args:
+        file_path: 图片路径
+
+    Returns:
+        (十六进制哈希值, 宽, 高)；未安装 Pillow 或无法解码（如SVG）时返回None
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    try:
+        with Image.open(file_path) as image:
+            width, height = image.size
+            image = image.convert("L").resize((HASH_SIZE + 1, HASH_SIZE), Image.BILINEAR)
+            pixels = list(image.getdata())
+    except Exception:
+        return None
+
+    bits = 0
+    for row in range(HASH_SIZE):
+        offset = row * (HASH_SIZE + 1)
+        for col in range(HASH_SIZE):
+            bits = (bits << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return f"{bits:0{HASH_SIZE * HASH_SIZE // 4}x}", width, height
+
+
+def hash_image(file_path: str) -> Tuple[str, Optional[Fingerprint]]:
+    """计算 (内容哈希, 指纹)（模块级函数，可在进程池中执行）"""
+    from pipeline import hash_file
+
+    return hash_file(file_path), compute_fingerprint(file_path)
+
+
+def _similar_aspect(a: Fingerprint, b: Tuple[int, int]) -> bool:
+    """两张图片的宽高比是否一致（允许 ASPECT_TOLERANCE 的误差）"""
+    if not (a[1] and a[2] and b[0] and b[1]):
+        return False
+    ratio = (a[1] / a[2]) / (b[0] / b[1])
+    return abs(ratio - 1) <= ASPECT_TOLERANCE
+
+
+def _safe_hash_image(file_path: str) -> Optional[Tuple[str, Optional[Fingerprint]]]:
+    try:
+        return hash_image(file_path)
+    except OSError:
+        return None
+
+
+class NearDuplicateIndex:
+    """
+    基于上传缓存的近似重复图片查找（线程安全）
+
+    计算指纹的进程池在首次使用时创建，整个运行期间共用，close 后下次使用时重新创建
+    """
+
+    def __init__(
+        self, cache, max_distance: int = DEFAULT_MAX_DISTANCE, processes: int = 0
+    ):
+        """
+        初始化索引
+
+        Args:
+            cache: 上传缓存（UploadCache），保存感知哈希和URL
+            max_distance: 视为近似重复的最大汉明距离，0表示只复用完全相同的图片
+            processes: 计算指纹的进程数，0表示CPU核心数
+        """
+        self.cache = cache
+        self.max_distance = max(0, max_distance)
+        self.processes = processes or os.cpu_count() or 1
+        # [(感知哈希整数, 宽, 高, URL), ...]
+        self._entries: List[Tuple[int, int, int, str]] = []
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+
+    def _get_pool(self) -> Optional[ProcessPoolExecutor]:
+        """共用的进程池（只配置了一个进程时不使用进程池）"""
+        if self.processes < 2:
+            return None
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.processes)
+            return self._pool
+
+    def _load(self):
+        """加载上传缓存中新增的感知哈希（其他进程写入的记录也会被加载）"""
+        rows = self.cache.phashes(self._loaded_at)
+        for _, phash, url, updated_at, width, height in rows:
+            self._entries.append((int(phash, 16), width or 0, height or 0, url))
+            self._loaded_at = max(self._loaded_at, updated_at)
+
+    def find(
+        self, digest: str, fingerprint: Optional[Fingerprint]
+    ) -> Optional[Tuple[str, int]]:
+        """
+        查找已上传的相同或近似图片（近似图片还需宽高比一致）
+
+        Args:
+            digest: 内容哈希
+            fingerprint: 图片指纹，为None时只按内容哈希查找
+
+        Returns:
+            (URL, 汉明距离)，内容完全相同时距离为0；未找到时返回None
+        """
+        url = self.cache.get(digest)
+        if url:
+            return url, 0
+        if fingerprint is None:
+            return None
+
+        value = int(fingerprint[0], 16)
+        with self._lock:
+            self._load()
+            best = None
+            for other, width, height, other_url in self._entries:
+                distance = bin(value ^ other).count("1")
+                if distance > self.max_distance or (best is not None and distance >= best[1]):
+                    continue
+                if _similar_aspect(fingerprint, (width, height)):
+                    best = (other_url, distance)
+        return best
+
+    def remember(self, digest: str, fingerprint: Optional[Fingerprint], url: str):
+        """记录新上传图片的指纹和URL（下次查找时从上传缓存加载）"""
+        phash, width, height = fingerprint or (None, None, None)
+        self.cache.store(digest, url, phash, width, height)
+
+    def fingerprint(self, file_path: str) -> Optional[Fingerprint]:
+        """在共用的进程池中计算一张图片的指纹"""
+        pool = self._get_pool()
+        if pool is None:
+            return compute_fingerprint(file_path)
+        return pool.submit(compute_fingerprint, file_path).result()
+
+    def hash_images(
+        self, paths: Iterable[str]
+    ) -> Dict[str, Tuple[str, Optional[Fingerprint]]]:
+        """
+        在共用的进程池中批量计算 (内容哈希, 指纹)
+
+        Args:
+            paths: 图片路径
+
+        Returns:
+            {图片路径: (内容哈希, 指纹)}，读取失败的图片不包含在内
+        """
+        paths = list(dict.fromkeys(paths))
+        pool = self._get_pool() if len(paths) > 1 else None
+        hashed = list((pool.map if pool else map)(_safe_hash_image, paths))
+        return {path: value for path, value in zip(paths, hashed) if value is not None}
+
+    def close(self):
+        """关闭进程池和当前线程的缓存连接（之后仍可继续使用，会重新创建）"""
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown()
+        self.cache.close()
+
+
+def create_near_duplicate_index(
+    cache, max_distance: int = DEFAULT_MAX_DISTANCE, processes: int = 0
+) -> Optional[NearDuplicateIndex]:
+    """创建近似重复索引，未安装 Pillow 时提示并返回None"""
+    if not pillow_available():
+        safe_print("近似重复检测需要 Pillow，请运行: pip install Pillow", level="warning")
+        return None
+    return NearDuplicateIndex(cache, max_distance=max_distance, processes=processes)
@@ -0,0 +1,666 @@
+"""
+分阶段处理流水线
+扫描 → 解析路径 → 计算哈希 → 转换 → 上传 → 改写 → 写回，
+各阶段通过有界队列连接，队列满时上游阻塞等待（背压），避免无限制地缓存任务
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from file_memo import file_memo
+from image_formats import hash_and_detect, is_allowed
+from metrics import metrics
+from note_writer import NoteWriter, apply_edits, read_note
+from scheduler import SizeAwareQueue, DEFAULT_LARGE_FILE_THRESHOLD
+from tracing import tracer
+from uploader import (
+    safe_print,
+    find_local_images,
+    resolve_image_path,
+    upload_with_host,
+    apply_wordpress_links,
+)
+
+# 阶段结束标记
+_SENTINEL = object()
+
+
+def hash_file(file_path: str) -> str:
+    """
+    计算文件内容的SHA-256（模块级函数，可在进程池中执行），
+    读取时同时识别图片格式；文件未变化时直接返回缓存的结果，见 file_memo
+
+    Args:
+        file_path: 文件路径
+
+    Returns:
+        十六进制哈希值
+    """
+    return file_memo.hash(file_path)[0]
+
+
+def _describe(item: Any) -> str:
+    """生成任务的简短描述，用于追踪信息"""
+    if isinstance(item, ImageJob):
+        return item.raw_path
+    if isinstance(item, NoteJob):
+        return os.path.basename(item.file_path)
+    return os.path.basename(str(item))
+
+
+class NoteJob:
+    """一篇笔记的处理状态"""
+
+    def __init__(self, file_path: str, content: str, version=None):
+        self.file_path = file_path
+        self.content = content
+        self.version = version
+        self.images: List["ImageJob"] = []
+        self.pending = 0
+        self.new_content: Optional[str] = None
+        self.edits: List = []
+        # 处理出错、已按失败结束的笔记，之后完成的图片不再触发改写
+        self.failed = False
+        self.lock = threading.Lock()
+
+
+class ImageJob:
+    """笔记中一处本地图片引用的处理状态"""
+
+    def __init__(self, note: NoteJob, match_text: str, raw_path: str):
+        self.note = note
+        self.match_text = match_text
+        self.raw_path = raw_path
+        self.local_path: Optional[str] = None
+        self.size = 0
+        self.digest: Optional[str] = None
+        self.format: Optional[str] = None
+        # 近似重复检测使用的指纹 (感知哈希, 宽, 高)
+        self.fingerprint: Optional[Tuple[str, int, int]] = None
+        self.upload_path: Optional[str] = None
+        self.url: Optional[str] = None
+        self.error: Optional[str] = None
+        # 处理结果：uploaded、reused、skipped 或 failed
+        self.status: Optional[str] = None
+        # 是否已结束处理并交给改写阶段
+        self.finished = False
+
+
+class Stage:
+    """流水线阶段：多个工作线程从有界输入队列取任务并处理"""
+
+    EXECUTORS = ("thread", "process")
+
+    def __init__(
+        self,
+        name: str,
+        handler: Callable[[Any], None],
+        workers: int = 1,
+        executor: str = "thread",
+        queue_size: int = 64,
+        work_queue=None,
+        on_error: Optional[Callable[[str, Any, Exception], None]] = None,
+    ):
+        """
+        初始化阶段
+
+        Args:
+            name: 阶段名称
+            handler: 任务处理函数，由处理函数自行把结果放入下游阶段
+            workers: 工作线程数（进程模式下同时也是进程数）
+            executor: 执行器类型，thread 或 process；process 模式下
+                      CPU密集的计算通过 run_cpu 提交到进程池
+            queue_size: 输入队列容量
+            work_queue: 自定义输入队列（如按大小调度的队列），为None时使用FIFO队列
+            on_error: 处理函数抛出异常时的回调，参数为 (阶段名称, 任务, 异常)，
+                      用于把任务按失败结束，避免任务丢失
+        """
+        if executor not in self.EXECUTORS:
+            raise ValueError(f"Unsupported executor type for stage {name}: {executor}")
+        self.name = name
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.executor = executor
+        self.queue = work_queue or queue.Queue(maxsize=max(1, queue_size))
+        self.on_error = on_error
+        self._threads: List[threading.Thread] = []
+        self._pool: Optional[ProcessPoolExecutor] = None
+        # 已放入但尚未处理完的任务数
+        self._outstanding = 0
+        self._outstanding_lock = threading.Lock()
+
+    def start(self):
+        """启动工作线程（以及进程池）"""
+        if self.executor == "process":
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        for i in range(self.workers):
+            thread = threading.Thread(
+                target=self._run, name=f"{self.name}-{i}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def put(self, item: Any):
+        """放入任务，队列已满时阻塞"""
+        if tracer.enabled and hasattr(item, "__dict__"):
+            item.queued_at = time.perf_counter()
+        with self._outstanding_lock:
+            self._outstanding += 1
+        self.queue.put(item)
+
+    def idle(self) -> bool:
+        """是否没有排队或正在处理的任务"""
+        with self._outstanding_lock:
+            return self._outstanding == 0
+
+    def run_cpu(self, func: Callable, *args):
+        """
+        执行CPU密集的计算，进程模式下提交到进程池
+
+        Args:
+            func: 可序列化的模块级函数
+            args: 函数参数
+
+        Returns:
+            函数返回值
+        """
+        if self._pool:
+            return self._pool.submit(func, *args).result()
+        return func(*args)
+
+    def close(self):
+        """通知所有工作线程：上游已无新任务"""
+        for _ in self._threads:
+            self.queue.put(_SENTINEL)
+
+    def join(self):
+        """等待工作线程结束并关闭进程池"""
+        for thread in self._threads:
+            thread.join()
+        if self._pool:
+            self._pool.shutdown()
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is _SENTINEL:
+                break
+            try:
+                queued_at = getattr(item, "queued_at", None)
+                if queued_at is not None:
+                    # 任务在队列中等待空闲工作线程的时间
+                    tracer.complete(f"{self.name}.wait", queued_at, time.perf_counter())
+                with tracer.span(self.name, category="stage", item=_describe(item)):
+                    self.handler(item)
+            except Exception as e:
+                safe_print(f"{self.name} 阶段处理出错: {str(e)} ❌", level="error")
+                if self.on_error is not None:
+                    try:
+                        self.on_error(self.name, item, e)
+                    except Exception as error:
+                        safe_print(
+                            f"{self.name} 阶段结束出错的任务失败: {str(error)} ❌", level="error"
+                        )
+            finally:
+                # 处理函数先把结果放入下游阶段，再减少本阶段的计数
+                with self._outstanding_lock:
+                    self._outstanding -= 1
+
+
+class VaultPipeline:
+    """笔记仓库处理流水线"""
+
+    STAGES = ("scan", "resolve", "hash", "transform", "upload", "rewrite", "write")
+
+    DEFAULT_STAGE_CONFIG = {
+        "scan": {"workers": 2, "executor": "thread"},
+        "resolve": {"workers": 2, "executor": "thread"},
+        "hash": {"workers": 2, "executor": "thread"},
+        "transform": {"workers": 1, "executor": "thread"},
+        "upload": {"workers": 3, "executor": "thread"},
+        "rewrite": {"workers": 1, "executor": "thread"},
+        "write": {"workers": 2, "executor": "thread"},
+    }
+
+    def __init__(
+        self,
+        image_host=None,
+        max_workers: int = 3,
+        convert_to_wp: bool = False,
+        remove_wp: bool = False,
+        image_path_prefix: str = "",
+        stage_config: Optional[Dict[str, Dict[str, Any]]] = None,
+        queue_size: int = 64,
+        transform: Optional[Callable[[str], str]] = None,
+        large_file_threshold: int = DEFAULT_LARGE_FILE_THRESHOLD,
+        offline_queue=None,
+        output_tree=None,
+        reference_index=None,
+        near_duplicates=None,
+        on_image: Optional[Callable[[ImageJob], None]] = None,
+        on_note: Optional[Callable[[str, str], None]] = None,
+    ):
+        """
+        初始化流水线
+
+        Args:
+            image_host: 图床适配器实例
+            max_workers: 上传阶段的工作线程数
+            convert_to_wp: 是否转换为WordPress格式
+            remove_wp: 是否移除WordPress前缀
+            image_path_prefix: 图片路径前缀
+            stage_config: 各阶段配置 {阶段名: {"workers", "executor"}}
+            queue_size: 各阶段输入队列容量
+            transform: 上传前对图片的转换函数（如压缩），接收并返回图片路径；
+                       需为模块级函数才能在进程池中执行
+            large_file_threshold: 上传调度的大文件阈值（字节）
+            offline_queue: 离线上传队列，上传失败的图片会加入队列等待补传
+            output_tree: 输出目录（OutputTree），设置后改写结果写入输出目录，不修改源文件
+            reference_index: 图片引用反向索引（ReferenceIndex），笔记处理完成后记录其图片引用
+            near_duplicates: 近似重复索引（NearDuplicateIndex），哈希阶段同时在其共用的进程池中
+                             计算指纹，与已上传图片相同或近似时复用其URL；运行结束后关闭其进程池
+            on_image: 每张图片处理完成后的回调，参数为图片任务（在工作线程中调用）
+            on_note: 每篇笔记处理完成后的回调，参数为 (笔记路径, 结果)，结果为 unchanged、
+                     written、merged、skipped 或 failed（在工作线程中调用）
+        """
+        self.image_host = image_host
+        self.convert_to_wp = convert_to_wp
+        self.remove_wp = remove_wp
+        self.image_path_prefix = image_path_prefix
+        self.transform = transform
+        self.offline_queue = offline_queue
+        self.output_tree = output_tree
+        self.reference_index = reference_index
+        self.near_duplicates = near_duplicates
+        self.on_image = on_image
+        self.on_note = on_note
+        # 输出目录模式下已写入改写结果的源文件
+        self.written: List[str] = []
+        self.note_writer = NoteWriter(on_commit=on_note)
+
+        config = {name: dict(value) for name, value in self.DEFAULT_STAGE_CONFIG.items()}
+        config["upload"]["workers"] = max_workers
+        for name, value in (stage_config or {}).items():
+            if name in config:
+                config[name].update(value)
+        if near_duplicates is not None:
+            # 哈希阶段的线程等待进程池计算指纹，线程数不少于进程数才能用满进程池
+            config["hash"]["workers"] = max(
+                config["hash"]["workers"], near_duplicates.processes
+            )
+
+        handlers = {
+            "scan": self._scan,
+            "resolve": self._resolve,
+            "hash": self._hash,
+            "transform": self._transform,
+            "upload": self._upload,
+            "rewrite": self._rewrite,
+            "write": self._write,
+        }
+        # 上传阶段按图片大小调度：大文件尽早开始，小文件优先完成整篇笔记
+        self.upload_queue = SizeAwareQueue(
+            queue_size,
+            config["upload"]["workers"],
+            size_of=lambda job: job.size,
+            pending_of=lambda job: job.note.pending,
+            sentinel=_SENTINEL,
+            large_threshold=large_file_threshold,
+        )
+        self.stages = {
+            name: Stage(
+                name,
+                handlers[name],
+                workers=config[name]["workers"],
+                executor=config[name]["executor"],
+                queue_size=queue_size,
+                work_queue=self.upload_queue if name == "upload" else None,
+                on_error=self._stage_failed,
+            )
+            for name in self.STAGES
+        }
+
+        # 同一内容的图片只上传一次：{哈希: {"event", "url"}}
+        self._uploads: Dict[str, Dict[str, Any]] = {}
+        self._uploads_lock = threading.Lock()
+
+        self.stats = {
+            "notes": 0,
+            "changed_notes": 0,
+            "images": 0,
+            "uploaded": 0,
+            "reused": 0,
+            "failed": 0,
+            "failed_notes": 0,
+        }
+        self._stats_lock = threading.Lock()
+
+    def _count(self, key: str, amount: int = 1):
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    def idle(self) -> bool:
+        """
+        流水线中是否没有未完成的笔记（写回阶段待批量提交的笔记除外）
+
+        按阶段顺序从上游到下游检查：任务只会从上游移到下游，检查期间移动的任务一定会在下游被看到
+        """
+        return all(self.stages[name].idle() for name in self.STAGES)
+
+    def run(self, md_files: Iterable[str]) -> Dict[str, int]:
+        """
+        处理笔记列表，所有笔记处理并写回后返回
+
+        Args:
+            md_files: Markdown文件路径列表，也可以是持续产生新笔记的迭代器（见 batch_job）
+
+        Returns:
+            统计信息
+        """
+        for stage in self.stages.values():
+            stage.start()
+
+        try:
+            scan = self.stages["scan"]
+            for file_path in md_files:
+                scan.put(str(file_path))
+        finally:
+            # 按顺序关闭：上游阶段全部结束后，下游才不会再收到新任务
+            for name in self.STAGES:
+                self.stages[name].close()
+                self.stages[name].join()
+            # 提交写回阶段尚未提交的笔记
+            self.note_writer.flush()
+            if self.output_tree is None:
+                self.stats["changed_notes"] = self.note_writer.stats[NoteWriter.WRITTEN]
+            if self.offline_queue is not None:
+                self.offline_queue.save()
+            if self.near_duplicates is not None:
+                self.near_duplicates.close()
+
+        return dict(self.stats)
+
+    # ---- 各阶段处理函数 ----
+
+    def _scan(self, file_path: str):
+        """读取笔记并查找本地图片"""
+        file_name = os.path.basename(file_path)
+        self._count("notes")
+        try:
+            content, version = read_note(file_path)
+        except UnicodeDecodeError as e:
+            safe_print(f"文件编码错误: {file_name} {str(e)} ❌", level="error")
+            self._note_failed(file_path)
+            return
+        except OSError as e:
+            # 列出笔记之后被删除、移动或无法读取
+            safe_print(f"读取文件失败: {file_name} {str(e)} ❌", level="error")
+            self._note_failed(file_path)
+            return
+
+        note = NoteJob(file_path, content, version)
+        matches = find_local_images(content, file_path, self.image_path_prefix)
+        note.images = [ImageJob(note, m.group(0), m.group(1)) for m in matches]
+        note.pending = len(note.images)
+
+        if not note.images:
+            # 没有本地图片的笔记直接进入改写阶段（处理WordPress链接）
+            self.stages["rewrite"].put(note)
+            return
+
+        safe_print(f"{file_name}: 发现 {len(note.images)} 张图片需要上传", level="info")
+        self._count("images", len(note.images))
+        for job in note.images:
+            self.stages["resolve"].put(job)
+
+    def _resolve(self, job: ImageJob):
+        """解析图片路径并检查文件是否存在"""
+        job.local_path = resolve_image_path(
+            job.raw_path, job.note.file_path, self.image_path_prefix
+        )
+        try:
+            job.size = file_memo.getsize(job.local_path)
+        except OSError:
+            job.error = "not found"
+            safe_print(f"图片不存在: {os.path.basename(job.local_path)} ❌", level="error")
+            self._finish_image(job)
+            return
+        self.stages["hash"].put(job)
+
+    def _hash(self, job: ImageJob):
+        """计算图片内容哈希并按文件头识别格式（启用近似重复检测时同时计算指纹）"""
+        try:
+            cached = file_memo.cached_hash(job.local_path)
+            if cached is None:
+                cached = self.stages["hash"].run_cpu(hash_and_detect, job.local_path)
+                # 进程池中的计算结果记录到当前进程，上传时设置 Content-Type 无需再读取文件头
+                file_memo.remember(job.local_path, *cached)
+            job.digest, job.format = cached
+            if self.near_duplicates is not None:
+                job.fingerprint = self.near_duplicates.fingerprint(job.local_path)
+        except OSError as e:
+            job.error = str(e)
+            safe_print(f"读取图片失败: {str(e)} ❌", level="error")
+            self._finish_image(job)
+            return
+        if job.format is not None and not is_allowed(job.format):
+            safe_print(
+                f"图片格式 {job.format} 不在允许上传的类型中，跳过: "
+                f"{os.path.basename(job.local_path)}",
+                level="warning",
+            )
+            self._finish_image(job)
+            return
+        self.stages["transform"].put(job)
+
+    def _transform(self, job: ImageJob):
+        """上传前转换图片（未配置转换函数时原样传递）"""
+        job.upload_path = job.local_path
+        if self.transform:
+            try:
+                job.upload_path = self.stages["transform"].run_cpu(
+                    self.transform, job.local_path
+                )
+            except Exception as e:
+                safe_print(f"图片转换失败，使用原图: {str(e)}", level="warning")
+                job.upload_path = job.local_path
+        self.stages["upload"].put(job)
+
+    def _upload(self, job: ImageJob):
+        """上传图片，相同内容只上传一次"""
+        try:
+            self._upload_job(job)
+        finally:
+            self.upload_queue.task_done(job)
+
+    def _upload_job(self, job: ImageJob):
+        file_name = os.path.basename(job.local_path)
+        key = job.digest or job.local_path
+
+        with self._uploads_lock:
+            entry = self._uploads.get(key)
+            owner = entry is None
+            if owner:
+                entry = {"event": threading.Event(), "url": None}
+                self._uploads[key] = entry
+
+        if owner:
+            try:
+                duplicate = None
+                if self.near_duplicates is not None and job.digest:
+                    duplicate = self.near_duplicates.find(job.digest, job.fingerprint)
+                if duplicate:
+                    entry["url"], distance = duplicate
+                    entry["reused"] = True
+                    job.status = "reused"
+                    kind = "相同" if distance == 0 else f"近似（汉明距离 {distance}）"
+                    safe_print(
+                        f"图片 {file_name} 与已上传的图片{kind}，复用链接 ♻️", level="info"
+                    )
+                else:
+                    safe_print(f"上传图片: {file_name}", level="info")
+                    entry["url"] = upload_with_host(job.upload_path, self.image_host)
+                    if entry["url"] and self.near_duplicates is not None and job.digest:
+                        self.near_duplicates.remember(
+                            job.digest, job.fingerprint, entry["url"]
+                        )
+            except Exception as e:
+                entry["error"] = str(e)
+                safe_print(f"处理图片时出错: {str(e)} ❌", level="error")
+            finally:
+                entry["event"].set()
+            if entry.get("reused"):
+                self._count("reused")
+                metrics.record_cache_hit()
+            elif entry["url"]:
+                job.status = "uploaded"
+                self._count("uploaded")
+                safe_print(f"图片 {file_name} 上传成功 ✅", level="success")
+        else:
+            entry["event"].wait()
+            if entry["url"]:
+                job.status = "reused"
+                self._count("reused")
+                metrics.record_cache_hit()
+
+        job.url = entry["url"]
+        if not job.url:
+            job.error = "upload failed"
+            if owner:
+                safe_print(f"图片 {file_name} 上传失败 ❌", level="error")
+            if self.offline_queue is not None:
+                self.offline_queue.add(
+                    job.local_path,
+                    job.note.file_path,
+                    job.match_text,
+                    entry.get("error") or job.error,
+                    convert_to_wp=self.convert_to_wp,
+                )
+        self._finish_image(job)
+
+    def _finish_image(self, job: ImageJob):
+        job.finished = True
+        if job.error:
+            job.status = "failed"
+            self._count("failed")
+        elif job.status is None:
+            job.status = "skipped"
+        if self.on_image is not None:
+            try:
+                self.on_image(job)
+            except Exception as e:
+                safe_print(f"图片回调出错: {str(e)}", level="warning")
+        self.stages["rewrite"].put(job)
+
+    def _note_done(self, file_path: str, status: str):
+        if self.on_note is not None:
+            self.on_note(file_path, status)
+
+    def _note_failed(self, file_path: str):
+        self._count("failed_notes")
+        self._note_done(file_path, NoteWriter.FAILED)
+
+    def _stage_failed(self, stage: str, item: Any, error: Exception):
+        """
+        处理函数抛出意外异常时按失败结束任务：图片按失败交给改写阶段（笔记其余图片照常处理），
+        扫描、改写或写回阶段出错时整篇笔记按失败结束
+        """
+        if isinstance(item, ImageJob) and stage != "rewrite":
+            if not item.finished:
+                item.error = str(error)
+                self._finish_image(item)
+            return
+
+        note = item.note if isinstance(item, ImageJob) else item
+        if isinstance(note, NoteJob):
+            with note.lock:
+                if note.failed:
+                    return
+                note.failed = True
+            file_path = note.file_path
+        else:
+            file_path = str(note)
+        self._note_failed(file_path)
+
+    def _rewrite(self, item):
+        """笔记的全部图片处理完成后生成新内容"""
+        if isinstance(item, ImageJob):
+            note = item.note
+            with note.lock:
+                note.pending -= 1
+                if note.pending > 0 or note.failed:
+                    return
+        else:
+            note = item
+
+        note.edits = [(job.match_text, f"![]({job.url})") for job in note.images if job.url]
+        new_content = self._apply(note.content, note.edits)
+        if self.reference_index is not None:
+            try:
+                self.reference_index.record(
+                    (
+                        (note.file_path, job.match_text, job.local_path, job.digest, job.url)
+                        for job in note.images
+                        if job.local_path
+                    ),
+                    {note.file_path: new_content},
+                )
+            except Exception as e:
+                safe_print(f"更新引用索引失败: {str(e)}", level="warning")
+
+        if new_content != note.content:
+            note.new_content = new_content
+            self.stages["write"].put(note)
+        else:
+            safe_print(
+                f"文件未发生更改: {os.path.basename(note.file_path)} ℹ️", level="info"
+            )
+            self._note_done(note.file_path, "unchanged")
+        # 改写完成后释放原始内容和图片任务
+        note.content = None
+        note.images = []
+
+    def _apply(self, content: str, edits) -> str:
+        """应用图片链接替换和WordPress链接处理"""
+        return apply_wordpress_links(
+            apply_edits(content, edits),
+            convert_to_wp=self.convert_to_wp,
+            remove_wp=self.remove_wp,
+        )
+
+    def _write(self, note: NoteJob):
+        """
+        写回笔记：写入临时文件，由 NoteWriter 批量提交；
+        输出目录模式下直接原子写入输出目录
+        """
+        if self.output_tree is None:
+            edits = note.edits
+            self.note_writer.write(
+                note.file_path,
+                note.new_content,
+                note.version,
+                lambda fresh: self._apply(fresh, edits),
+            )
+            note.new_content = None
+            return
+
+        from output_tree import write_atomic
+
+        file_name = os.path.basename(note.file_path)
+        try:
+            write_atomic(self.output_tree.target_for(note.file_path), note.new_content)
+        except OSError as e:
+            safe_print(f"写入文件失败: {file_name} {str(e)} ❌", level="error")
+            self._note_done(note.file_path, NoteWriter.FAILED)
+            return
+        finally:
+            note.new_content = None
+        with self._stats_lock:
+            self.written.append(note.file_path)
+        self._count("changed_notes")
+        metrics.notes_rewritten.inc()
+        safe_print(f"文件已更新: {file_name} ✅", level="success")
+        self._note_done(note.file_path, NoteWriter.WRITTEN)
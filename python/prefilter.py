@@ -0,0 +1,49 @@
+"""
+文件预过滤模块
+在解码和正则匹配之前按字节快速判断文件是否可能包含图片链接
+"""
+import mmap
+import os
+from typing import Iterable
+
+# 图片语法标记：Markdown/Obsidian 图片都以 "![" 开头，另外兼容 HTML 的 <img> 标签
+IMAGE_MARKERS = (b"![", b"<img")
+
+# 小于该大小的文件直接读取，更大的文件使用内存映射
+MMAP_THRESHOLD = 64 * 1024
+
+
+def contains_any(file_path: str, markers: Iterable[bytes]) -> bool:
+    """
+    判断文件是否包含任意一个字节标记
+
+    Args:
+        file_path: 文件路径
+        markers: 字节标记列表
+
+    Returns:
+        是否包含任意标记
+    """
+    with open(file_path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return False
+        if size < MMAP_THRESHOLD:
+            data = f.read()
+            return any(marker in data for marker in markers)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return any(mm.find(marker) != -1 for marker in markers)
+
+
+def might_contain_images(file_path: str) -> bool:
+    """
+    判断笔记是否可能包含图片链接，不包含的笔记无需解码和正则匹配
+
+    Args:
+        file_path: Markdown文件路径
+
+    Returns:
+        是否可能包含图片
+    """
+    return contains_any(file_path, IMAGE_MARKERS)
+
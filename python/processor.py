@@ -0,0 +1,349 @@
+"""
+可嵌入的处理接口
+Processor 只配置一次（图床、缓存、线程数等），之后可多次调用 process_files / process_vault
+（及其异步版本），返回每篇笔记、每张图片的结构化结果，并在处理过程中回调进度，
+供其他程序直接调用而无需启动子进程、解析日志
+
+用法:
+    processor = Processor.from_config(ConfigManager("config.json"))
+    result = processor.process_vault("notes", on_progress=lambda event: ...)
+    for note in result.notes:
+        print(note.path, note.status, [image.url for image in note.images])
+"""
+import asyncio
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from uploader import collect_markdown_files
+
+
+class ImageResult:
+    """笔记中一处本地图片引用的处理结果"""
+
+    def __init__(self, job):
+        self.note_path: str = job.note.file_path
+        # 在笔记中的序号（从0开始）
+        self.index: int = job.note.images.index(job)
+        self.raw_path: str = job.raw_path
+        self.local_path: Optional[str] = job.local_path
+        # uploaded、reused、skipped 或 failed
+        self.status: str = job.status
+        self.url: Optional[str] = job.url
+        self.error: Optional[str] = job.error
+        self.size: int = job.size
+        self.digest: Optional[str] = job.digest
+        self.format: Optional[str] = job.format
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(vars(self))
+
+
+class NoteResult:
+    """一篇笔记的处理结果"""
+
+    def __init__(self, path: str):
+        self.path = path
+        # unchanged、written、merged、skipped 或 failed；处理未完成时为None
+        self.status: Optional[str] = None
+        self.images: List[ImageResult] = []
+
+    @property
+    def changed(self) -> bool:
+        """改写结果是否已写回"""
+        return self.status in ("written", "merged")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "status": self.status,
+            "images": [image.to_dict() for image in self.images],
+        }
+
+
+class ProcessResult:
+    """一次处理的结果"""
+
+    def __init__(self, notes: List[NoteResult], stats: Dict[str, int], seconds: float):
+        self.notes = notes
+        self.stats = stats
+        self.seconds = seconds
+
+    @property
+    def images(self) -> List[ImageResult]:
+        """所有笔记的图片结果"""
+        return [image for note in self.notes for image in note.images]
+
+    @property
+    def failed_images(self) -> List[ImageResult]:
+        return [image for image in self.images if image.status == "failed"]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "notes": [note.to_dict() for note in self.notes],
+            "stats": dict(self.stats),
+            "seconds": self.seconds,
+        }
+
+
+class ProgressEvent:
+    """进度事件：一张图片或一篇笔记处理完成"""
+
+    def __init__(
+        self,
+        kind: str,
+        result,
+        notes_done: int,
+        notes_total: int,
+        images_done: int,
+    ):
+        # image 或 note
+        self.kind = kind
+        # ImageResult 或 NoteResult
+        self.result = result
+        self.notes_done = notes_done
+        self.notes_total = notes_total
+        self.images_done = images_done
+
+
+ProgressCallback = Callable[[ProgressEvent], Any]
+
+
+class _Run:
+    """一次处理过程中收集的结果（线程安全）"""
+
+    def __init__(self, md_files: List[str], on_progress: Optional[ProgressCallback]):
+        self.notes = {path: NoteResult(path) for path in md_files}
+        self.on_progress = on_progress
+        self.notes_done = 0
+        self.images_done = 0
+        self._lock = threading.Lock()
+
+    def image_done(self, job):
+        image = ImageResult(job)
+        with self._lock:
+            note = self.notes.get(image.note_path)
+            if note is not None:
+                note.images.append(image)
+            self.images_done += 1
+            event = ProgressEvent(
+                "image", image, self.notes_done, len(self.notes), self.images_done
+            )
+        self._emit(event)
+
+    def note_done(self, file_path: str, status: str):
+        with self._lock:
+            note = self.notes.get(file_path)
+            if note is None:
+                return
+            note.status = status
+            self.notes_done += 1
+            event = ProgressEvent(
+                "note", note, self.notes_done, len(self.notes), self.images_done
+            )
+        self._emit(event)
+
+    def _emit(self, event: ProgressEvent):
+        if self.on_progress is not None:
+            self.on_progress(event)
+
+
+class Processor:
+    """
+    可复用的笔记处理器（线程安全，可同时执行多次处理）
+
+    每次调用使用新的流水线，图床实例、离线队列、引用索引和近似重复索引在各次调用间共用
+    """
+
+    def __init__(
+        self,
+        image_host=None,
+        max_workers: int = 3,
+        convert_to_wp: bool = False,
+        remove_wp: bool = False,
+        image_path_prefix: str = "",
+        pipeline_config: Optional[Dict[str, Any]] = None,
+        offline_queue=None,
+        reference_index=None,
+        near_duplicates=None,
+    ):
+        """
+        初始化处理器
+
+        Args:
+            image_host: 图床适配器实例，为None时使用PicGo
+            max_workers: 上传线程数
+            convert_to_wp: 是否转换为WordPress格式
+            remove_wp: 是否移除WordPress前缀
+            image_path_prefix: 图片路径前缀
+            pipeline_config: 流水线配置 {"queue_size", "large_file_threshold", "stages"}
+            offline_queue: 离线上传队列，上传失败的图片加入队列等待补传
+            reference_index: 图片引用反向索引
+            near_duplicates: 近似重复图片索引
+        """
+        self.image_host = image_host
+        self.max_workers = max_workers
+        self.convert_to_wp = convert_to_wp
+        self.remove_wp = remove_wp
+        self.image_path_prefix = image_path_prefix
+        self.pipeline_config = pipeline_config or {}
+        self.offline_queue = offline_queue
+        self.reference_index = reference_index
+        self.near_duplicates = near_duplicates
+
+    @classmethod
+    def from_config(cls, config_manager, **overrides) -> "Processor":
+        """
+        按配置创建处理器（与图形界面、命令行使用相同的配置）
+
+        Args:
+            config_manager: 配置管理器
+            overrides: 覆盖配置的构造参数
+
+        Returns:
+            处理器
+        """
+        from runtime import (
+            create_image_host,
+            create_near_duplicates,
+            create_offline_queue,
+            create_reference_index,
+        )
+
+        wp_config = config_manager.get_wordpress_config()
+        options = {
+            "max_workers": config_manager.get_max_workers(),
+            "convert_to_wp": wp_config.get("enabled", False),
+            "remove_wp": wp_config.get("remove_prefix", False),
+            "image_path_prefix": config_manager.get_image_path_prefix(),
+            "pipeline_config": config_manager.get_pipeline_config(),
+        }
+        options.update(overrides)
+        # 未覆盖的组件才按配置创建，避免打开不使用的数据库
+        for name, create in (
+            ("image_host", create_image_host),
+            ("offline_queue", create_offline_queue),
+            ("reference_index", create_reference_index),
+            ("near_duplicates", create_near_duplicates),
+        ):
+            if name not in options:
+                options[name] = create(config_manager)
+        return cls(**options)
+
+    def process_files(
+        self, paths: Iterable[str], on_progress: Optional[ProgressCallback] = None
+    ) -> ProcessResult:
+        """
+        处理Markdown文件和目录（目录中的笔记递归处理，重复的笔记只处理一次）
+
+        Args:
+            paths: Markdown文件或目录路径
+            on_progress: 进度回调，每张图片、每篇笔记处理完成后调用（在工作线程中调用）
+
+        Returns:
+            处理结果，笔记按路径顺序排列
+        """
+        md_files: Dict[str, None] = {}
+        for path in paths:
+            path = str(path)
+            if os.path.isdir(path):
+                files = collect_markdown_files(path)
+            elif os.path.isfile(path) and path.lower().endswith(".md"):
+                files = [path]
+            else:
+                raise FileNotFoundError(f"Not a Markdown file or directory: {path}")
+            md_files.update(dict.fromkeys(str(file_path) for file_path in files))
+        return self._run(list(md_files), on_progress)
+
+    def process_vault(
+        self, path: str, on_progress: Optional[ProgressCallback] = None
+    ) -> ProcessResult:
+        """
+        处理笔记仓库目录（也可以是单个Markdown文件）
+
+        Args:
+            path: 目录或文件路径
+            on_progress: 进度回调（同 process_files）
+
+        Returns:
+            处理结果
+        """
+        return self.process_files([path], on_progress)
+
+    async def process_files_async(
+        self, paths: Iterable[str], on_progress: Optional[ProgressCallback] = None
+    ) -> ProcessResult:
+        """
+        process_files 的异步版本：在线程中执行，不阻塞事件循环
+
+        Args:
+            paths: Markdown文件或目录路径
+            on_progress: 进度回调，在事件循环线程中调用，可以是协程函数
+
+        Returns:
+            处理结果（所有进度回调执行完后返回）
+        """
+        loop = asyncio.get_running_loop()
+        pending = []
+        callback = None
+        if on_progress is not None:
+
+            def callback(event):
+                if asyncio.iscoroutinefunction(on_progress):
+                    future = asyncio.run_coroutine_threadsafe(on_progress(event), loop)
+                    pending.append(asyncio.wrap_future(future, loop=loop))
+                else:
+                    loop.call_soon_threadsafe(on_progress, event)
+
+        result = await asyncio.to_thread(self.process_files, list(paths), callback)
+        if pending:
+            await asyncio.gather(*pending)
+        return result
+
+    async def process_vault_async(
+        self, path: str, on_progress: Optional[ProgressCallback] = None
+    ) -> ProcessResult:
+        """process_vault 的异步版本（同 process_files_async）"""
+        return await self.process_files_async([path], on_progress)
+
+    def _run(self, md_files: List[str], on_progress: Optional[ProgressCallback]) -> ProcessResult:
+        from pipeline import VaultPipeline
+
+        run = _Run(md_files, on_progress)
+        pipeline = VaultPipeline(
+            image_host=self.image_host,
+            max_workers=self.max_workers,
+            convert_to_wp=self.convert_to_wp,
+            remove_wp=self.remove_wp,
+            image_path_prefix=self.image_path_prefix,
+            stage_config=self.pipeline_config.get("stages"),
+            queue_size=self.pipeline_config.get("queue_size", 64),
+            large_file_threshold=self.pipeline_config.get(
+                "large_file_threshold", 5 * 1024 * 1024
+            ),
+            offline_queue=self.offline_queue,
+            reference_index=self.reference_index,
+            near_duplicates=self.near_duplicates,
+            on_image=run.image_done,
+            on_note=run.note_done,
+        )
+        start = time.perf_counter()
+        stats = pipeline.run(md_files)
+        for note in run.notes.values():
+            note.images.sort(key=lambda image: image.index)
+        return ProcessResult(
+            [run.notes[path] for path in sorted(run.notes)], stats, time.perf_counter() - start
+        )
+
+    def close(self):
+        """关闭处理器持有的数据库连接和进程池"""
+        for component in (self.reference_index, self.near_duplicates):
+            if component is not None:
+                component.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,244 @@
+"""
+限速模块
+按图床限制每秒字节数和请求数，所有工作线程共享同一个令牌桶
+"""
+import asyncio
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from file_memo import file_memo
+from tracing import tracer
+
+
+class TokenBucket:
+    """线程安全的令牌桶"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """
+        初始化令牌桶
+
+        Args:
+            rate: 每秒补充的令牌数
+            capacity: 桶容量（允许的突发量），默认等于一秒的令牌数
+        """
+        self.rate = rate
+        self.capacity = capacity if capacity else rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _take(self, amount: float) -> float:
+        """尝试取出令牌，成功返回0，否则返回还需等待的秒数"""
+        needed = min(amount, self.capacity)
+        with self._lock:
+            self._refill()
+            if self._tokens >= needed:
+                self._tokens -= amount
+                return 0.0
+            return (needed - self._tokens) / self.rate
+
+    def acquire(self, amount: float = 1) -> float:
+        """
+        获取令牌，不足时阻塞等待
+
+        超过桶容量的请求（如大文件）在桶满时放行并记为欠账，
+        后续请求需等待欠账还清，长期平均速率仍不超过限制
+
+        Args:
+            amount: 需要的令牌数
+
+        Returns:
+            等待的秒数
+        """
+        waited = 0.0
+        while True:
+            delay = self._take(amount)
+            if not delay:
+                return waited
+            time.sleep(delay)
+            waited += delay
+
+    async def acquire_async(self, amount: float = 1) -> float:
+        """
+        获取令牌的协程版本，等待时不阻塞事件循环
+
+        Args:
+            amount: 需要的令牌数
+
+        Returns:
+            等待的秒数
+        """
+        waited = 0.0
+        while True:
+            delay = self._take(amount)
+            if not delay:
+                return waited
+            await asyncio.sleep(delay)
+            waited += delay
+
+
+class HostRateLimiter:
+    """单个图床的限速器（字节速率 + 请求速率）"""
+
+    def __init__(self, bytes_per_second: float = 0, requests_per_second: float = 0):
+        """
+        初始化限速器
+
+        Args:
+            bytes_per_second: 每秒最多上传的字节数，0表示不限制
+            requests_per_second: 每秒最多发起的请求数，0表示不限制
+        """
+        self.bytes_bucket = TokenBucket(bytes_per_second) if bytes_per_second else None
+        self.requests_bucket = (
+            TokenBucket(requests_per_second) if requests_per_second else None
+        )
+
+    def acquire(self, size: int = 0) -> float:
+        """
+        上传前获取配额
+
+        Args:
+            size: 本次上传的字节数
+
+        Returns:
+            等待的秒数
+        """
+        waited = 0.0
+        if self.requests_bucket:
+            waited += self.requests_bucket.acquire(1)
+        if self.bytes_bucket and size:
+            waited += self.bytes_bucket.acquire(size)
+        return waited
+
+    async def acquire_async(self, size: int = 0) -> float:
+        """
+        上传前获取配额的协程版本
+
+        Args:
+            size: 本次上传的字节数
+
+        Returns:
+            等待的秒数
+        """
+        waited = 0.0
+        if self.requests_bucket:
+            waited += await self.requests_bucket.acquire_async(1)
+        if self.bytes_bucket and size:
+            waited += await self.bytes_bucket.acquire_async(size)
+        return waited
+
+
+_limits: Dict[str, Dict[str, Any]] = {}
+_limiters: Dict[str, HostRateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def configure_rate_limits(limits: Dict[str, Dict[str, Any]]):
+    """
+    设置各图床的限速配置；配置有变化时才重建限速器，
+    保证同一配置下所有图床实例和线程共用同一组令牌桶
+
+    Args:
+        limits: {图床类型: {"bytes_per_second", "requests_per_second"}}
+    """
+    global _limits
+    limits = dict(limits or {})
+    with _limiters_lock:
+        if limits == _limits:
+            return
+        _limits = limits
+        _limiters.clear()
+
+
+def get_rate_limiter(host_type: str) -> Optional[HostRateLimiter]:
+    """
+    获取图床的共享限速器，未配置限速时返回None
+
+    Args:
+        host_type: 图床类型（如 smms、github）
+
+    Returns:
+        限速器实例
+    """
+    with _limiters_lock:
+        limiter = _limiters.get(host_type)
+        if limiter is None:
+            limit = _limits.get(host_type)
+            if not limit:
+                return None
+            limiter = HostRateLimiter(
+                bytes_per_second=limit.get("bytes_per_second", 0),
+                requests_per_second=limit.get("requests_per_second", 0),
+            )
+            _limiters[host_type] = limiter
+        return limiter
+
+
+def _file_size(image_path: str) -> int:
+    try:
+        return file_memo.getsize(image_path)
+    except OSError:
+        return 0
+
+
+def throttle(host_type: str, image_path: str) -> float:
+    """
+    上传前按图床限速等待（请求数 + 文件大小）
+
+    Args:
+        host_type: 图床类型
+        image_path: 即将上传的图片路径
+
+    Returns:
+        等待的秒数
+    """
+    limiter = get_rate_limiter(host_type)
+    if limiter is None:
+        return 0.0
+    start = time.perf_counter()
+    waited = limiter.acquire(_file_size(image_path))
+    if waited:
+        tracer.complete(
+            "rate_limit.wait",
+            start,
+            time.perf_counter(),
+            category="host",
+            host=host_type,
+            file=os.path.basename(image_path),
+        )
+    return waited
+
+
+async def throttle_async(host_type: str, image_path: str) -> float:
+    """
+    throttle 的协程版本，与同步上传共用令牌桶
+
+    Args:
+        host_type: 图床类型
+        image_path: 即将上传的图片路径
+
+    Returns:
+        等待的秒数
+    """
+    limiter = get_rate_limiter(host_type)
+    if limiter is None:
+        return 0.0
+    start = time.perf_counter()
+    waited = await limiter.acquire_async(_file_size(image_path))
+    if waited:
+        tracer.complete(
+            "rate_limit.wait",
+            start,
+            time.perf_counter(),
+            category="host",
+            host=host_type,
+            file=os.path.basename(image_path),
+        )
+    return waited
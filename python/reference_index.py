@@ -0,0 +1,359 @@
+"""
+图片引用反向索引
+记录每张本地图片（路径和内容哈希）被哪些笔记的哪些位置引用、上传后的URL，
+保存在SQLite数据库中；图片被替换后只需重新上传一次并改写引用它的笔记，
+也可用于生成"未使用的附件"和"被引用最多的图片"报告
+"""
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from image_formats import image_extensions
+from uploader import (
+    safe_print,
+    find_local_images,
+    resolve_image_path,
+    upload_with_host,
+    apply_wordpress_links,
+    collect_markdown_files,
+)
+
+# index_vault 每批写入索引的笔记数
+INDEX_BATCH_SIZE = 200
+
+
+def _normalize(path: str) -> str:
+    return os.path.normcase(os.path.abspath(path))
+
+
+class ReferenceIndex:
+    """图片 → 引用它的笔记的持久化索引"""
+
+    def __init__(self, db_path: str = "reference_index.db"):
+        """
+        初始化索引
+
+        Args:
+            db_path: 数据库文件路径
+        """
+        self.db_path = db_path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS images ("
+                "path TEXT PRIMARY KEY, digest TEXT, url TEXT, updated_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS refs ("
+                "image_path TEXT NOT NULL, note TEXT NOT NULL, span TEXT NOT NULL, "
+                "PRIMARY KEY (image_path, note, span))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS refs_note ON refs (note)")
+            conn.execute("CREATE INDEX IF NOT EXISTS images_digest ON images (digest)")
+
+    def _connect(self) -> sqlite3.Connection:
+        """每个线程使用独立的连接"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def record(
+        self,
+        references: Iterable[Tuple[str, str, str, Optional[str], Optional[str]]],
+        notes: Optional[Dict[str, str]] = None,
+    ):
+        """
+        记录一批引用（已有的URL和哈希不会被空值覆盖）
+
+        Args:
+            references: [(笔记路径, 原始图片标记, 图片路径, 内容哈希, URL), ...]
+            notes: 重新扫描过的笔记 {笔记路径: 当前内容}，在同一事务中先删除这些笔记已不存在的引用；
+                   已上传的图片按其URL是否仍在笔记中判断
+        """
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for note, content in (notes or {}).items():
+                note = _normalize(note)
+                rows = conn.execute(
+                    "SELECT refs.image_path, refs.span, images.url FROM refs "
+                    "LEFT JOIN images ON images.path = refs.image_path WHERE refs.note = ?",
+                    (note,),
+                ).fetchall()
+                conn.executemany(
+                    "DELETE FROM refs WHERE note = ? AND image_path = ? AND span = ?",
+                    [
+                        (note, image_path, span)
+                        for image_path, span, url in rows
+                        if not _url_in(url, content)
+                    ],
+                )
+            for note, span, image_path, digest, url in references:
+                image_path = _normalize(image_path)
+                conn.execute(
+                    "INSERT INTO images (path, digest, url, updated_at) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(path) DO UPDATE SET "
+                    "digest = COALESCE(excluded.digest, digest), "
+                    "url = COALESCE(excluded.url, url), updated_at = excluded.updated_at",
+                    (image_path, digest, url, now),
+                )
+                conn.execute(
+                    "INSERT OR IGNORE INTO refs (image_path, note, span) VALUES (?, ?, ?)",
+                    (image_path, _normalize(note), span),
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def image(self, image_path: str) -> Optional[Dict[str, Any]]:
+        """查询图片记录 {"path", "digest", "url"}，未索引时返回None"""
+        row = self._connect().execute(
+            "SELECT path, digest, url FROM images WHERE path = ?", (_normalize(image_path),)
+        ).fetchone()
+        return dict(zip(("path", "digest", "url"), row)) if row else None
+
+    def set_url(self, image_path: str, digest: Optional[str], url: str):
+        """更新图片的内容哈希和URL"""
+        self._connect().execute(
+            "UPDATE images SET digest = ?, url = ?, updated_at = ? WHERE path = ?",
+            (digest, url, time.time(), _normalize(image_path)),
+        )
+
+    def references(
+        self, image_path: Optional[str] = None, digest: Optional[str] = None
+    ) -> List[Tuple[str, str, str]]:
+        """
+        查询引用某张图片的笔记（按路径或内容哈希）
+
+        Returns:
+            [(笔记路径, 原始图片标记, 图片路径), ...]
+        """
+        if image_path is not None:
+            condition, value = "refs.image_path = ?", _normalize(image_path)
+        else:
+            condition, value = "images.digest = ?", digest
+        return self._connect().execute(
+            "SELECT refs.note, refs.span, refs.image_path FROM refs "
+            "JOIN images ON images.path = refs.image_path "
+            f"WHERE {condition} ORDER BY refs.note",
+            (value,),
+        ).fetchall()
+
+    def most_referenced(self, limit: int = 20) -> List[Tuple[str, int, int]]:
+        """
+        被引用最多的图片
+
+        Returns:
+            [(图片路径, 引用它的笔记数, 引用次数), ...]
+        """
+        return self._connect().execute(
+            "SELECT image_path, COUNT(DISTINCT note), COUNT(*) FROM refs "
+            "GROUP BY image_path ORDER BY COUNT(*) DESC, image_path LIMIT ?",
+            (limit,),
+        ).fetchall()
+
+    def unused_attachments(
+        self, root: str, extensions: Optional[Tuple[str, ...]] = None
+    ) -> List[str]:
+        """
+        目录中没有被任何笔记引用过的图片
+
+        Args:
+            root: 仓库目录
+            extensions: 视为图片的扩展名，默认为允许上传的格式的扩展名
+
+        Returns:
+            图片路径列表
+        """
+        indexed = {
+            row[0]
+            for row in self._connect().execute("SELECT DISTINCT image_path FROM refs")
+        }
+        if extensions is None:
+            extensions = tuple(f".{ext}" for ext in image_extensions())
+        unused = []
+        for directory, _, files in os.walk(root):
+            for name in files:
+                if not name.lower().endswith(extensions):
+                    continue
+                path = os.path.join(directory, name)
+                if _normalize(path) not in indexed:
+                    unused.append(path)
+        return sorted(unused)
+
+    def notes(self) -> List[str]:
+        """索引中记录了引用的笔记"""
+        return [row[0] for row in self._connect().execute("SELECT DISTINCT note FROM refs")]
+
+    def prune(self) -> int:
+        """
+        删除已不存在的笔记的引用，以及不再被引用的图片记录
+
+        Returns:
+            删除的引用数
+        """
+        conn = self._connect()
+        missing = [(note,) for note in self.notes() if not os.path.exists(note)]
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            before = conn.total_changes
+            conn.executemany("DELETE FROM refs WHERE note = ?", missing)
+            removed = conn.total_changes - before
+            conn.execute(
+                "DELETE FROM images WHERE path NOT IN (SELECT image_path FROM refs)"
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return removed
+
+    def close(self):
+        """关闭当前线程的连接"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def _url_in(url: Optional[str], content: str) -> bool:
+    """URL（或其WordPress格式）是否仍出现在笔记内容中"""
+    from wordpress_processor import WordPressLinkProcessor
+
+    if not url:
+        return False
+    return url in content or WordPressLinkProcessor.convert_to_wordpress(url) in content
+
+
+def index_vault(path, reference_index: ReferenceIndex, image_path_prefix: str = "") -> int:
+    """
+    扫描笔记中仍为本地路径的图片引用并写入索引（不上传）
+
+    Args:
+        path: 文件或目录路径
+        reference_index: 反向索引
+        image_path_prefix: 图片路径前缀
+
+    Returns:
+        记录的引用数
+    """
+    from note_writer import read_note
+
+    count = 0
+    references = []
+    notes: Dict[str, str] = {}
+    scanned = set()
+    for file_path in collect_markdown_files(path):
+        scanned.add(_normalize(file_path))
+        try:
+            content, _ = read_note(file_path)
+        except (OSError, UnicodeDecodeError) as e:
+            safe_print(f"读取文件失败: {file_path} {str(e)} ❌", level="error")
+            continue
+        notes[file_path] = content
+        for match in find_local_images(content, file_path, image_path_prefix):
+            image_path = resolve_image_path(match.group(1), file_path, image_path_prefix)
+            references.append((file_path, match.group(0), image_path, None, None))
+        if len(notes) >= INDEX_BATCH_SIZE:
+            reference_index.record(references, notes)
+            count += len(references)
+            references, notes = [], {}
+    if os.path.isdir(path):
+        # 预过滤跳过的笔记已不含图片语法，清除其中残留的引用
+        root = os.path.join(_normalize(path), "")
+        for note in reference_index.notes():
+            if note.startswith(root) and note not in scanned and os.path.exists(note):
+                notes[note] = ""
+    reference_index.record(references, notes)
+    return count + len(references)
+
+
+def _replace_url(content: str, old_url: str, new_url: str) -> str:
+    """替换笔记中的旧URL（包括WordPress格式的链接）"""
+    from wordpress_processor import WordPressLinkProcessor
+
+    content = content.replace(
+        WordPressLinkProcessor.convert_to_wordpress(old_url),
+        WordPressLinkProcessor.convert_to_wordpress(new_url),
+    )
+    return content.replace(old_url, new_url)
+
+
+def update_image(
+    image_path: str,
+    reference_index: ReferenceIndex,
+    image_host=None,
+    convert_to_wp: bool = False,
+    force: bool = False,
+) -> Dict[str, int]:
+    """
+    图片文件被替换后重新上传一次，并只改写引用它的笔记
+
+    Args:
+        image_path: 图片路径
+        reference_index: 反向索引
+        image_host: 图床适配器实例
+        convert_to_wp: 仍为本地路径的引用改写时是否转换为WordPress格式
+        force: 内容未变化时也重新上传
+
+    Returns:
+        {"notes": 引用的笔记数, "patched": 改写的笔记数}
+    """
+    from note_writer import NoteWriter, read_note
+    from pipeline import hash_file
+
+    result = {"notes": 0, "patched": 0}
+    record = reference_index.image(image_path)
+    if record is None:
+        safe_print(f"索引中没有引用该图片的笔记: {image_path}", level="warning")
+        return result
+    digest = hash_file(image_path)
+    if digest == record["digest"] and record["url"] and not force:
+        safe_print(f"图片内容未变化，无需重新上传: {image_path} ℹ️", level="info")
+        return result
+
+    new_url = upload_with_host(image_path, image_host)
+    if not new_url:
+        safe_print(f"图片上传失败: {image_path} ❌", level="error")
+        return result
+    old_url = record["url"]
+    reference_index.set_url(image_path, digest, new_url)
+
+    references = reference_index.references(image_path=image_path)
+    spans: Dict[str, List[str]] = {}
+    for note, span, _ in references:
+        spans.setdefault(note, []).append(span)
+    result["notes"] = len(spans)
+
+    def rewrite(text, note_spans):
+        if old_url:
+            text = _replace_url(text, old_url, new_url)
+        for span in note_spans:
+            text = text.replace(span, f"![]({new_url})")
+        return apply_wordpress_links(text, convert_to_wp=convert_to_wp)
+
+    with NoteWriter() as note_writer:
+        for note, note_spans in spans.items():
+            try:
+                content, version = read_note(note)
+            except (OSError, UnicodeDecodeError) as e:
+                safe_print(f"读取笔记失败: {note} {str(e)} ❌", level="error")
+                continue
+            new_content = rewrite(content, note_spans)
+            if new_content != content:
+                note_writer.write(
+                    note,
+                    new_content,
+                    version,
+                    lambda fresh, note_spans=note_spans: rewrite(fresh, note_spans),
+                )
+    result["patched"] = note_writer.stats[NoteWriter.WRITTEN]
+    return result
@@ -0,0 +1,90 @@
+"""
+运行时组件的创建
+按配置创建图床实例、离线队列、引用索引、上传缓存和近似重复索引，
+供图形界面、命令行和嵌入接口（processor）共用；不导入图形界面模块
+"""
+from file_memo import configure_file_memo
+from image_hosts import ImageHostFactory, FailoverHost
+from rate_limit import configure_rate_limits
+from uploader import set_image_types, safe_print
+
+
+def configure_runtime(config_manager):
+    """按配置设置允许上传的图片格式和图片文件缓存（子进程创建图床时也会调用）"""
+    set_image_types(config_manager.get_image_types())
+    configure_file_memo(config_manager.get_file_memo_config())
+
+
+def create_image_host(config_manager):
+    """
+    根据配置创建图床实例，失败时返回None（回退到PicGo）
+
+    启用熔断时主图床（以及配置的备用图床）包装为 FailoverHost
+    """
+    configure_rate_limits(config_manager.get_rate_limits())
+    configure_runtime(config_manager)
+    try:
+        image_host = ImageHostFactory.create_from_config(
+            config_manager.get_image_host_config()
+        )
+    except Exception as e:
+        safe_print(f"创建图床实例失败: {e}，使用默认Gitee", level="error")
+        return None
+
+    breaker_config = config_manager.get_circuit_breaker_config()
+    if not breaker_config.get("enabled", True):
+        return image_host
+
+    hosts = [image_host]
+    failover_config = config_manager.get_failover_host_config()
+    if failover_config:
+        try:
+            hosts.append(ImageHostFactory.create_from_config(failover_config))
+        except Exception as e:
+            safe_print(f"创建备用图床实例失败: {e}", level="error")
+
+    return FailoverHost(hosts, breaker_config, notify=safe_print)
+
+
+def create_offline_queue(config_manager):
+    """根据配置创建离线上传队列，未启用时返回None"""
+    from offline_queue import OfflineQueue
+
+    queue_config = config_manager.get_offline_queue_config()
+    if not queue_config.get("enabled", True):
+        return None
+    return OfflineQueue(queue_config["path"], max_attempts=queue_config["max_attempts"])
+
+
+def create_reference_index(config_manager):
+    """根据配置创建图片引用反向索引，未启用时返回None"""
+    from reference_index import ReferenceIndex
+
+    index_config = config_manager.get_reference_index_config()
+    if not index_config.get("enabled", True):
+        return None
+    return ReferenceIndex(index_config["path"])
+
+
+def create_upload_cache(config_manager):
+    """创建上传缓存，按当前图床和账号区分命名空间"""
+    from upload_cache import UploadCache
+
+    return UploadCache(
+        config_manager.get_upload_cache_path(),
+        namespace=ImageHostFactory.cache_namespace(config_manager.get_image_host_config()),
+    )
+
+
+def create_near_duplicates(config_manager):
+    """根据配置创建近似重复图片索引，未启用或未安装 Pillow 时返回None"""
+    from perceptual_hash import create_near_duplicate_index
+
+    near_config = config_manager.get_near_duplicates_config()
+    if not near_config.get("enabled", False):
+        return None
+    return create_near_duplicate_index(
+        create_upload_cache(config_manager),
+        max_distance=near_config["max_distance"],
+        processes=near_config["processes"],
+    )
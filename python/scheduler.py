@@ -0,0 +1,131 @@
+"""
+上传调度模块
+根据图片大小安排上传顺序，缩短整批任务的总耗时
+"""
+import threading
+from typing import Any, Callable, Iterable, List
+
+from file_memo import file_memo
+
+# 超过该大小的图片视为大文件，优先开始上传
+DEFAULT_LARGE_FILE_THRESHOLD = 5 * 1024 * 1024
+
+
+def file_size(path: str) -> int:
+    """
+    获取文件大小，文件不存在时返回0
+
+    Args:
+        path: 文件路径
+
+    Returns:
+        文件大小（字节）
+    """
+    try:
+        return file_memo.getsize(path)
+    except OSError:
+        return 0
+
+
+def order_longest_first(items: Iterable[Any], size_of: Callable[[Any], int]) -> List[Any]:
+    """
+    按大小从大到小排序（最长任务优先），避免大文件排在最后拖慢整批任务
+
+    Args:
+        items: 任务列表
+        size_of: 获取任务大小的函数
+
+    Returns:
+        排序后的任务列表
+    """
+    sized = [(size_of(item), index, item) for index, item in enumerate(items)]
+    sized.sort(key=lambda entry: (-entry[0], entry[1]))
+    return [item for _, _, item in sized]
+
+
+class SizeAwareQueue:
+    """
+    按大小调度的有界任务队列，接口与 queue.Queue 的 put/get 一致
+
+    调度策略：
+    - 最多一半的工作线程处理大文件，队列中有大文件时优先取最大的，尽早开始长任务；
+    - 其余线程用小文件填充，优先处理剩余图片最少的笔记，让笔记尽早完成并写回。
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        workers: int,
+        size_of: Callable[[Any], int],
+        pending_of: Callable[[Any], int],
+        sentinel: Any,
+        large_threshold: int = DEFAULT_LARGE_FILE_THRESHOLD,
+    ):
+        """
+        初始化队列
+
+        Args:
+            maxsize: 队列容量
+            workers: 消费该队列的工作线程数
+            size_of: 获取任务大小的函数
+            pending_of: 获取任务所属笔记剩余图片数的函数
+            sentinel: 结束标记，只有在普通任务全部取完后才会返回
+            large_threshold: 大文件阈值（字节）
+        """
+        self.maxsize = max(1, maxsize)
+        self.large_slots = max(1, workers // 2)
+        self.size_of = size_of
+        self.pending_of = pending_of
+        self.sentinel = sentinel
+        self.large_threshold = large_threshold
+        self._items: List[Any] = []
+        self._sentinels = 0
+        self._running_large = 0
+        self._cond = threading.Condition()
+
+    def put(self, item: Any):
+        """放入任务，队列已满时阻塞"""
+        with self._cond:
+            if item is self.sentinel:
+                self._sentinels += 1
+            else:
+                while len(self._items) >= self.maxsize:
+                    self._cond.wait()
+                self._items.append(item)
+            self._cond.notify_all()
+
+    def get(self) -> Any:
+        """按调度策略取出下一个任务，没有任务时阻塞"""
+        with self._cond:
+            while not self._items and not self._sentinels:
+                self._cond.wait()
+            if not self._items:
+                self._sentinels -= 1
+                return self.sentinel
+
+            index = self._pick()
+            item = self._items.pop(index)
+            if self.size_of(item) >= self.large_threshold:
+                self._running_large += 1
+            self._cond.notify_all()
+            return item
+
+    def task_done(self, item: Any):
+        """任务处理完成，释放大文件名额"""
+        with self._cond:
+            if self.size_of(item) >= self.large_threshold:
+                self._running_large -= 1
+
+    def _pick(self) -> int:
+        sizes = [self.size_of(item) for item in self._items]
+
+        if self._running_large < self.large_slots:
+            largest = max(range(len(sizes)), key=lambda i: sizes[i])
+            if sizes[largest] >= self.large_threshold:
+                return largest
+
+        # 小文件填充：剩余图片最少的笔记优先，同一笔记内大的优先
+        candidates = [i for i, size in enumerate(sizes) if size < self.large_threshold]
+        if not candidates:
+            candidates = range(len(sizes))
+        return min(candidates, key=lambda i: (self.pending_of(self._items[i]), -sizes[i]))
@@ -0,0 +1,37 @@
+"""
+测试公共配置
+模块位于 python/ 目录下（平铺结构），测试时把该目录加入导入路径
+"""
+import os
+import sys
+
+import pytest
+
+PYTHON_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PYTHON_DIR not in sys.path:
+    sys.path.insert(0, PYTHON_DIR)
+
+
+def make_png(path, color=(255, 0, 0), size=(8, 8)):
+    """生成一张纯色PNG图片"""
+    from PIL import Image
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    Image.new("RGB", size, color).save(path)
+    return path
+
+
+@pytest.fixture
+def vault(tmp_path):
+    """
+    两篇笔记、三张图片的仓库（图片放在 Obsidian 默认的 Z-附件 目录）
+
+    a.md 引用 red.png 和 green.png，b.md 引用 green.png 和 blue.png
+    """
+    attachments = tmp_path / "Z-附件"
+    make_png(str(attachments / "red.png"), (255, 0, 0))
+    make_png(str(attachments / "green.png"), (0, 255, 0))
+    make_png(str(attachments / "blue.png"), (0, 0, 255))
+    (tmp_path / "a.md").write_text("# a\n![[red.png]]\n![[green.png]]\n", encoding="utf-8")
+    (tmp_path / "b.md").write_text("# b\n![[green.png]]\n![[blue.png]]\n", encoding="utf-8")
+    return tmp_path
@@ -0,0 +1,96 @@
+"""AsyncUploadEngine：并发数上限、同一图片只上传一次、失败的图片和笔记不影响其他笔记"""
+import asyncio
+
+import pytest
+
+import async_uploader
+from async_uploader import AsyncUploadEngine
+from offline_queue import OfflineQueue
+
+
+class SlowHost:
+    """异步上传前等待片刻，记录同时进行的上传数"""
+
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.uploads = []
+        self.in_flight = 0
+        self.peak = 0
+
+    def get_name(self):
+        return "slow"
+
+    async def upload_async(self, image_path, session=None):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(0.02)
+        finally:
+            self.in_flight -= 1
+        name = image_path.replace("\\", "/").rsplit("/", 1)[-1]
+        self.uploads.append(name)
+        if name in self.fail:
+            raise ConnectionError("refused")
+        return f"https://img.example/{name}"
+
+
+def run(vault, host, **kwargs):
+    paths = sorted(str(path) for path in vault.glob("*.md"))
+    return asyncio.run(AsyncUploadEngine(image_host=host, **kwargs).run(paths))
+
+
+def test_uploads_are_bounded_and_deduplicated(vault):
+    for i in range(6):
+        (vault / f"n{i}.md").write_text("![[red.png]]\n![[blue.png]]\n", encoding="utf-8")
+    host = SlowHost()
+    stats = run(vault, host, max_concurrency=2)
+
+    assert host.peak <= 2
+    assert sorted(host.uploads) == ["blue.png", "green.png", "red.png"]
+    assert stats["notes"] == 8
+    assert (stats["images"], stats["uploaded"], stats["reused"]) == (16, 3, 13)
+    assert stats["changed_notes"] == 8
+    assert (vault / "n3.md").read_text(encoding="utf-8") == (
+        "![](https://img.example/red.png)\n![](https://img.example/blue.png)\n"
+    )
+
+
+def test_failed_upload_is_queued_and_keeps_the_local_link(vault, tmp_path_factory):
+    queue = OfflineQueue(str(tmp_path_factory.mktemp("data") / "offline_queue.json"))
+    stats = run(vault, SlowHost(fail={"green.png"}), offline_queue=queue)
+
+    # green.png 被两篇笔记引用，只上传一次，两处引用都计为失败并记入同一条离线记录
+    assert stats["failed"] == 2
+    (entry,) = queue.pending()
+    assert sorted(ref["note"] for ref in entry["notes"]) == [
+        str(vault / "a.md"),
+        str(vault / "b.md"),
+    ]
+    assert "![[green.png]]" in (vault / "a.md").read_text(encoding="utf-8")
+    assert "https://img.example/red.png" in (vault / "a.md").read_text(encoding="utf-8")
+
+
+def test_one_broken_note_does_not_stop_the_others(vault, monkeypatch):
+    original = async_uploader.find_local_images
+
+    def find_local_images(content, file_path, prefix):
+        if file_path.endswith("b.md"):
+            raise RuntimeError("boom")
+        return original(content, file_path, prefix)
+
+    monkeypatch.setattr(async_uploader, "find_local_images", find_local_images)
+    stats = run(vault, SlowHost())
+
+    assert stats["failed_notes"] == 1
+    assert stats["changed_notes"] == 1
+    assert "https://img.example/red.png" in (vault / "a.md").read_text(encoding="utf-8")
+    assert "![[blue.png]]" in (vault / "b.md").read_text(encoding="utf-8")
+
+
+@pytest.mark.parametrize("max_notes", [1, 3])
+def test_note_workers_finish_every_note(vault, max_notes):
+    for i in range(5):
+        (vault / f"n{i}.md").write_text("![[green.png]]\n", encoding="utf-8")
+    stats = run(vault, SlowHost(), max_notes=max_notes)
+    assert stats["notes"] == 7
+    assert stats["changed_notes"] == 7
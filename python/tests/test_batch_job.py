@@ -0,0 +1,92 @@
+"""BatchJob：处理期间拖入的路径加入正在运行的流水线，重复的笔记只处理一次"""
+import queue
+import threading
+
+from batch_job import BatchJob
+from pipeline import VaultPipeline
+
+
+class GatedHost:
+    """第一次上传等待放行，便于在处理期间加入新路径"""
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.gate = threading.Event()
+        self.uploads = []
+
+    def get_name(self):
+        return "gated"
+
+    def upload(self, image_path):
+        self.started.set()
+        assert self.gate.wait(10)
+        name = image_path.replace("\\", "/").rsplit("/", 1)[-1]
+        self.uploads.append(name)
+        return f"https://img.example/{name}"
+
+
+def make_job(host, hosts_created=None):
+    finished = queue.Queue()
+
+    def create_host():
+        if hosts_created is not None:
+            hosts_created.append(host)
+        return host
+
+    job = BatchJob(
+        create_host=create_host,
+        create_pipeline=lambda image_host: VaultPipeline(image_host=image_host, max_workers=2),
+        on_finish=finished.put,
+        poll_interval=0.01,
+    )
+    return job, finished
+
+
+def test_paths_added_while_running_join_the_same_run(vault):
+    host = GatedHost()
+    hosts_created = []
+    job, finished = make_job(host, hosts_created)
+
+    assert job.add([str(vault / "a.md")]) is False
+    assert host.started.wait(10)
+    assert job.running
+    # 正在运行时加入的路径不启动新任务，已处理过的 a.md 不再处理
+    assert job.add([str(vault / "b.md"), str(vault / "a.md")]) is True
+    host.gate.set()
+
+    totals = finished.get(timeout=30)
+    assert totals["notes"] == 2
+    assert totals["uploaded"] == 3
+    assert sorted(host.uploads) == ["blue.png", "green.png", "red.png"]
+    assert len(hosts_created) == 1
+    assert finished.empty()
+    assert not job.running
+    assert "https://img.example/blue.png" in (vault / "b.md").read_text(encoding="utf-8")
+
+
+def test_a_new_run_starts_after_the_previous_one_finishes(vault):
+    host = GatedHost()
+    host.gate.set()
+    job, finished = make_job(host)
+
+    assert job.add([str(vault / "a.md")]) is False
+    assert finished.get(timeout=30)["notes"] == 1
+    # 新的任务重新开始去重
+    assert job.add([str(vault / "a.md"), str(vault / "b.md")]) is False
+    assert finished.get(timeout=30)["notes"] == 2
+
+
+def test_errors_still_finish_the_run(vault):
+    def broken_host():
+        raise RuntimeError("no host")
+
+    finished = queue.Queue()
+    job = BatchJob(
+        create_host=broken_host,
+        create_pipeline=lambda image_host: VaultPipeline(image_host=image_host),
+        on_finish=finished.put,
+    )
+    job.add([str(vault / "a.md")])
+
+    assert "seconds" in finished.get(timeout=30)
+    assert not job.running
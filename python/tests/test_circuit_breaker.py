@@ -0,0 +1,197 @@
+"""CircuitBreaker 状态转换，以及 FailoverHost 如何更新熔断器"""
+import json
+
+import pytest
+
+from image_hosts import CircuitBreaker, CircuitOpenError, FailoverHost
+from image_hosts.base import ImageHostBase
+
+
+class Clock:
+    """可手动推进的 time.monotonic"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr("image_hosts.circuit_breaker.time.monotonic", clock)
+    return clock
+
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+    assert not breaker.record_failure()
+    assert not breaker.record_failure()
+    # 成功后重新计数
+    breaker.record_success()
+    assert not breaker.record_failure()
+    assert not breaker.record_failure()
+    assert breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.is_open
+    assert not breaker.allow()
+
+
+def test_half_open_allows_a_single_probe(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    breaker.record_failure()
+    clock.now += 59
+    assert not breaker.allow()
+
+    clock.now += 1
+    assert not breaker.is_open
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()
+
+
+def test_successful_probe_closes(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    breaker.record_failure()
+    clock.now += 60
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.failures == 0
+    assert breaker.allow() and breaker.allow()
+
+
+def test_failed_probe_reopens(clock):
+    breaker = CircuitBreaker(failure_threshold=5, reset_timeout=60)
+    for _ in range(5):
+        breaker.record_failure()
+    clock.now += 60
+    assert breaker.allow()
+    # 半开状态下一次失败即重新熔断，并重新开始计时
+    assert breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    clock.now += 59
+    assert not breaker.allow()
+
+
+def test_release_frees_the_probe_without_changing_state(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    breaker.record_failure()
+    clock.now += 60
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.failures == 1
+    assert breaker.allow()
+
+
+class StubHost(ImageHostBase):
+    """按预设结果返回URL或抛出异常的图床"""
+
+    def __init__(self, name, results):
+        self.name = name
+        self.results = list(results)
+        self.calls = 0
+        super().__init__({})
+
+    def upload(self, image_path):
+        self.calls += 1
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def validate_config(self, config):
+        return True
+
+    def get_required_fields(self):
+        return []
+
+    def get_name(self):
+        return self.name
+
+
+@pytest.fixture
+def image(tmp_path):
+    path = tmp_path / "a.png"
+    path.write_bytes(b"\x89PNG\r\n\x1a\n")
+    return str(path)
+
+
+def test_failover_switches_hosts_and_trips(image, clock):
+    primary = StubHost("primary", [ConnectionError("down")] * 2)
+    backup = StubHost("backup", ["https://backup/a.png"] * 3)
+    host = FailoverHost([primary, backup], {"failure_threshold": 2, "reset_timeout": 60})
+
+    assert host.upload(image) == "https://backup/a.png"
+    assert host.upload(image) == "https://backup/a.png"
+    assert host.breakers[0].state == CircuitBreaker.OPEN
+    # 主图床熔断后直接使用备用图床
+    assert host.upload(image) == "https://backup/a.png"
+    assert primary.calls == 2
+
+
+def test_all_hosts_open_raises(image, clock):
+    primary = StubHost("primary", [ConnectionError("down")])
+    host = FailoverHost([primary], {"failure_threshold": 1, "reset_timeout": 60})
+    with pytest.raises(Exception, match="primary: down"):
+        host.upload(image)
+    with pytest.raises(CircuitOpenError):
+        host.upload(image)
+
+
+def test_missing_file_leaves_breaker_untouched(image, clock):
+    primary = StubHost("primary", [ConnectionError("down"), FileNotFoundError(image)])
+    host = FailoverHost([primary], {"failure_threshold": 3, "reset_timeout": 60})
+    with pytest.raises(Exception, match="primary: down"):
+        host.upload(image)
+    with pytest.raises(FileNotFoundError):
+        host.upload(image)
+    breaker = host.breakers[0]
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.failures == 1
+
+
+def make_config(tmp_path, **config):
+    from config_manager import ConfigManager
+
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps(config), encoding="utf-8")
+    return ConfigManager(str(path))
+
+
+def test_single_host_is_wrapped_in_a_breaker(tmp_path):
+    from runtime import create_image_host
+
+    host = create_image_host(
+        make_config(tmp_path, image_host={"type": "gitee", "config": {"server": "http://x"}})
+    )
+    assert isinstance(host, FailoverHost)
+    assert len(host.hosts) == 1
+
+
+def test_failover_host_is_appended_when_configured(tmp_path):
+    from runtime import create_image_host
+
+    host = create_image_host(
+        make_config(
+            tmp_path,
+            image_host={"type": "gitee", "config": {"server": "http://x"}},
+            failover_host={"type": "gitee", "config": {"server": "http://y"}},
+        )
+    )
+    assert [h.config["server"] for h in host.hosts] == ["http://x", "http://y"]
+
+
+def test_disabled_breaker_returns_the_bare_host(tmp_path):
+    from runtime import create_image_host
+
+    host = create_image_host(
+        make_config(
+            tmp_path,
+            image_host={"type": "gitee", "config": {"server": "http://x"}},
+            circuit_breaker={"enabled": False},
+        )
+    )
+    assert not isinstance(host, FailoverHost)
@@ -0,0 +1,81 @@
+"""FileMemo：stat 有效期、文件变化后哈希失效、LRU 容量、持久化到数据库"""
+import os
+
+from conftest import make_png
+from file_memo import FileMemo
+
+
+def rewrite(path, color):
+    """改写图片内容并确保修改时间变化"""
+    stat = os.stat(path)
+    make_png(path, color)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+def test_stat_is_cached_within_the_ttl(tmp_path):
+    path = make_png(str(tmp_path / "a.png"))
+    memo = FileMemo(stat_ttl=60)
+    assert memo.exists(path)
+    os.remove(path)
+    # 有效期内不再访问文件系统
+    assert memo.exists(path)
+    memo.invalidate(path)
+    assert not memo.exists(path)
+    assert memo.summary()["stat_misses"] == 2
+
+
+def test_changed_file_is_rehashed(tmp_path):
+    path = make_png(str(tmp_path / "a.png"))
+    memo = FileMemo(stat_ttl=60)
+    first = memo.hash(path)
+    assert memo.hash(path) == first
+    assert memo.summary()["hash_misses"] == 1
+
+    rewrite(path, (0, 0, 255))
+    # 有效期内仍是旧的 stat 结果，失效后按新的文件身份重新计算
+    assert memo.hash(path) == first
+    memo.invalidate()
+    second = memo.hash(path)
+    assert second != first
+    assert second[1] == "png"
+
+
+def test_zero_ttl_always_restats(tmp_path):
+    path = make_png(str(tmp_path / "a.png"))
+    memo = FileMemo(stat_ttl=0)
+    first = memo.hash(path)
+    rewrite(path, (0, 0, 255))
+    assert memo.hash(path) != first
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    paths = [make_png(str(tmp_path / f"{i}.png")) for i in range(3)]
+    memo = FileMemo(capacity=2, stat_ttl=60)
+    memo.hash(paths[0])
+    memo.hash(paths[1])
+    memo.stat(paths[0])
+    memo.hash(paths[2])
+
+    assert memo.summary()["entries"] == 2
+    memo.hash(paths[0])
+    assert memo.summary()["hash_misses"] == 3
+    memo.hash(paths[1])
+    assert memo.summary()["hash_misses"] == 4
+
+
+def test_hashes_persist_across_instances(tmp_path):
+    path = make_png(str(tmp_path / "a.png"))
+    db_path = str(tmp_path / "file_memo.db")
+    first = FileMemo(db_path=db_path)
+    digest = first.hash(path)
+    first.close()
+
+    second = FileMemo(db_path=db_path)
+    assert second.cached_hash(path) == digest
+    assert second.summary()["hash_hits"] == 1
+
+    # 文件变化后数据库中的旧记录不再使用
+    rewrite(path, (0, 255, 0))
+    third = FileMemo(db_path=db_path)
+    assert third.cached_hash(path) is None
+    assert third.hash(path) != digest
@@ -0,0 +1,80 @@
+"""过滤模式的标准输出约定：标准输出只有改写后的文档，日志全部输出到标准错误"""
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from benchmarks.fake_servers import FakeHostServer
+from conftest import PYTHON_DIR
+
+CLI = os.path.join(PYTHON_DIR, "cli.py")
+
+
+def run_filter(cwd, config, stdin, *args):
+    config_path = os.path.join(cwd, "config.json")
+    with open(config_path, "w", encoding="utf-8") as f:
+        json.dump(config, f)
+    env = dict(os.environ, HOME=str(cwd), XDG_DATA_HOME=os.path.join(cwd, "data"))
+    return subprocess.run(
+        [sys.executable, CLI, "--config", config_path, "filter", *args],
+        input=stdin,
+        capture_output=True,
+        cwd=str(cwd),
+        env=env,
+        timeout=60,
+    )
+
+
+@pytest.fixture
+def workdir(vault, tmp_path):
+    """运行目录与仓库分开，便于检查运行目录中没有生成多余的文件"""
+    workdir = tmp_path / "work"
+    workdir.mkdir()
+    return workdir
+
+
+def test_stdout_is_only_the_rewritten_document(vault, workdir):
+    source = (vault / "a.md").read_bytes()
+    with FakeHostServer(latency=0, jitter=0) as server:
+        config = {"image_host": {"type": "gitee", "config": {"server": server.base_url}}}
+        first = run_filter(workdir, config, source, "--base", str(vault))
+        second = run_filter(workdir, config, source, "--base", str(vault))
+        requests = server.requests
+        base_url = server.base_url
+
+    assert first.returncode == 0, first.stderr.decode("utf-8")
+    lines = first.stdout.decode("utf-8").splitlines()
+    assert lines[0] == "# a"
+    assert all(line.startswith(f"![]({base_url}/files/") for line in lines[1:])
+    assert len(lines) == 3
+    # 日志（上传进度、性能汇总）只出现在标准错误
+    assert "性能汇总" in second.stderr.decode("utf-8")
+    # 第二次运行命中上传缓存，输出相同且不再上传
+    assert second.stdout == first.stdout
+    assert requests == 2
+    assert sorted(os.listdir(workdir)) == ["config.json", "data"]
+
+
+def test_failed_upload_still_emits_the_document(vault, workdir):
+    source = (vault / "a.md").read_bytes()
+    with FakeHostServer(latency=0, jitter=0, error_rate=1.0) as server:
+        config = {
+            "image_host": {"type": "gitee", "config": {"server": server.base_url}},
+            "max_retries": 1,
+        }
+        result = run_filter(workdir, config, source, "--base", str(vault), "--no-cache")
+
+    assert result.returncode == 1
+    assert result.stdout == source
+    assert result.stderr
+
+
+def test_config_errors_go_to_stderr(vault, workdir):
+    source = (vault / "a.md").read_bytes()
+    config = {"image_host": {"type": "nonexistent", "config": {}}, "max_retries": 1}
+    result = run_filter(workdir, config, source, "--base", str(vault), "--no-cache")
+
+    assert result.stdout == source
+    assert "nonexistent" in result.stderr.decode("utf-8")
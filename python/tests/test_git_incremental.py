@@ -0,0 +1,91 @@
+"""Git 增量模式：只处理暂存区笔记（跳过部分暂存的笔记），或上次处理的提交之后有变化的笔记"""
+import shutil
+import subprocess
+
+import pytest
+
+from git_incremental import PROCESSED_COMMIT_KEY, process_git_changes, run_git
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="需要git")
+
+
+class NamedHost:
+    """按文件名返回URL的图床"""
+
+    def __init__(self):
+        self.uploads = []
+
+    def get_name(self):
+        return "named"
+
+    def upload(self, image_path):
+        name = image_path.replace("\\", "/").rsplit("/", 1)[-1]
+        self.uploads.append(name)
+        return f"https://img.example/{name}"
+
+
+def git(repo, *args):
+    return subprocess.run(
+        ["git", "-C", str(repo), "-c", "user.name=test", "-c", "user.email=test@example.com",
+         *args],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+
+
+@pytest.fixture
+def repo(vault):
+    git(vault, "init", "-q")
+    git(vault, "add", ".")
+    git(vault, "commit", "-q", "-m", "init")
+    return vault
+
+
+def staged_content(repo, path):
+    return git(repo, "show", f":{path}")
+
+
+def test_staged_notes_are_rewritten_and_restaged(repo):
+    (repo / "a.md").write_text("# a\n![[red.png]]\n", encoding="utf-8")
+    git(repo, "add", "a.md")
+
+    result = process_git_changes(str(repo), image_host=NamedHost(), staged=True)
+
+    assert (result["notes"], result["changed_notes"]) == (1, 1)
+    assert staged_content(repo, "a.md") == "# a\n![](https://img.example/red.png)\n"
+    # 只处理暂存区中的笔记
+    assert "![[green.png]]" in (repo / "b.md").read_text(encoding="utf-8")
+
+
+def test_partially_staged_notes_are_skipped(repo):
+    (repo / "a.md").write_text("# a\n![[red.png]]\n", encoding="utf-8")
+    (repo / "b.md").write_text("# b\n![[blue.png]]\n", encoding="utf-8")
+    git(repo, "add", "a.md", "b.md")
+    (repo / "a.md").write_text("# a\n![[red.png]]\nunstaged\n", encoding="utf-8")
+
+    host = NamedHost()
+    result = process_git_changes(str(repo), image_host=host, staged=True)
+
+    assert result["notes"] == 1
+    assert host.uploads == ["blue.png"]
+    assert staged_content(repo, "a.md") == "# a\n![[red.png]]\n"
+    assert (repo / "a.md").read_text(encoding="utf-8").endswith("unstaged\n")
+
+
+def test_only_notes_changed_since_the_processed_commit(repo):
+    first = process_git_changes(str(repo), image_host=NamedHost())
+    assert first["notes"] == 2
+    assert run_git(str(repo), "config", "--get", PROCESSED_COMMIT_KEY).strip() == first["commit"]
+
+    git(repo, "commit", "-q", "-am", "upload")
+    uploaded = git(repo, "rev-parse", "HEAD").strip()
+    (repo / "b.md").write_text("# b\n![[red.png]]\n", encoding="utf-8")
+    (repo / "c.md").write_text("![[blue.png]]\n", encoding="utf-8")
+    host = NamedHost()
+    second = process_git_changes(str(repo), image_host=host, since=uploaded)
+
+    # 未提交的修改和未跟踪的笔记都会处理，a.md 没有变化
+    assert (second["notes"], second["changed_notes"]) == (2, 2)
+    assert sorted(host.uploads) == ["blue.png", "red.png"]
+    assert second["commit"] == uploaded
@@ -0,0 +1,87 @@
+"""图片格式识别：按文件头识别、Content-Type、补全文件名、允许上传的格式"""
+import hashlib
+import os
+
+import pytest
+
+import image_formats
+from conftest import make_png
+from image_formats import (
+    configure_image_types,
+    content_type,
+    hash_and_detect,
+    image_extensions,
+    is_allowed,
+    sniff,
+    upload_name,
+)
+
+
+def png_named(tmp_path, name):
+    """生成PNG图片后改名（扩展名与内容不一致或没有扩展名）"""
+    path = str(tmp_path / name)
+    os.replace(make_png(str(tmp_path / "source.png")), path)
+    return path
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        (b"\x89PNG\r\n\x1a\n" + b"\x00" * 8, "png"),
+        (b"\xff\xd8\xff\xe0" + b"\x00" * 8, "jpeg"),
+        (b"GIF89a" + b"\x00" * 8, "gif"),
+        (b"RIFF\x00\x00\x00\x00WEBPVP8 ", "webp"),
+        (b"\x00\x00\x00\x1cftypavif", "avif"),
+        (b"\x00\x00\x00\x18ftypheic", "heic"),
+        (b"\x00\x00\x00\x18ftypisom", None),
+        (b"II*\x00" + b"\x00" * 8, "tiff"),
+        (b"\x00\x00\x01\x00\x01\x00", "ico"),
+        (b"BM" + b"\x00" * 30, "bmp"),
+        (b"BM too short", None),
+        (b"\xef\xbb\xbf<?xml version='1.0'?>\n<svg xmlns='x'/>", "svg"),
+        (b"<?xml version='1.0'?><note/>", None),
+        (b"plain text", None),
+    ],
+)
+def test_sniff(header, expected):
+    assert sniff(header) == expected
+
+
+def test_content_type_prefers_the_file_content(tmp_path):
+    # 扩展名是 .jpg，内容其实是 PNG
+    path = png_named(tmp_path, "photo.jpg")
+    assert content_type(path) == "image/png"
+
+    unknown = tmp_path / "notes.txt"
+    unknown.write_bytes(b"plain text")
+    assert content_type(str(unknown)) == "text/plain"
+
+
+def test_upload_name_adds_a_missing_extension(tmp_path):
+    pasted = png_named(tmp_path, "Pasted image 20240101")
+    assert upload_name(pasted) == "Pasted image 20240101.png"
+    assert upload_name(make_png(str(tmp_path / "keep.jpeg"))) == "keep.jpeg"
+
+
+def test_hash_and_detect_returns_digest_and_format(tmp_path):
+    path = make_png(str(tmp_path / "a.png"), size=(600, 600))
+    with open(path, "rb") as f:
+        expected = hashlib.sha256(f.read()).hexdigest()
+    assert hash_and_detect(path) == (expected, "png")
+
+
+@pytest.fixture
+def restore_types():
+    previous = image_formats.allowed_types()
+    yield
+    configure_image_types(previous)
+
+
+def test_configure_image_types(restore_types):
+    assert configure_image_types(["PNG", "tiff", "psd"]) == ["psd"]
+    assert is_allowed("tiff") and not is_allowed("jpeg")
+    assert image_extensions() == ["png", "tif", "tiff"]
+
+    # 为空时恢复默认格式
+    configure_image_types([])
+    assert is_allowed("jpeg") and not is_allowed("tiff")
@@ -0,0 +1,118 @@
+"""JobQueue：跨进程领取、租约过期后重新领取、改写任务的依赖"""
+import multiprocessing
+import time
+
+from conftest import make_png
+from job_queue import DONE, FAILED, REWRITE, UPLOAD, JobQueue
+
+
+def _lease_all(db_path, owner):
+    """在子进程中领取上传任务直到队列为空，返回领取到的任务ID"""
+    queue = JobQueue(db_path)
+    leased = []
+    while True:
+        job = queue.lease(owner, UPLOAD)
+        if job is None:
+            return leased
+        leased.append(job["id"])
+        queue.complete(job["id"], owner, f"https://img.example/{job['key']}")
+
+
+def _lease_one(db_path, owner, lease_timeout):
+    """在子进程中领取一个上传任务"""
+    job = JobQueue(db_path, lease_timeout=lease_timeout).lease(owner, UPLOAD)
+    return job and job["id"]
+
+
+def test_enqueue_is_idempotent(vault, tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"))
+    assert queue.enqueue_vault(str(vault)) == {"notes": 2, "images": 3}
+    assert queue.enqueue_vault(str(vault)) == {"notes": 2, "images": 3}
+    assert queue.counts() == {UPLOAD: {"pending": 3}, REWRITE: {"pending": 2}}
+
+
+def test_processes_never_lease_the_same_job(tmp_path):
+    notes = tmp_path / "vault"
+    for i in range(40):
+        make_png(str(notes / "Z-附件" / f"{i}.png"), (i * 6, 0, 0))
+    (notes / "note.md").write_text(
+        "".join(f"![[{i}.png]]\n" for i in range(40)), encoding="utf-8"
+    )
+    db_path = str(tmp_path / "jobs.db")
+    JobQueue(db_path).enqueue_vault(str(notes))
+
+    with multiprocessing.get_context("spawn").Pool(4) as pool:
+        results = pool.starmap(_lease_all, [(db_path, f"worker-{i}") for i in range(4)])
+
+    leased = [job_id for ids in results for job_id in ids]
+    assert len(leased) == 40
+    assert len(set(leased)) == 40
+    assert JobQueue(db_path).counts()[UPLOAD] == {DONE: 40}
+
+
+def test_expired_lease_is_taken_over_by_another_process(vault, tmp_path):
+    db_path = str(tmp_path / "jobs.db")
+    queue = JobQueue(db_path, lease_timeout=0.5)
+    queue.enqueue_vault(str(vault))
+    job = queue.lease("crashed", UPLOAD)
+
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(1) as pool:
+        # 租约有效期内其他进程领取到的是下一个任务
+        assert pool.apply(_lease_one, (db_path, "other", 0.5)) != job["id"]
+        time.sleep(0.6)
+        assert pool.apply(_lease_one, (db_path, "rescuer", 0.5)) == job["id"]
+
+    # 原 worker 的租约已被接手，提交无效
+    assert not queue.complete(job["id"], "crashed", "https://img.example/late")
+    assert queue.complete(job["id"], "rescuer", "https://img.example/x")
+    assert queue.upload_results([job["key"]]) == {job["key"]: "https://img.example/x"}
+
+
+def test_heartbeat_keeps_the_lease(vault, tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"), lease_timeout=0.3)
+    queue.enqueue_vault(str(vault))
+    job = queue.lease("worker", UPLOAD)
+    for _ in range(3):
+        time.sleep(0.15)
+        queue.heartbeat("worker", [job["id"]])
+    other = JobQueue(queue.db_path, lease_timeout=0.3)
+    assert all(
+        leased["id"] != job["id"]
+        for leased in iter(lambda: other.lease("other", UPLOAD), None)
+    )
+
+
+def test_rewrite_waits_for_its_uploads(vault, tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"))
+    queue.enqueue_vault(str(vault))
+    assert queue.lease("worker", REWRITE) is None
+
+    uploads = list(iter(lambda: queue.lease("worker", UPLOAD), None))
+    for job in uploads[:-1]:
+        queue.complete(job["id"], "worker", f"https://img.example/{job['key']}")
+    # 只剩最后一张图片未完成时，只有不依赖它的笔记可以领取
+    ready = list(iter(lambda: queue.lease("worker", REWRITE), None))
+    assert len(ready) <= 1
+
+    queue.fail(uploads[-1]["id"], "worker", "boom", max_attempts=1)
+    ready += list(iter(lambda: queue.lease("worker", REWRITE), None))
+    assert len(ready) == 2
+
+
+def test_failed_job_is_retried_until_max_attempts(vault, tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"))
+    queue.enqueue_vault(str(vault))
+    job = queue.lease("worker", UPLOAD)
+    queue.fail(job["id"], "worker", "timeout", max_attempts=2)
+
+    retried = queue.lease("worker", UPLOAD)
+    assert retried["id"] == job["id"]
+    assert retried["attempts"] == 1
+    queue.fail(job["id"], "worker", "timeout", max_attempts=2)
+
+    assert queue.counts()[UPLOAD][FAILED] == 1
+    assert queue.failures()[0]["error"] == "timeout"
+    # 重新扫描仓库时失败的上传重新排队
+    queue.enqueue_vault(str(vault))
+    assert FAILED not in queue.counts()[UPLOAD]
@@ -0,0 +1,112 @@
+"""LinkChecker：提取远程链接、检查结果缓存（暂时性失败不缓存）、默认缓存路径"""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from link_checker import LinkChecker, LinkCheckCache
+
+
+class Handler(BaseHTTPRequestHandler):
+    """/ok 正常，/gone 不存在，/busy 暂时不可用，/nohead 不支持HEAD"""
+
+    def log_message(self, format, *args):
+        pass
+
+    def _respond(self, status):
+        self.server.requests.append((self.command, self.path))
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_HEAD(self):
+        statuses = {"/ok": 200, "/gone": 404, "/busy": 503, "/nohead": 405}
+        self._respond(statuses.get(self.path, 404))
+
+    def do_GET(self):
+        self._respond(200 if self.path == "/nohead" else 404)
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    httpd.requests = []
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def base_url(server):
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def test_extract_remote_urls_normalizes_and_dedupes():
+    content = (
+        "![a](https://img.example/a.png)\n"
+        "![b](<https://img.example/b.png> \"title\")\n"
+        "![a again](https://img.example/a.png)\n"
+        "![[local.png]]\n![c](//img.example/c.png)\n![d](images/d.png)\n"
+    )
+    assert LinkChecker.extract_remote_urls(content) == [
+        "https://img.example/a.png",
+        "https://img.example/b.png",
+        "https://img.example/c.png",
+    ]
+
+
+def test_check_vault_reports_each_note(server, tmp_path):
+    url = base_url(server)
+    (tmp_path / "a.md").write_text(f"![]({url}/ok)\n![]({url}/gone)\n", encoding="utf-8")
+    (tmp_path / "b.md").write_text(f"![]({url}/nohead)\n", encoding="utf-8")
+    (tmp_path / "c.md").write_text("no images\n", encoding="utf-8")
+
+    report = LinkChecker(max_workers=4).check_vault(str(tmp_path))
+
+    assert sorted(report) == [str(tmp_path / "a.md"), str(tmp_path / "b.md")]
+    assert [(link["ok"], link["status"]) for link in report[str(tmp_path / "a.md")]] == [
+        (True, 200),
+        (False, 404),
+    ]
+    # 不支持HEAD的服务器退回到GET
+    assert report[str(tmp_path / "b.md")][0]["ok"]
+    assert ("GET", "/nohead") in server.requests
+
+
+def test_transient_failures_are_rechecked(server, tmp_path):
+    url = base_url(server)
+    (tmp_path / "a.md").write_text(
+        f"![]({url}/ok)\n![]({url}/gone)\n![]({url}/busy)\n", encoding="utf-8"
+    )
+    cache_path = str(tmp_path / "cache.json")
+
+    LinkChecker(cache=LinkCheckCache(cache_path)).check_vault(str(tmp_path))
+    server.requests.clear()
+    LinkChecker(cache=LinkCheckCache(cache_path)).check_vault(str(tmp_path))
+
+    # 确定的结果（200、404）从缓存读取，503 重新检查
+    assert server.requests == [("HEAD", "/busy")]
+
+
+def test_expired_entries_are_rechecked(server, tmp_path):
+    url = base_url(server)
+    (tmp_path / "a.md").write_text(f"![]({url}/ok)\n", encoding="utf-8")
+    cache_path = str(tmp_path / "cache.json")
+
+    LinkChecker(cache=LinkCheckCache(cache_path)).check_vault(str(tmp_path))
+    LinkChecker(cache=LinkCheckCache(cache_path, ttl=0)).check_vault(str(tmp_path))
+
+    assert server.requests == [("HEAD", "/ok"), ("HEAD", "/ok")]
+
+
+def test_default_cache_path_is_in_the_user_data_directory(tmp_path, monkeypatch):
+    from config_manager import ConfigManager
+
+    monkeypatch.setattr("sys.platform", "linux")
+    monkeypatch.setenv("XDG_DATA_HOME", str(tmp_path / "data"))
+    config = ConfigManager(str(tmp_path / "config.json"))
+
+    assert config.get_link_check_config()["cache_path"] == str(
+        tmp_path / "data" / "md2picgo" / "link_check_cache.json"
+    )
@@ -0,0 +1,96 @@
+"""NoteWriter：批量写回、并发修改时合并、冲突时跳过"""
+import os
+
+from note_writer import NoteWriter, apply_edits, read_note
+
+EDITS = [("![[red.png]]", "![](https://img.example/red.png)")]
+
+
+def rewrite(text):
+    return apply_edits(text, EDITS)
+
+
+def stage(writer, path):
+    """读取笔记并写入临时文件（模拟处理过程），返回改写后的内容"""
+    content, version = read_note(str(path))
+    new_content = rewrite(content)
+    writer.write(str(path), new_content, version, rewrite)
+    return new_content
+
+
+def leftovers(directory):
+    return [name for name in os.listdir(directory) if name.endswith(".tmp")]
+
+
+def test_unchanged_note_is_written(tmp_path):
+    note = tmp_path / "a.md"
+    note.write_text("# a\n![[red.png]]\n", encoding="utf-8")
+    writer = NoteWriter(durable=False)
+    new_content = stage(writer, note)
+
+    # 提交前源文件不变
+    assert note.read_text(encoding="utf-8") == "# a\n![[red.png]]\n"
+    assert writer.flush() == {str(note): NoteWriter.WRITTEN}
+    assert note.read_text(encoding="utf-8") == new_content
+    assert leftovers(tmp_path) == []
+
+
+def test_concurrent_edit_is_merged(tmp_path):
+    note = tmp_path / "a.md"
+    note.write_text("# a\n![[red.png]]\n", encoding="utf-8")
+    writer = NoteWriter(durable=False)
+    stage(writer, note)
+    # 处理期间用户在笔记末尾追加了内容
+    note.write_text("# a\n![[red.png]]\nnew line\n", encoding="utf-8")
+
+    assert writer.flush() == {str(note): NoteWriter.MERGED}
+    assert note.read_text(encoding="utf-8") == (
+        "# a\n![](https://img.example/red.png)\nnew line\n"
+    )
+    assert writer.stats[NoteWriter.MERGED] == 1
+    assert writer.stats[NoteWriter.WRITTEN] == 1
+    assert leftovers(tmp_path) == []
+
+
+def test_conflict_without_remaining_edits_is_skipped(tmp_path):
+    note = tmp_path / "a.md"
+    note.write_text("# a\n![[red.png]]\n", encoding="utf-8")
+    writer = NoteWriter(durable=False)
+    stage(writer, note)
+    # 用户删除了图片引用，重新应用改写后内容不变
+    note.write_text("# a\nimage removed\n", encoding="utf-8")
+
+    assert writer.flush() == {str(note): NoteWriter.SKIPPED}
+    assert note.read_text(encoding="utf-8") == "# a\nimage removed\n"
+    assert leftovers(tmp_path) == []
+
+
+def test_deleted_note_is_not_recreated(tmp_path):
+    note = tmp_path / "a.md"
+    note.write_text("# a\n![[red.png]]\n", encoding="utf-8")
+    writer = NoteWriter(durable=False)
+    stage(writer, note)
+    note.unlink()
+
+    assert writer.flush() == {str(note): NoteWriter.SKIPPED}
+    assert not note.exists()
+    assert leftovers(tmp_path) == []
+
+
+def test_batch_is_flushed_when_full(tmp_path):
+    committed = []
+    writer = NoteWriter(
+        batch_size=2, durable=False, on_commit=lambda path, status: committed.append(path)
+    )
+    notes = []
+    for name in ("a", "b", "c"):
+        note = tmp_path / f"{name}.md"
+        note.write_text(f"# {name}\n![[red.png]]\n", encoding="utf-8")
+        notes.append(note)
+        stage(writer, note)
+
+    assert committed == [str(notes[0]), str(notes[1])]
+    with writer:
+        pass
+    assert committed == [str(note) for note in notes]
+    assert writer.stats[NoteWriter.WRITTEN] == 3
@@ -0,0 +1,127 @@
+"""OfflineQueue：补传时跳过坏图片、图床不可达时暂停、失败次数上限、并发保存"""
+import json
+import threading
+
+import pytest
+import requests
+
+from conftest import make_png
+from image_hosts import FailoverHost
+from image_hosts.base import ImageHostBase
+from offline_queue import OfflineQueue
+
+
+class ScriptedHost(ImageHostBase):
+    """按图片文件名返回URL或抛出预设异常的图床"""
+
+    def __init__(self, errors=None):
+        self.errors = errors or {}
+        self.uploaded = []
+        super().__init__({})
+
+    def upload(self, image_path):
+        name = image_path.rsplit("/", 1)[-1]
+        if name in self.errors:
+            raise self.errors[name]
+        self.uploaded.append(name)
+        return f"https://img.example/{name}"
+
+    def validate_config(self, config):
+        return True
+
+    def get_required_fields(self):
+        return []
+
+    def get_name(self):
+        return "scripted"
+
+
+@pytest.fixture
+def queued(tmp_path):
+    """三张图片排队，笔记中分别引用"""
+    queue = OfflineQueue(str(tmp_path / "offline_queue.json"), max_attempts=2)
+    notes = {}
+    for name in ("a", "b", "c"):
+        image = make_png(str(tmp_path / f"{name}.png"))
+        note = tmp_path / f"{name}.md"
+        note.write_text(f"![[{name}.png]]\n", encoding="utf-8")
+        queue.add(image, str(note), f"![[{name}.png]]", "host down")
+        notes[name] = note
+    return queue, notes
+
+
+def test_flush_uploads_and_patches_notes(queued):
+    queue, notes = queued
+    assert queue.flush(ScriptedHost()) == 3
+    assert len(queue) == 0
+    assert notes["b"].read_text(encoding="utf-8") == "![](https://img.example/b.png)\n"
+
+
+def test_bad_image_does_not_block_later_entries(queued):
+    queue, notes = queued
+    host = ScriptedHost({"a.png": ValueError("format rejected")})
+    assert queue.flush(host) == 2
+    assert host.uploaded == ["b.png", "c.png"]
+    assert len(queue) == 1
+    assert queue.pending()[0]["attempts"] == 1
+
+    # 达到失败次数上限后不再自动重试
+    assert queue.flush(host) == 0
+    assert len(queue) == 0
+    (parked,) = queue.parked()
+    assert parked["last_error"] == "format rejected"
+    assert notes["a"].read_text(encoding="utf-8") == "![[a.png]]\n"
+
+
+def test_readding_a_parked_image_retries_it(queued):
+    queue, notes = queued
+    host = ScriptedHost({"a.png": ValueError("format rejected")})
+    queue.flush(host)
+    queue.flush(host)
+    (parked,) = queue.parked()
+    queue.add(parked["image_path"], str(notes["a"]), "![[a.png]]", "still failing")
+    assert len(queue) == 1
+    assert queue.pending()[0]["attempts"] == 0
+
+
+@pytest.mark.parametrize(
+    "error", [ConnectionError("refused"), requests.ConnectionError("refused")]
+)
+def test_unreachable_host_stops_the_flush(queued, error):
+    queue, _ = queued
+    host = ScriptedHost({"a.png": error})
+    assert queue.flush(host) == 0
+    assert host.uploaded == []
+    # 网络问题不计入失败次数
+    assert [entry["attempts"] for entry in queue.pending()] == [0, 0, 0]
+
+
+def test_unreachable_behind_failover_stops_the_flush(queued):
+    queue, _ = queued
+    host = FailoverHost([ScriptedHost({"a.png": requests.Timeout("timed out")})])
+    assert queue.flush(host) == 0
+    assert len(queue) == 3
+
+
+def test_concurrent_saves(tmp_path):
+    path = tmp_path / "offline_queue.json"
+    queue = OfflineQueue(str(path))
+    errors = []
+
+    def worker(index):
+        try:
+            for i in range(50):
+                queue.add(f"/img/{index}-{i}.png", "/note.md", f"![[{index}-{i}.png]]")
+                queue.save()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(json.loads(path.read_text(encoding="utf-8"))) == 200
+    assert [name for name in tmp_path.iterdir() if name.suffix == ".tmp"] == []
@@ -0,0 +1,93 @@
+"""输出目录模式：硬链接、reflink、复制依次回退，改写笔记不影响源文件"""
+import os
+
+import pytest
+
+import output_tree
+from output_tree import OutputTree, link_file, write_atomic
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "src" / "a.png"
+    path.parent.mkdir()
+    path.write_bytes(b"image")
+    return str(path)
+
+
+def refuse(*args):
+    raise OSError("not supported")
+
+
+def test_hardlink_is_preferred(source, tmp_path):
+    dst = str(tmp_path / "out" / "a.png")
+    assert link_file(source, dst) == "hardlink"
+    assert os.path.samefile(source, dst)
+    # 已经是同一文件时不再链接
+    assert link_file(source, dst) == "unchanged"
+
+
+def test_falls_back_to_reflink(source, tmp_path, monkeypatch):
+    cloned = []
+
+    def reflink(src, dst):
+        cloned.append(src)
+        output_tree.shutil.copy2(src, dst)
+
+    monkeypatch.setattr(output_tree.os, "link", refuse)
+    monkeypatch.setattr(output_tree, "_reflink", reflink)
+    dst = str(tmp_path / "out" / "a.png")
+    assert link_file(source, dst) == "reflink"
+    assert cloned == [source]
+
+
+def test_falls_back_to_copy_and_replaces_the_target(source, tmp_path, monkeypatch):
+    monkeypatch.setattr(output_tree.os, "link", refuse)
+    monkeypatch.setattr(output_tree, "_reflink", refuse)
+    dst = tmp_path / "out" / "a.png"
+    dst.parent.mkdir()
+    dst.write_bytes(b"stale")
+
+    assert link_file(source, str(dst)) == "copy"
+    assert dst.read_bytes() == b"image"
+    assert not os.path.samefile(source, dst)
+    assert os.listdir(dst.parent) == ["a.png"]
+
+
+def test_failed_copy_leaves_no_temporary_file(source, tmp_path, monkeypatch):
+    def broken_copy(src, dst):
+        open(dst, "wb").close()
+        raise OSError("disk full")
+
+    monkeypatch.setattr(output_tree.os, "link", refuse)
+    monkeypatch.setattr(output_tree, "_reflink", refuse)
+    monkeypatch.setattr(output_tree.shutil, "copy2", broken_copy)
+    with pytest.raises(OSError):
+        link_file(source, str(tmp_path / "out" / "a.png"))
+    assert os.listdir(tmp_path / "out") == []
+
+
+def test_rewriting_a_linked_note_keeps_the_source(tmp_path):
+    note = tmp_path / "src" / "a.md"
+    note.parent.mkdir()
+    note.write_text("![[a.png]]\n", encoding="utf-8")
+    target = str(tmp_path / "out" / "a.md")
+    link_file(str(note), target)
+
+    write_atomic(target, "![](https://img.example/a.png)\n")
+    assert note.read_text(encoding="utf-8") == "![[a.png]]\n"
+
+
+def test_mirror_skips_rewritten_notes_and_the_output_dir(vault):
+    tree = OutputTree(str(vault), str(vault / "out"))
+    counts = tree.mirror(skip=[str(vault / "a.md")])
+
+    assert counts["hardlink"] == 4
+    assert counts["failed"] == 0
+    assert sorted(os.listdir(vault / "out")) == ["Z-附件", "b.md"]
+    assert tree.mirror(skip=[str(vault / "a.md")])["unchanged"] == 4
+
+
+def test_output_dir_must_differ_from_the_source(vault):
+    with pytest.raises(ValueError):
+        OutputTree(str(vault), str(vault) + os.sep)
@@ -0,0 +1,127 @@
+"""VaultPipeline：各阶段依次处理、相同内容只上传一次、出错的笔记和图片按失败结束"""
+import shutil
+import threading
+
+import pytest
+
+from pipeline import VaultPipeline
+
+
+class RecordingHost:
+    """记录上传次数的图床"""
+
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.uploads = []
+        self._lock = threading.Lock()
+
+    def get_name(self):
+        return "recording"
+
+    def upload(self, image_path):
+        name = image_path.replace("\\", "/").rsplit("/", 1)[-1]
+        with self._lock:
+            self.uploads.append(name)
+        if name in self.fail:
+            raise ConnectionError("refused")
+        return f"https://img.example/{name}"
+
+
+def run(paths, **kwargs):
+    images, notes = [], []
+    pipeline = VaultPipeline(
+        on_image=lambda job: images.append((job.raw_path, job.status)),
+        on_note=lambda path, status: notes.append((path, status)),
+        **kwargs,
+    )
+    stats = pipeline.run([str(path) for path in paths])
+    return stats, images, dict(notes)
+
+
+def test_notes_are_rewritten_and_identical_images_uploaded_once(vault):
+    host = RecordingHost()
+    stats, images, notes = run([vault / "a.md", vault / "b.md"], image_host=host)
+
+    assert sorted(host.uploads) == ["blue.png", "green.png", "red.png"]
+    assert stats["notes"] == 2
+    assert stats["images"] == 4
+    assert (stats["uploaded"], stats["reused"], stats["failed"]) == (3, 1, 0)
+    assert stats["changed_notes"] == 2
+    assert notes == {str(vault / "a.md"): "written", str(vault / "b.md"): "written"}
+    assert (vault / "b.md").read_text(encoding="utf-8") == (
+        "# b\n![](https://img.example/green.png)\n![](https://img.example/blue.png)\n"
+    )
+
+
+def test_copies_with_the_same_content_are_deduplicated(vault):
+    shutil.copy(vault / "Z-附件" / "red.png", vault / "Z-附件" / "red-copy.png")
+    (vault / "c.md").write_text("![[red-copy.png]]\n", encoding="utf-8")
+    host = RecordingHost()
+    stats, _, _ = run([vault / "a.md", vault / "c.md"], image_host=host)
+
+    # red.png 和 red-copy.png 内容相同，只上传其中一张
+    assert len(host.uploads) == 2
+    assert stats["reused"] == 1
+    assert "https://img.example/red" in (vault / "c.md").read_text(encoding="utf-8")
+
+
+def test_failed_upload_keeps_the_local_link(vault):
+    host = RecordingHost(fail={"green.png"})
+    stats, images, notes = run([vault / "a.md"], image_host=host)
+
+    assert stats["failed"] == 1
+    assert sorted(images) == [("green.png", "failed"), ("red.png", "uploaded")]
+    assert (vault / "a.md").read_text(encoding="utf-8") == (
+        "# a\n![](https://img.example/red.png)\n![[green.png]]\n"
+    )
+
+
+def test_missing_note_is_reported_as_failed(vault):
+    stats, _, notes = run([vault / "a.md", vault / "missing.md"], image_host=RecordingHost())
+
+    assert stats["notes"] == 2
+    assert stats["failed_notes"] == 1
+    assert notes[str(vault / "missing.md")] == "failed"
+    assert notes[str(vault / "a.md")] == "written"
+
+
+def test_unexpected_stage_error_fails_the_image_not_the_run(vault, monkeypatch):
+    def broken(self, job):
+        if job.raw_path == "green.png":
+            raise RuntimeError("boom")
+        return original(self, job)
+
+    original = VaultPipeline._transform
+    monkeypatch.setattr(VaultPipeline, "_transform", broken)
+    stats, images, notes = run([vault / "a.md", vault / "b.md"], image_host=RecordingHost())
+
+    assert ("green.png", "failed") in images
+    assert len(images) == 4
+    assert set(notes) == {str(vault / "a.md"), str(vault / "b.md")}
+    assert "https://img.example/red.png" in (vault / "a.md").read_text(encoding="utf-8")
+
+
+def test_unexpected_rewrite_error_fails_the_note(vault, monkeypatch):
+    def broken(self, content, edits):
+        if "# a" in content:
+            raise RuntimeError("boom")
+        return original(self, content, edits)
+
+    original = VaultPipeline._apply
+    monkeypatch.setattr(VaultPipeline, "_apply", broken)
+    stats, _, notes = run([vault / "a.md", vault / "b.md"], image_host=RecordingHost())
+
+    assert notes == {str(vault / "a.md"): "failed", str(vault / "b.md"): "written"}
+    assert stats["failed_notes"] == 1
+
+
+@pytest.mark.parametrize("queue_size", [1, 64])
+def test_small_queues_still_finish(vault, queue_size):
+    for i in range(20):
+        (vault / f"n{i}.md").write_text("![[red.png]]\n![[blue.png]]\n", encoding="utf-8")
+    paths = sorted(vault.glob("*.md"))
+    stats, _, notes = run(paths, image_host=RecordingHost(), queue_size=queue_size)
+
+    assert stats["notes"] == len(paths)
+    assert len(notes) == len(paths)
+    assert stats["uploaded"] == 3
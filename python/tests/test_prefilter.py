@@ -0,0 +1,40 @@
+"""按字节预过滤：小文件直接读取、大文件使用内存映射，WordPress 处理跳过不含相关链接的笔记"""
+import os
+
+import pytest
+
+from prefilter import MMAP_THRESHOLD, contains_any, might_contain_images
+from wordpress_processor import WordPressLinkProcessor
+
+
+@pytest.mark.parametrize("padding", [0, MMAP_THRESHOLD * 2])
+def test_markers_are_found_in_small_and_large_files(tmp_path, padding):
+    note = tmp_path / "note.md"
+    note.write_bytes(b"x" * padding + "# 标题\n<img src='a.png'>\n".encode("utf-8"))
+    assert might_contain_images(str(note))
+    assert not contains_any(str(note), (b"![",))
+
+
+def test_empty_and_plain_notes_are_skipped(tmp_path):
+    empty = tmp_path / "empty.md"
+    empty.write_bytes(b"")
+    plain = tmp_path / "plain.md"
+    plain.write_text("没有图片的笔记\n" * 10000, encoding="utf-8")
+    assert not might_contain_images(str(empty))
+    assert not might_contain_images(str(plain))
+
+
+def test_wordpress_pass_leaves_unrelated_notes_untouched(tmp_path):
+    plain = tmp_path / "plain.md"
+    plain.write_text("![](https://img.example/a.png)\n", encoding="utf-8")
+    before = os.stat(plain).st_mtime_ns
+
+    # 只移除前缀时，不含前缀的笔记在解码前跳过，也不会写回
+    assert WordPressLinkProcessor.process_file(str(plain), remove_wp=True) == 0
+    assert os.stat(plain).st_mtime_ns == before
+
+    assert WordPressLinkProcessor.process_file(str(plain), convert_to_wp=True) == 1
+    converted = plain.read_text(encoding="utf-8")
+    assert WordPressLinkProcessor.WORDPRESS_PREFIX in converted
+    assert WordPressLinkProcessor.process_file(str(plain), remove_wp=True) == 1
+    assert plain.read_text(encoding="utf-8") == "![](https://img.example/a.png)\n"
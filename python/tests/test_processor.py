@@ -0,0 +1,110 @@
+"""Processor：结构化结果、进度回调、异步接口，以及按配置创建时不导入图形界面"""
+import asyncio
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import PYTHON_DIR
+from processor import Processor
+
+
+class NamedHost:
+    """按文件名返回URL的图床，指定的文件上传失败"""
+
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+
+    def get_name(self):
+        return "named"
+
+    def upload(self, image_path):
+        name = image_path.replace("\\", "/").rsplit("/", 1)[-1]
+        if name in self.fail:
+            raise ValueError("rejected")
+        return f"https://img.example/{name}"
+
+
+def test_results_are_grouped_by_note_in_reference_order(vault):
+    processor = Processor(image_host=NamedHost(fail={"blue.png"}))
+    result = processor.process_vault(str(vault))
+
+    assert [note.path for note in result.notes] == [str(vault / "a.md"), str(vault / "b.md")]
+    a, b = result.notes
+    assert a.status == "written" and a.changed
+    assert [(image.index, image.raw_path) for image in b.images] == [
+        (0, "green.png"),
+        (1, "blue.png"),
+    ]
+    assert b.images[0].url == "https://img.example/green.png"
+    assert [(image.raw_path, image.url) for image in result.failed_images] == [
+        ("blue.png", None)
+    ]
+    assert result.stats["notes"] == 2
+    assert json.loads(json.dumps(result.to_dict()))["notes"][0]["path"] == str(vault / "a.md")
+
+
+def test_progress_counts_every_image_and_note(vault):
+    events = []
+    Processor(image_host=NamedHost()).process_files(
+        [vault / "a.md", vault / "b.md", vault], on_progress=events.append
+    )
+
+    # 目录和文件重复指定时每篇笔记只处理一次
+    notes = [event for event in events if event.kind == "note"]
+    images = [event for event in events if event.kind == "image"]
+    assert len(notes) == 2 and len(images) == 4
+    assert [event.notes_done for event in notes] == [1, 2]
+    assert notes[-1].notes_total == 2
+    assert notes[-1].images_done == 4
+
+
+def test_non_markdown_path_is_rejected(vault):
+    with pytest.raises(FileNotFoundError):
+        Processor(image_host=NamedHost()).process_files([vault / "Z-附件" / "red.png"])
+
+
+def test_async_progress_runs_on_the_event_loop(vault):
+    seen = []
+
+    async def main():
+        loop_thread = asyncio.get_running_loop()
+
+        async def on_progress(event):
+            seen.append((event.kind, asyncio.get_running_loop() is loop_thread))
+
+        return await Processor(image_host=NamedHost()).process_vault_async(
+            str(vault), on_progress=on_progress
+        )
+
+    result = asyncio.run(main())
+    assert len(result.images) == 4
+    assert len(seen) == 6
+    assert all(on_loop for _, on_loop in seen)
+
+
+def test_from_config_does_not_import_the_gui(tmp_path):
+    config = tmp_path / "config.json"
+    config.write_text(
+        json.dumps({"image_host": {"type": "gitee", "config": {"server": "http://x"}}}),
+        encoding="utf-8",
+    )
+    script = (
+        "import sys\n"
+        "from config_manager import ConfigManager\n"
+        "from processor import Processor\n"
+        f"with Processor.from_config(ConfigManager({str(config)!r})) as processor:\n"
+        "    assert processor.image_host is not None\n"
+        "print(sorted(name for name in ('main', 'ui') if name in sys.modules))\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=PYTHON_DIR,
+        capture_output=True,
+        env=dict(os.environ, HOME=str(tmp_path), XDG_DATA_HOME=str(tmp_path)),
+        timeout=60,
+    )
+    assert result.returncode == 0, result.stderr.decode("utf-8")
+    assert result.stdout.decode("utf-8").strip() == "[]"
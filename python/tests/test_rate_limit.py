@@ -0,0 +1,95 @@
+"""TokenBucket：突发容量、大文件欠账、异步获取；各图床共用限速器"""
+import asyncio
+
+import pytest
+
+import rate_limit
+from rate_limit import HostRateLimiter, TokenBucket, configure_rate_limits, get_rate_limiter
+
+
+class FakeTime:
+    """
+    替换 rate_limit 中的 time 模块：sleep 只推进时钟
+
+    测试使用2的幂作为速率，等待时间可以精确表示，时钟不会因舍入误差停在原地
+    """
+
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self):
+        return self.now
+
+    perf_counter = monotonic
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeTime()
+    monkeypatch.setattr(rate_limit, "time", clock)
+
+    async def sleep(seconds):
+        clock.sleep(seconds)
+
+    monkeypatch.setattr(rate_limit.asyncio, "sleep", sleep)
+    return clock
+
+
+def test_burst_up_to_capacity_then_waits(clock):
+    bucket = TokenBucket(rate=8)
+    for _ in range(8):
+        assert bucket.acquire() == 0
+    assert bucket.acquire() == 0.125
+
+
+def test_oversized_request_runs_into_debt(clock):
+    bucket = TokenBucket(rate=64)
+    # 超过容量的请求在桶满时放行
+    assert bucket.acquire(320) == 0
+    # 欠下的 256 个令牌还清并攒够 16 个令牌后才能继续
+    assert bucket.acquire(16) == 4.25
+    assert clock.now == 4.25
+
+
+def test_oversized_request_waits_for_a_full_bucket(clock):
+    bucket = TokenBucket(rate=64)
+    bucket.acquire(32)
+    assert bucket.acquire(320) == 0.5
+
+
+def test_refill_is_capped_at_capacity(clock):
+    bucket = TokenBucket(rate=8, capacity=4)
+    for _ in range(4):
+        bucket.acquire()
+    clock.now += 60
+    for _ in range(4):
+        assert bucket.acquire() == 0
+    assert bucket.acquire() == 0.125
+
+
+def test_async_acquire_shares_the_bucket(clock):
+    limiter = HostRateLimiter(bytes_per_second=1024, requests_per_second=2)
+    assert limiter.acquire(size=1024) == 0
+
+    waited = asyncio.run(limiter.acquire_async(size=512))
+    # 请求配额还剩一个，字节配额需要等 0.5 秒
+    assert waited == 0.5
+
+
+def test_limiters_are_shared_until_the_config_changes():
+    configure_rate_limits({"smms": {"requests_per_second": 2}})
+    try:
+        limiter = get_rate_limiter("smms")
+        assert limiter is get_rate_limiter("smms")
+        assert get_rate_limiter("github") is None
+
+        # 相同配置不重建，保留已消耗的令牌
+        configure_rate_limits({"smms": {"requests_per_second": 2}})
+        assert get_rate_limiter("smms") is limiter
+        configure_rate_limits({"smms": {"requests_per_second": 5}})
+        assert get_rate_limiter("smms").requests_bucket.rate == 5
+    finally:
+        configure_rate_limits({})
@@ -0,0 +1,88 @@
+"""ReferenceIndex：记录引用、报告、图片替换后只改写引用它的笔记、清理已删除的笔记"""
+import itertools
+
+import pytest
+
+from conftest import make_png
+from file_memo import file_memo
+from pipeline import VaultPipeline
+from reference_index import ReferenceIndex, index_vault, update_image
+
+
+class VersionedHost:
+    """每次上传返回带序号的新URL"""
+
+    def __init__(self):
+        self.counter = itertools.count(1)
+        self.uploads = []
+
+    def get_name(self):
+        return "versioned"
+
+    def upload(self, image_path):
+        name = image_path.replace("\\", "/").rsplit("/", 1)[-1]
+        self.uploads.append(name)
+        return f"https://img.example/v{next(self.counter)}/{name}"
+
+
+@pytest.fixture
+def index(tmp_path_factory):
+    index = ReferenceIndex(str(tmp_path_factory.mktemp("data") / "reference_index.db"))
+    yield index
+    index.close()
+
+
+def test_index_vault_records_local_references(vault, index):
+    make_png(str(vault / "Z-附件" / "orphan.png"))
+    assert index_vault(str(vault), index) == 4
+
+    green = index.references(image_path=str(vault / "Z-附件" / "green.png"))
+    assert [(note, span) for note, span, _ in green] == [
+        (str(vault / "a.md"), "![[green.png]]"),
+        (str(vault / "b.md"), "![[green.png]]"),
+    ]
+    assert index.most_referenced(1) == [(str(vault / "Z-附件" / "green.png"), 2, 2)]
+    assert index.unused_attachments(str(vault)) == [str(vault / "Z-附件" / "orphan.png")]
+
+
+def test_reindexing_drops_references_removed_from_a_note(vault, index):
+    index_vault(str(vault), index)
+    (vault / "b.md").write_text("# b\n", encoding="utf-8")
+    index_vault(str(vault), index)
+
+    assert index.references(image_path=str(vault / "Z-附件" / "blue.png")) == []
+    assert len(index.references(image_path=str(vault / "Z-附件" / "green.png"))) == 1
+
+
+def test_replaced_image_is_uploaded_once_and_patched_everywhere(vault, index):
+    host = VersionedHost()
+    VaultPipeline(image_host=host, reference_index=index).run(
+        [str(vault / "a.md"), str(vault / "b.md")]
+    )
+    green = str(vault / "Z-附件" / "green.png")
+    old_url = index.image(green)["url"]
+    assert old_url in (vault / "b.md").read_text(encoding="utf-8")
+
+    # 内容未变化时不重新上传
+    assert update_image(green, index, image_host=host) == {"notes": 0, "patched": 0}
+
+    make_png(green, (0, 128, 0))
+    file_memo.invalidate(green)
+    host.uploads.clear()
+    assert update_image(green, index, image_host=host) == {"notes": 2, "patched": 2}
+
+    new_url = index.image(green)["url"]
+    assert host.uploads == ["green.png"]
+    for note in ("a.md", "b.md"):
+        content = (vault / note).read_text(encoding="utf-8")
+        assert new_url in content and old_url not in content
+
+
+def test_prune_forgets_deleted_notes(vault, index):
+    index_vault(str(vault), index)
+    (vault / "b.md").unlink()
+
+    assert index.prune() == 2
+    assert index.notes() == [str(vault / "a.md")]
+    assert index.image(str(vault / "Z-附件" / "blue.png")) is None
+    assert index.image(str(vault / "Z-附件" / "green.png")) is not None
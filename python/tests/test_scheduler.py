@@ -0,0 +1,96 @@
+"""SizeAwareQueue：大文件优先、小文件按笔记剩余图片数填充、结束标记最后返回"""
+import threading
+
+from scheduler import SizeAwareQueue, order_longest_first
+
+MB = 1024 * 1024
+SENTINEL = object()
+
+
+class Item:
+    def __init__(self, name, size, pending):
+        self.name = name
+        self.size = size
+        # 所属笔记剩余未上传的图片数
+        self.pending = pending
+
+
+def make_queue(workers=4, maxsize=16):
+    return SizeAwareQueue(
+        maxsize=maxsize,
+        workers=workers,
+        size_of=lambda item: item.size,
+        pending_of=lambda item: item.pending,
+        sentinel=SENTINEL,
+        large_threshold=5 * MB,
+    )
+
+
+def drain(queue, count):
+    return [queue.get().name for _ in range(count)]
+
+
+def test_order_longest_first_is_stable():
+    items = [("a", 1), ("b", 3), ("c", 1), ("d", 2)]
+    ordered = order_longest_first(items, lambda item: item[1])
+    assert [name for name, _ in ordered] == ["b", "d", "a", "c"]
+
+
+def test_largest_file_starts_first():
+    queue = make_queue()
+    for item in (Item("small", MB, 3), Item("large", 10 * MB, 5), Item("larger", 20 * MB, 5)):
+        queue.put(item)
+    assert drain(queue, 3) == ["larger", "large", "small"]
+
+
+def test_large_files_use_at_most_half_the_workers():
+    queue = make_queue(workers=2)
+    large = [Item(f"large-{i}", (10 + i) * MB, 9) for i in range(2)]
+    for item in large + [Item("small", MB, 9)]:
+        queue.put(item)
+
+    first = queue.get()
+    assert first.name == "large-1"
+    # 唯一的大文件名额已被占用，下一个取小文件
+    assert queue.get().name == "small"
+    queue.task_done(first)
+    assert queue.get().name == "large-0"
+
+
+def test_small_files_prefer_notes_closest_to_done():
+    queue = make_queue()
+    for item in (
+        Item("note-a-1", 2 * MB, 3),
+        Item("note-b-1", MB, 1),
+        Item("note-c-1", MB, 2),
+        Item("note-c-2", 3 * MB, 2),
+    ):
+        queue.put(item)
+    # 剩余图片最少的笔记优先，同一笔记内大的优先
+    assert drain(queue, 4) == ["note-b-1", "note-c-2", "note-c-1", "note-a-1"]
+
+
+def test_sentinel_is_returned_after_all_items():
+    queue = make_queue()
+    queue.put(SENTINEL)
+    queue.put(Item("late", MB, 1))
+    assert queue.get().name == "late"
+    assert queue.get() is SENTINEL
+
+
+def test_put_blocks_when_full():
+    queue = make_queue(maxsize=1)
+    queue.put(Item("first", MB, 1))
+    done = threading.Event()
+
+    def producer():
+        queue.put(Item("second", MB, 1))
+        done.set()
+
+    thread = threading.Thread(target=producer, daemon=True)
+    thread.start()
+    assert not done.wait(0.2)
+    assert queue.get().name == "first"
+    assert done.wait(5)
+    assert queue.get().name == "second"
+    thread.join()
@@ -0,0 +1,100 @@
+"""UploadCache：命中与未命中、失败后重新认领、同一图片只上传一次、命名空间隔离"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from upload_cache import UploadCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = UploadCache(str(tmp_path / "upload_cache.db"))
+    yield cache
+    cache.close()
+
+
+def test_miss_then_hit(cache):
+    calls = []
+
+    def upload():
+        calls.append(1)
+        return "https://img.example/a.png"
+
+    assert cache.get("digest-a") is None
+    assert cache.upload_once("digest-a", upload) == ("https://img.example/a.png", False, "")
+    assert cache.get("digest-a") == "https://img.example/a.png"
+    assert cache.upload_once("digest-a", upload) == ("https://img.example/a.png", True, "")
+    assert len(calls) == 1
+
+
+def test_failure_is_not_cached(cache):
+    def broken():
+        raise ConnectionError("host unreachable")
+
+    assert cache.upload_once("digest-a", broken) == (None, False, "host unreachable")
+    assert cache.get("digest-a") is None
+    # 失败的记录可以重新认领上传
+    url, reused, _ = cache.upload_once("digest-a", lambda: "https://img.example/a.png")
+    assert (url, reused) == ("https://img.example/a.png", False)
+
+
+def test_empty_url_is_a_failure(cache):
+    assert cache.upload_once("digest-a", lambda: None) == (None, False, "upload failed")
+    assert cache.get("digest-a") is None
+
+
+def test_concurrent_uploads_of_the_same_image_run_once(tmp_path):
+    db_path = str(tmp_path / "upload_cache.db")
+    calls = []
+    started = threading.Event()
+
+    def upload():
+        calls.append(1)
+        started.set()
+        # 等其他线程都进入等待
+        threading.Event().wait(0.3)
+        return "https://img.example/a.png"
+
+    def worker(_):
+        cache = UploadCache(db_path)
+        try:
+            return cache.upload_once("digest-a", upload)
+        finally:
+            cache.close()
+
+    with ThreadPoolExecutor(4) as executor:
+        results = list(executor.map(worker, range(4)))
+
+    assert len(calls) == 1
+    assert {url for url, _, _ in results} == {"https://img.example/a.png"}
+    assert sorted(reused for _, reused, _ in results) == [False, True, True, True]
+
+
+def test_stale_claim_can_be_taken_over(tmp_path):
+    db_path = str(tmp_path / "upload_cache.db")
+    crashed = UploadCache(db_path, claim_timeout=0.2)
+    assert crashed.claim("digest-a")
+
+    other = UploadCache(db_path, claim_timeout=0.2)
+    assert not other.claim("digest-a")
+    url, reused, _ = other.upload_once("digest-a", lambda: "https://img.example/a.png")
+    assert (url, reused) == ("https://img.example/a.png", False)
+
+
+def test_namespaces_are_isolated(tmp_path):
+    db_path = str(tmp_path / "upload_cache.db")
+    github = UploadCache(db_path, namespace="github:1234")
+    gitee = UploadCache(db_path, namespace="gitee:5678")
+    legacy = UploadCache(db_path)
+
+    github.store("digest-a", "https://github.example/a.png", phash="ff00", width=8, height=8)
+    assert github.get("digest-a") == "https://github.example/a.png"
+    assert gitee.get("digest-a") is None
+    assert legacy.get("digest-a") is None
+
+    assert [row[:3] for row in github.phashes()] == [
+        ("digest-a", "ff00", "https://github.example/a.png")
+    ]
+    assert gitee.phashes() == []
+    assert legacy.phashes() == []
@@ -0,0 +1,91 @@
+"""VaultInventory：统计摘要、增量刷新、保存后启动时直接读取、耗时估算"""
+import json
+import os
+
+import pytest
+
+from vault_inventory import VaultInventory
+
+
+@pytest.fixture
+def inventory_path(tmp_path_factory):
+    return str(tmp_path_factory.mktemp("data") / "vault_inventory.json")
+
+
+def image_bytes(vault, *names):
+    return sum(os.path.getsize(vault / "Z-附件" / name) for name in names)
+
+
+def test_refresh_counts_pending_images_once(vault, inventory_path):
+    summary = VaultInventory(str(vault), inventory_path).refresh()
+
+    assert summary["notes"] == 2
+    # green.png 被两篇笔记引用，只算一张待上传图片
+    assert (summary["local_images"], summary["pending_images"]) == (4, 3)
+    assert summary["pending_bytes"] == image_bytes(vault, "red.png", "green.png", "blue.png")
+    assert (summary["remote_images"], summary["broken"]) == (0, 0)
+    # 没有历史吞吐量时无法估算耗时
+    assert summary["eta"] is None
+
+
+def test_only_changed_notes_are_rescanned(vault, inventory_path, monkeypatch):
+    inventory = VaultInventory(str(vault), inventory_path)
+    inventory.refresh()
+
+    scanned = []
+    original = VaultInventory._scan_note
+
+    def scan_note(self, file_path, stat):
+        scanned.append(os.path.basename(file_path))
+        return original(self, file_path, stat)
+
+    monkeypatch.setattr(VaultInventory, "_scan_note", scan_note)
+    (vault / "b.md").write_text(
+        "![[green.png]]\n![[missing.png]]\n![](https://img.example/x.png)\n", encoding="utf-8"
+    )
+    (vault / ".obsidian").mkdir()
+    (vault / ".obsidian" / "hidden.md").write_text("![[red.png]]\n", encoding="utf-8")
+    summary = inventory.refresh()
+
+    assert scanned == ["b.md"]
+    assert summary["notes"] == 2
+    assert (summary["pending_images"], summary["broken"], summary["remote_images"]) == (2, 1, 1)
+
+
+def test_saved_summary_is_available_without_scanning(vault, inventory_path, tmp_path_factory):
+    VaultInventory(str(vault), inventory_path).refresh()
+
+    assert VaultInventory(str(vault), inventory_path).summary()["pending_images"] == 3
+    # 清单属于其他仓库时不使用
+    other = tmp_path_factory.mktemp("other")
+    assert VaultInventory(str(other), inventory_path).summary() == {}
+
+
+def test_closed_inventory_is_not_saved(vault, inventory_path):
+    inventory = VaultInventory(str(vault), inventory_path)
+    inventory.close()
+    inventory.refresh()
+    assert not os.path.exists(inventory_path)
+
+
+def test_estimate_uses_the_slower_of_image_and_byte_rates(vault, inventory_path):
+    inventory = VaultInventory(str(vault), inventory_path)
+    inventory.record_run(images=10, size=1000, seconds=10)
+
+    assert inventory.estimate(0, 0) == 0.0
+    assert inventory.estimate(5, 100) == pytest.approx(5.0)
+    assert inventory.estimate(5, 10000) == pytest.approx(100.0)
+    with open(inventory_path, encoding="utf-8") as f:
+        assert json.load(f)["rates"]["images_per_second"] == pytest.approx(1.0)
+
+
+def test_default_path_is_in_the_user_data_directory(tmp_path, monkeypatch):
+    from config_manager import ConfigManager
+
+    monkeypatch.setattr("sys.platform", "linux")
+    monkeypatch.setenv("XDG_DATA_HOME", str(tmp_path / "data"))
+    config = ConfigManager(str(tmp_path / "config.json"))
+
+    assert config.get_inventory_config()["path"] == str(
+        tmp_path / "data" / "md2picgo" / "vault_inventory.json"
+    )
@@ -0,0 +1,52 @@
+"""WordPress 批量处理：进程池转换和还原链接，单篇笔记出错不中断整批"""
+from wordpress_processor import WordPressLinkProcessor
+
+PREFIX = WordPressLinkProcessor.WORDPRESS_PREFIX
+
+
+def write_notes(tmp_path, count):
+    for i in range(count):
+        sub = tmp_path / f"dir{i % 3}"
+        sub.mkdir(exist_ok=True)
+        (sub / f"{i}.md").write_text(
+            f"# {i}\n![a](https://img.example/{i}.png)\n![[local.png]]\n", encoding="utf-8"
+        )
+    (tmp_path / "plain.md").write_text("没有图片\n", encoding="utf-8")
+
+
+def test_convert_and_remove_round_trip(tmp_path):
+    write_notes(tmp_path, 12)
+    original = (tmp_path / "dir1" / "4.md").read_text(encoding="utf-8")
+
+    stats = WordPressLinkProcessor.process_vault(str(tmp_path), convert_to_wp=True, max_workers=2)
+    assert (stats["files"], stats["changed_files"], stats["links"]) == (13, 12, 12)
+    assert stats["errors"] == []
+    converted = (tmp_path / "dir1" / "4.md").read_text(encoding="utf-8")
+    assert PREFIX in converted
+    # 本地图片不转换
+    assert "![[local.png]]" in converted
+
+    # 已经是WordPress格式的链接不再转换
+    again = WordPressLinkProcessor.process_vault(str(tmp_path), convert_to_wp=True, max_workers=2)
+    assert again["changed_files"] == 0
+
+    stats = WordPressLinkProcessor.process_vault(str(tmp_path), remove_wp=True, max_workers=2)
+    assert stats["links"] == 12
+    assert (tmp_path / "dir1" / "4.md").read_text(encoding="utf-8") == original
+
+
+def test_undecodable_note_is_reported_without_stopping(tmp_path):
+    write_notes(tmp_path, 3)
+    (tmp_path / "broken.md").write_bytes(b"![a](https://img.example/x.png)\n\xff\xfe")
+
+    stats = WordPressLinkProcessor.process_vault(str(tmp_path), convert_to_wp=True, max_workers=2)
+
+    assert [path for path, _ in stats["errors"]] == [str(tmp_path / "broken.md")]
+    assert stats["changed_files"] == 3
+
+
+def test_single_file(tmp_path):
+    write_notes(tmp_path, 1)
+    note = tmp_path / "dir0" / "0.md"
+    stats = WordPressLinkProcessor.process_vault(str(note), convert_to_wp=True, max_workers=1)
+    assert (stats["files"], stats["links"]) == (1, 1)
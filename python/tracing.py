@@ -0,0 +1,136 @@
+"""
+性能追踪模块
+记录各处理阶段的耗时区间（span），导出为 Chrome/Perfetto 可加载的 trace 文件
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+
+class Tracer:
+    """线程安全的区间记录器，未启用时不记录任何数据"""
+
+    def __init__(self):
+        self.enabled = False
+        self._events: List[Dict[str, Any]] = []
+        self._thread_names: Dict[int, str] = {}
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+
+    def enable(self):
+        """开始记录（清空之前的记录）"""
+        with self._lock:
+            self._events = []
+            self._thread_names = {}
+            self._origin = time.perf_counter()
+        self.enabled = True
+
+    def disable(self):
+        """停止记录"""
+        self.enabled = False
+
+    def _timestamp(self, perf_time: float) -> float:
+        # Chrome trace 使用微秒
+        return (perf_time - self._origin) * 1_000_000
+
+    def complete(self, name: str, start: float, end: float, category: str = "md2picgo", **args):
+        """
+        记录一个已完成的区间
+
+        Args:
+            name: 区间名称
+            start: 开始时间（time.perf_counter）
+            end: 结束时间（time.perf_counter）
+            category: 分类
+            args: 附加信息
+        """
+        if not self.enabled:
+            return
+        thread = threading.current_thread()
+        tid = threading.get_native_id()
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": round(self._timestamp(start), 3),
+            "dur": round((end - start) * 1_000_000, 3),
+            "pid": os.getpid(),
+            "tid": tid,
+        }
+        if args:
+            event["args"] = args
+        with self._lock:
+            self._events.append(event)
+            self._thread_names.setdefault(tid, thread.name)
+
+    @contextmanager
+    def span(self, name: str, category: str = "md2picgo", **args):
+        """
+        记录代码块耗时的上下文管理器
+
+        Args:
+            name: 区间名称
+            category: 分类
+            args: 附加信息
+        """
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.complete(name, start, time.perf_counter(), category, **args)
+
+    def export_chrome_trace(self, path: str):
+        """
+        导出为 Chrome trace 格式（可在 chrome://tracing 或 ui.perfetto.dev 中打开）
+
+        Args:
+            path: 输出文件路径
+        """
+        with self._lock:
+            events = list(self._events)
+            thread_names = dict(self._thread_names)
+
+        pid = os.getpid()
+        metadata = [
+            {"name": "process_name", "ph": "M", "pid": pid, "args": {"name": "md2picgo"}}
+        ]
+        for tid, name in thread_names.items():
+            metadata.append(
+                {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+            )
+
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"traceEvents": metadata + events, "displayTimeUnit": "ms"},
+                f,
+                ensure_ascii=False,
+            )
+
+
+# 全局追踪器
+tracer = Tracer()
+
+
+@contextmanager
+def trace_to(path: Optional[str]):
+    """
+    在代码块执行期间记录追踪数据，结束后导出到文件；path为空时不做任何事
+
+    Args:
+        path: trace 文件路径
+    """
+    if not path:
+        yield
+        return
+    tracer.enable()
+    try:
+        yield
+    finally:
+        tracer.disable()
+        tracer.export_chrome_trace(path)
@@ -14,7 +14,7 @@ from PyQt5.QtWidgets import (
     QGraphicsDropShadowEffect,
     QComboBox,
 )
-from PyQt5.QtCore import Qt, QTimer, QPoint
+from PyQt5.QtCore import Qt, QTimer, QPoint, pyqtSignal
 from PyQt5.QtGui import (
     QDragEnterEvent,
     QDropEvent,
@@ -26,6 +26,8 @@ from PyQt5.QtGui import (
 import os
 import time
 
+from metrics import metrics
+
 
 class DropArea(QLabel):
     def __init__(self, main_window):
@@ -423,6 +425,11 @@ class ConfigDialog(QDialog):
         self.path_prefix.setPlaceholderText("例如: E:\\笔记\\附件")
         content_layout.addRow("图片路径前缀:", self.path_prefix)
 
+        # 笔记仓库（启动时显示待处理统计）
+        self.vault_path = QLineEdit()
+        self.vault_path.setPlaceholderText("例如: E:\\笔记，设置后启动时显示待上传的图片统计")
+        content_layout.addRow("笔记仓库:", self.vault_path)
+
         # 按钮区域
         button_layout = QHBoxLayout()
         button_layout.setSpacing(10)
@@ -557,6 +564,7 @@ class ConfigDialog(QDialog):
 
         # 加载路径前缀
         self.path_prefix.setText(self.config_manager.get_image_path_prefix())
+        self.vault_path.setText(self.config_manager.get_vault_path())
 
     def save_config(self):
         if not self.config_manager:
@@ -591,6 +599,7 @@ class ConfigDialog(QDialog):
 
         # 保存路径前缀
         self.config_manager.update_image_path_prefix(self.path_prefix.text().strip())
+        self.config_manager.update_vault_path(self.vault_path.text().strip())
 
         self.accept()
 
@@ -609,6 +618,11 @@ class ConfigDialog(QDialog):
 
 
 class MainWindow(QMainWindow):
+    # 后台刷新仓库清单后发出，参数为 (清单, 统计摘要)，在主线程中更新显示
+    inventory_updated = pyqtSignal(object, dict)
+    # 合并处理任务结束后发出，参数为统计信息
+    batch_finished = pyqtSignal(dict)
+
     def __init__(self, process_markdown_file, process_vault, config_manager=None):
         super().__init__()
         self.setWindowIcon(QIcon("icon/hello kitty.ico"))  # 设置窗口图标
@@ -618,7 +632,11 @@ class MainWindow(QMainWindow):
         self.moving = False
         self.offset = None
         self.image_path_prefix = ""
+        self.indexer = None
+        self.batch_job = None
         self.initUI()
+        self.inventory_updated.connect(self.on_inventory_updated)
+        self.batch_finished.connect(self.on_batch_finished)
 
     def initUI(self):
         # 设置无边框窗口
@@ -753,6 +771,12 @@ class MainWindow(QMainWindow):
 
         content_layout.addLayout(button_layout)
 
+        # 仓库清单统计
+        self.inventory_label = QLabel()
+        self.inventory_label.setStyleSheet("color: #64748b; font-size: 12px;")
+        self.inventory_label.setVisible(False)
+        content_layout.addWidget(self.inventory_label)
+
         # 修改日志显示区域样式
         self.log_display = LogDisplay()
         self.log_display.setStyleSheet(
@@ -848,6 +872,57 @@ class MainWindow(QMainWindow):
 
         self.status_info_label.setText(f"图床: {host_name}{wp_status}")
 
+    def start_inventory(self):
+        """根据配置的笔记仓库加载清单并启动后台刷新（重复调用时重新启动）"""
+        from vault_inventory import BackgroundIndexer, VaultInventory
+
+        if self.indexer is not None:
+            self.indexer.stop()
+            self.indexer = None
+        vault_path = self.config_manager.get_vault_path() if self.config_manager else ""
+        if not vault_path or not os.path.isdir(vault_path):
+            self.inventory_label.setVisible(False)
+            return
+
+        inventory_config = self.config_manager.get_inventory_config()
+        inventory = VaultInventory(
+            vault_path,
+            inventory_config["path"],
+            image_path_prefix=self.config_manager.get_image_path_prefix(),
+        )
+        # 先显示上次保存的统计，再在后台增量刷新
+        self.show_inventory(inventory.summary())
+        self.indexer = BackgroundIndexer(
+            inventory,
+            lambda summary: self.inventory_updated.emit(inventory, summary),
+            interval=inventory_config["refresh_interval"],
+        )
+        self.indexer.start()
+
+    def on_inventory_updated(self, inventory, summary):
+        """只显示当前清单的刷新结果，忽略已被重新启动取代的旧线程发出的结果"""
+        if self.indexer is not None and inventory is self.indexer.inventory:
+            self.show_inventory(summary)
+
+    def show_inventory(self, summary):
+        """显示仓库清单统计"""
+        from vault_inventory import format_bytes, format_eta
+
+        self.inventory_label.setVisible(True)
+        if not summary:
+            self.inventory_label.setText("仓库: 正在统计...")
+            return
+        text = (
+            f"仓库: 笔记 {summary['notes']} 篇 | "
+            f"待上传 {summary['pending_images']} 张 ({format_bytes(summary['pending_bytes'])}) | "
+            f"已上传 {summary['remote_images']} 张"
+        )
+        if summary["broken"]:
+            text += f" | 失效引用 {summary['broken']} 处"
+        if summary["pending_images"]:
+            text += f" | 预计耗时 {format_eta(summary['eta'])}"
+        self.inventory_label.setText(text)
+
     def show_config_dialog(self):
         """显示配置对话框"""
         self.log("打开配置对话框...", "info")
@@ -866,9 +941,18 @@ class MainWindow(QMainWindow):
             if self.config_manager:
                 self.image_path_prefix = self.config_manager.get_image_path_prefix()
             self.update_status_info()
+            self.start_inventory()
             self.log("配置已更新 ✅", "success")
 
     def handle_dropped_files(self, paths):
+        if self.batch_job is not None and self.batch_job.enabled():
+            # 在后台合并处理，处理期间拖入的路径直接加入正在运行的任务
+            if self.batch_job.add(paths):
+                self.log(f"已加入正在处理的任务: {len(paths)} 项", "info")
+            else:
+                self.log("开始处理...", "info")
+            return
+
         self.log("开始处理...", "info")
         try:
             # 从配置管理器获取WordPress选项
@@ -880,6 +964,8 @@ class MainWindow(QMainWindow):
             convert_to_wp = wp_config.get("enabled", False)
             remove_wp = wp_config.get("remove_prefix", False)
 
+            start = time.perf_counter()
+            uploaded = uploaded_bytes = 0
             for path in paths:
                 if os.path.isfile(path) and path.lower().endswith(".md"):
                     self.log(f"处理文件: {path}", "info")
@@ -897,10 +983,35 @@ class MainWindow(QMainWindow):
                         remove_wp=remove_wp,
                         image_path_prefix=self.image_path_prefix,
                     )
+                else:
+                    continue
+                # 每次处理后统计本次运行的上传量，用于估算剩余耗时
+                uploads, _ = metrics.run_records()
+                uploaded += sum(1 for upload in uploads if upload[4])
+                uploaded_bytes += sum(upload[2] for upload in uploads if upload[4])
+            if self.indexer is not None:
+                self.indexer.inventory.record_run(
+                    uploaded, uploaded_bytes, time.perf_counter() - start
+                )
+                self.indexer.refresh_soon()
             self.log("处理完成！", "success")
         except Exception as e:
             self.log(f"处理出错: {str(e)}", "error")
 
+    def on_batch_finished(self, result):
+        """合并处理任务结束：记录吞吐量并刷新仓库清单"""
+        if self.indexer is not None:
+            self.indexer.inventory.record_run(
+                result.get("uploaded", 0), result.get("uploaded_bytes", 0), result["seconds"]
+            )
+            self.indexer.refresh_soon()
+        self.log(
+            f"处理完成！笔记 {result.get('notes', 0)} 篇，"
+            f"上传 {result.get('uploaded', 0)} 张，复用 {result.get('reused', 0)} 张，"
+            f"失败 {result.get('failed', 0)} 张",
+            "success",
+        )
+
     def clear_log(self):
         """
         清空日志显示区域
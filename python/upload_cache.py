@@ -0,0 +1,255 @@
+"""
+上传去重缓存
+以图床命名空间和图片内容哈希为键记录上传后的URL，保存在SQLite数据库中，
+多个进程（以及同一进程的多个线程）通过"认领"机制保证同一张图片只上传一次
+"""
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+
+# 认领后超过该时间（秒）仍未完成，视为认领者已退出，允许其他进程接手
+DEFAULT_CLAIM_TIMEOUT = 300
+
+
+class UploadCache:
+    """基于SQLite的跨进程上传缓存"""
+
+    PENDING = "pending"
+    DONE = "done"
+    FAILED = "failed"
+
+    def __init__(
+        self,
+        db_path: str = "upload_cache.db",
+        claim_timeout: float = DEFAULT_CLAIM_TIMEOUT,
+        namespace: str = "",
+    ):
+        """
+        初始化缓存
+
+        Args:
+            db_path: 数据库文件路径
+            claim_timeout: 认领超时时间（秒）
+            namespace: 图床命名空间（见 ImageHostFactory.cache_namespace），
+                       不同命名空间的记录互不可见，切换图床或账号后不会复用旧的URL
+        """
+        self.db_path = db_path
+        self.claim_timeout = claim_timeout
+        self.namespace = namespace
+        self._prefix = f"{namespace}/" if namespace else ""
+        self._local = threading.local()
+        conn = self._connect()
+        # 多个进程可能同时打开同一个新数据库，建表和补充列在同一个写事务中完成
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS uploads ("
+                "digest TEXT PRIMARY KEY, url TEXT, status TEXT NOT NULL, "
+                "owner TEXT, error TEXT, updated_at REAL NOT NULL)"
+            )
+            # 感知哈希和图片尺寸列（近似重复检测使用），旧数据库中补充这些列
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(uploads)")]
+            for name, column_type in (
+                ("phash", "TEXT"),
+                ("width", "INTEGER"),
+                ("height", "INTEGER"),
+            ):
+                if name not in columns:
+                    conn.execute(f"ALTER TABLE uploads ADD COLUMN {name} {column_type}")
+        finally:
+            conn.execute("COMMIT")
+
+    def _connect(self) -> sqlite3.Connection:
+        """每个线程使用独立的连接"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _key(self, digest: str) -> str:
+        """数据库中的键：命名空间加内容哈希"""
+        return self._prefix + digest
+
+    @staticmethod
+    def _owner() -> str:
+        return f"{os.getpid()}:{threading.get_ident()}"
+
+    def get(self, digest: str) -> Optional[str]:
+        """
+        查询已上传图片的URL
+
+        Args:
+            digest: 图片内容哈希
+
+        Returns:
+            URL，未上传过时返回None
+        """
+        row = self._connect().execute(
+            "SELECT url FROM uploads WHERE digest = ? AND status = ?",
+            (self._key(digest), self.DONE),
+        ).fetchone()
+        return row[0] if row else None
+
+    def claim(self, digest: str) -> bool:
+        """
+        认领一张图片的上传任务
+
+        Args:
+            digest: 图片内容哈希
+
+        Returns:
+            是否认领成功（成功后必须调用 complete 或 fail）
+        """
+        now = time.time()
+        digest = self._key(digest)
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT status, updated_at FROM uploads WHERE digest = ?", (digest,)
+            ).fetchone()
+            if row is not None:
+                status, updated_at = row
+                if status == self.DONE:
+                    return False
+                if status == self.PENDING and now - updated_at < self.claim_timeout:
+                    return False
+            conn.execute(
+                "INSERT OR REPLACE INTO uploads "
+                "(digest, url, status, owner, error, updated_at) "
+                "VALUES (?, NULL, ?, ?, NULL, ?)",
+                (digest, self.PENDING, self._owner(), now),
+            )
+            return True
+        finally:
+            conn.execute("COMMIT")
+
+    def complete(self, digest: str, url: str):
+        """记录上传成功"""
+        self._connect().execute(
+            "UPDATE uploads SET url = ?, status = ?, error = NULL, updated_at = ? "
+            "WHERE digest = ?",
+            (url, self.DONE, time.time(), self._key(digest)),
+        )
+
+    def fail(self, digest: str, error: str):
+        """记录上传失败（之后可被重新认领）"""
+        self._connect().execute(
+            "UPDATE uploads SET status = ?, error = ?, updated_at = ? WHERE digest = ?",
+            (self.FAILED, error, time.time(), self._key(digest)),
+        )
+
+    def wait_for(
+        self, digest: str, poll_interval: float = 0.2
+    ) -> Tuple[Optional[str], str]:
+        """
+        等待其他进程完成上传
+
+        Returns:
+            (URL, 错误信息)；认领者超时退出时返回 (None, "")，调用方可重新认领
+        """
+        conn = self._connect()
+        while True:
+            row = conn.execute(
+                "SELECT url, status, error, updated_at FROM uploads WHERE digest = ?",
+                (self._key(digest),),
+            ).fetchone()
+            if row is None:
+                return None, ""
+            url, status, error, updated_at = row
+            if status == self.DONE:
+                return url, ""
+            if status == self.FAILED:
+                return None, error or "upload failed"
+            if time.time() - updated_at >= self.claim_timeout:
+                return None, ""
+            time.sleep(poll_interval)
+
+    def upload_once(
+        self, digest: str, upload: Callable[[], Optional[str]]
+    ) -> Tuple[Optional[str], bool, str]:
+        """
+        同一哈希只上传一次：已有URL直接返回，其他进程正在上传时等待其结果
+
+        Args:
+            digest: 图片内容哈希
+            upload: 实际上传的函数，返回URL或None
+
+        Returns:
+            (URL, 是否复用, 错误信息)
+        """
+        while True:
+            url = self.get(digest)
+            if url:
+                return url, True, ""
+            if self.claim(digest):
+                try:
+                    url = upload()
+                except Exception as e:
+                    self.fail(digest, str(e))
+                    return None, False, str(e)
+                if url:
+                    self.complete(digest, url)
+                    return url, False, ""
+                self.fail(digest, "upload failed")
+                return None, False, "upload failed"
+            url, error = self.wait_for(digest)
+            if url:
+                return url, True, ""
+            if error:
+                return None, False, error
+            # 认领者已超时，重新尝试认领
+
+    def store(
+        self,
+        digest: str,
+        url: str,
+        phash: Optional[str] = None,
+        width: Optional[int] = None,
+        height: Optional[int] = None,
+    ):
+        """直接记录一张图片的URL（如复用近似重复图片的链接），以及感知哈希和尺寸"""
+        self._connect().execute(
+            "INSERT INTO uploads "
+            "(digest, url, status, owner, error, updated_at, phash, width, height) "
+            "VALUES (?, ?, ?, NULL, NULL, ?, ?, ?, ?) "
+            "ON CONFLICT(digest) DO UPDATE SET url = excluded.url, status = excluded.status, "
+            "error = NULL, updated_at = excluded.updated_at, "
+            "phash = COALESCE(excluded.phash, phash), "
+            "width = COALESCE(excluded.width, width), "
+            "height = COALESCE(excluded.height, height)",
+            (self._key(digest), url, self.DONE, time.time(), phash, width, height),
+        )
+
+    def phashes(
+        self, since: float = 0
+    ) -> List[Tuple[str, str, str, float, Optional[int], Optional[int]]]:
+        """
+        查询已上传且有感知哈希的图片
+
+        Args:
+            since: 只返回该时间之后更新的记录
+
+        Returns:
+            [(内容哈希, 感知哈希, URL, 更新时间, 宽, 高), ...]
+        """
+        rows = self._connect().execute(
+            "SELECT digest, phash, url, updated_at, width, height FROM uploads "
+            "WHERE status = ? AND phash IS NOT NULL AND updated_at > ? "
+            "AND substr(digest, 1, ?) = ? AND instr(substr(digest, ?), '/') = 0",
+            (self.DONE, since, len(self._prefix), self._prefix, len(self._prefix) + 1),
+        ).fetchall()
+        size = len(self._prefix)
+        return [(row[0][size:], *row[1:]) for row in rows]
+
+    def close(self):
+        """关闭当前线程的连接"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
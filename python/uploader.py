@@ -7,25 +7,43 @@ from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from PyQt5.QtCore import QTimer
 
+from file_memo import file_memo
+from image_formats import configure_image_types, detect, image_extensions, is_allowed
+from image_hosts.circuit_breaker import CircuitBreaker
+from metrics import metrics
+from rate_limit import throttle
+from tracing import tracer
+
 # 线程安全的打印函数
 print_lock = threading.Lock()
 
 # 全局变量存储UI引用
 ui_window = None
 
+# 日志输出流，为None时输出到标准输出（过滤模式下改为标准错误，避免混入输出内容）
+log_stream = None
+
+# PicGo 服务的熔断器：连续失败后在冷却时间内直接跳过，不再逐张重试等待
+picgo_breaker = CircuitBreaker(failure_threshold=5, reset_timeout=60)
+
 
 def set_ui_window(window):
     global ui_window
     ui_window = window
 
 
+def set_log_stream(stream):
+    global log_stream
+    log_stream = stream
+
+
 def safe_print(*args, level="info"):
     """
     线程安全的打印函数，同时发送到UI
     """
     with print_lock:
         message = " ".join(map(str, args))
-        print(message)
+        print(message, file=log_stream)
         if ui_window:
             # 使用 QTimer.singleShot 确保在主线程中更新UI
             QTimer.singleShot(0, lambda: ui_window.log(message, level))
@@ -41,21 +59,29 @@ def upload_image(image_path, max_retries=3):
         try:
             picgo_url = "http://127.0.0.1:36677/upload"
 
-            if not os.path.exists(image_path):
+            if not file_memo.exists(image_path):
                 safe_print(f"文件不存在: {file_name}", level="error")
                 return None
 
-            file_size = os.path.getsize(image_path)
+            file_size = file_memo.getsize(image_path)
             if file_size == 0:
                 safe_print(f"文件大小为0: {file_name}", level="error")
                 return None
 
+            if not picgo_breaker.allow():
+                safe_print(f"PicGo 服务不可用（已熔断），跳过: {file_name}", level="warning")
+                return None
+
             if attempt > 0:
+                metrics.retries.inc(host="PicGo")
                 safe_print(
                     f"重试上传 ({attempt+1}/{max_retries}): {file_name}",
                     level="warning",
                 )
 
+            # 默认的PicGo上传与 gitee 图床类型共用限速配置
+            throttle("gitee", image_path)
+
             files = {"list": [image_path]}
 
             # 增加超时时间
@@ -64,13 +90,15 @@ def upload_image(image_path, max_retries=3):
             if response.status_code == 200:
                 result = response.json()
                 if result.get("success"):
+                    picgo_breaker.record_success()
                     return result.get("result")[0]
                 else:
                     safe_print(f"上传失败: {result.get('msg')}", level="error")
             else:
                 safe_print(f"请求失败,状态码: {response.status_code}", level="error")
 
-            if attempt < max_retries - 1:
+            picgo_breaker.record_failure()
+            if attempt < max_retries - 1 and not picgo_breaker.is_open:
                 # 增加重试等待时间，并显示倒计时
                 wait_time = 5
                 safe_print(f"等待 {wait_time} 秒后重试...", level="warning")
@@ -79,10 +107,11 @@ def upload_image(image_path, max_retries=3):
                     time.sleep(1)
 
         except requests.Timeout:
+            picgo_breaker.record_failure()
             safe_print(
                 f"上传超时，正在重试... ({attempt+1}/{max_retries})", level="warning"
             )
-            if attempt < max_retries - 1:
+            if attempt < max_retries - 1 and not picgo_breaker.is_open:
                 wait_time = 5
                 safe_print(f"等待 {wait_time} 秒后重试...", level="warning")
                 for i in range(wait_time, 0, -1):
@@ -90,8 +119,9 @@ def upload_image(image_path, max_retries=3):
                     time.sleep(1)
 
         except Exception as e:
+            picgo_breaker.record_failure()
             safe_print(f"上传错误: {str(e)}", level="error")
-            if attempt < max_retries - 1:
+            if attempt < max_retries - 1 and not picgo_breaker.is_open:
                 wait_time = 5
                 safe_print(f"等待 {wait_time} 秒后重试...", level="warning")
                 for i in range(wait_time, 0, -1):
@@ -112,6 +142,160 @@ def process_image_link(link, use_wordpress=False):
     return link
 
 
+def build_local_image_patterns(extensions):
+    """
+    按允许的扩展名生成本地图片匹配规则（扩展名不区分大小写）
+
+    Args:
+        extensions: 扩展名列表（不含点）
+
+    Returns:
+        正则表达式列表，group(1)为图片路径
+    """
+    ext = "|".join(sorted(map(re.escape, extensions), key=len, reverse=True))
+    return [
+        # 普通格式：![...](C:\\path\\to\\image.png)
+        rf"!\[.*?\]\(([A-Za-z]:\\[^)\n]+\.(?i:{ext}))\)",
+        # Obsidian格式：![[path/to/image.png]]
+        rf"!\[\[([^]\n]+\.(?i:{ext}))\]\]",
+    ]
+
+
+# 匹配本地图片链接
+LOCAL_IMAGE_PATTERNS = build_local_image_patterns(image_extensions())
+
+# 没有扩展名的本地路径（如直接粘贴的截图），需要按文件内容确认是图片；
+# Obsidian 中没有扩展名的嵌入通常是笔记，排除标题（#）、块（^）引用和别名（|）
+EXTENSIONLESS_IMAGE_PATTERNS = [
+    r"!\[.*?\]\(([A-Za-z]:\\(?:[^)\n]*\\)?[^)\n.\\]+)\)",
+    r"!\[\[((?:[^]\n|#^]*/)?[^]\n./|#^]+)\]\]",
+]
+
+
+def set_image_types(types):
+    """
+    设置允许上传的图片格式，并按其扩展名重新生成本地图片匹配规则
+
+    Args:
+        types: 格式名列表（如 ["png", "jpeg", "webp"]），为空时使用默认格式
+    """
+    global LOCAL_IMAGE_PATTERNS
+    unknown = configure_image_types(types)
+    if unknown:
+        safe_print(f"无法识别的图片格式: {', '.join(unknown)}", level="warning")
+    LOCAL_IMAGE_PATTERNS = build_local_image_patterns(image_extensions())
+
+
+def find_local_images(content, file_path=None, image_path_prefix=""):
+    """
+    查找内容中的本地图片链接
+
+    Args:
+        content: Markdown内容
+        file_path: 笔记文件路径，提供时同时查找没有扩展名的图片
+                   （只保留文件存在且按文件头识别为允许上传的格式的引用）
+        image_path_prefix: 图片路径前缀
+
+    Returns:
+        匹配对象列表，group(1)为图片路径
+    """
+    matches = []
+    for pattern in LOCAL_IMAGE_PATTERNS:
+        matches.extend(re.finditer(pattern, content))
+    if file_path is not None:
+        for pattern in EXTENSIONLESS_IMAGE_PATTERNS:
+            for match in re.finditer(pattern, content):
+                local_path = resolve_image_path(match.group(1), file_path, image_path_prefix)
+                if is_allowed(detect(local_path)):
+                    matches.append(match)
+    return matches
+
+
+def resolve_image_path(local_path, file_path, image_path_prefix=""):
+    """
+    将笔记中的图片路径解析为本地绝对路径
+
+    Args:
+        local_path: 笔记中的图片路径
+        file_path: 笔记文件路径
+        image_path_prefix: 图片路径前缀
+
+    Returns:
+        图片本地路径
+    """
+    # 处理 Obsidian 格式的路径 - 检查是否为绝对路径
+    if not (len(local_path) > 1 and local_path[1] == ":"):
+        if image_path_prefix:
+            local_path = os.path.join(image_path_prefix, local_path)
+        else:
+            base_dir = os.path.dirname(file_path)
+            local_path = os.path.join(base_dir, "Z-附件", local_path)
+    return local_path
+
+
+def upload_with_host(local_path, image_host=None):
+    """
+    使用图床适配器上传图片，未配置图床时回退到默认的PicGo上传
+
+    Args:
+        local_path: 图片本地路径
+        image_host: 图床适配器实例
+
+    Returns:
+        上传后的图片URL，失败时返回None或抛出异常
+    """
+    host_name = image_host.get_name() if image_host else "PicGo"
+    start = time.perf_counter()
+    new_url = None
+    try:
+        if image_host:
+            new_url = image_host.upload(local_path)
+        else:
+            new_url = upload_image(local_path)
+        return new_url
+    finally:
+        try:
+            size = file_memo.getsize(local_path)
+        except OSError:
+            size = 0
+        metrics.record_upload(
+            host_name,
+            os.path.basename(local_path),
+            size,
+            time.perf_counter() - start,
+            bool(new_url),
+        )
+
+
+def apply_wordpress_links(content, convert_to_wp=False, remove_wp=False):
+    """
+    按配置转换或还原内容中的WordPress链接并输出日志
+
+    Args:
+        content: Markdown内容
+        convert_to_wp: 是否转换为WordPress格式
+        remove_wp: 是否移除WordPress前缀
+
+    Returns:
+        处理后的内容
+    """
+    from wordpress_processor import WordPressLinkProcessor
+
+    if not (convert_to_wp or remove_wp):
+        return content
+
+    content, wp_count = WordPressLinkProcessor.process_markdown_content(
+        content, convert_to_wp=convert_to_wp, remove_wp=remove_wp
+    )
+
+    if wp_count > 0:
+        if convert_to_wp:
+            safe_print(f"已转换 {wp_count} 个链接为 WordPress 格式 ✅", level="success")
+        elif remove_wp:
+            safe_print(f"已还原 {wp_count} 个 WordPress 链接 ✅", level="success")
+    return content
+
+
 def process_markdown_file(
     file_path,
     image_host=None,
@@ -119,6 +303,8 @@ def process_markdown_file(
     convert_to_wp=False,
     remove_wp=False,
     image_path_prefix="",
+    offline_queue=None,
+    near_duplicates=None,
 ):
     """
     处理单个markdown文件中的图片链接，使用线程池并行上传图片
@@ -130,78 +316,130 @@ def process_markdown_file(
         convert_to_wp: 是否转换为WordPress格式
         remove_wp: 是否移除WordPress前缀
         image_path_prefix: 图片路径前缀
+        offline_queue: 离线上传队列，上传失败的图片会加入队列等待补传
+        near_duplicates: 近似重复索引（NearDuplicateIndex），与已上传图片相同或近似时复用其URL
     """
-    from wordpress_processor import WordPressLinkProcessor
+    from prefilter import might_contain_images
 
     file_name = os.path.basename(file_path)
     safe_print(f"处理文件: {file_name}", level="info")
 
+    # 按字节预过滤，不含图片语法的文件无需解码、匹配和写回
+    try:
+        if not might_contain_images(file_path):
+            safe_print(f"文件不含图片，跳过: {file_name} ℹ️", level="info")
+            return
+    except OSError as e:
+        safe_print(f"读取文件失败: {str(e)} ❌", level="error")
+        return
+
     # 显示使用的图床服务
     if image_host:
         safe_print(f"使用图床: {image_host.get_name()}", level="info")
 
     try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            content = f.read()
+        from note_writer import apply_edits, read_note, write_note
 
-        # 匹配本地图片链接
-        local_patterns = [
-            # 普通格式：![...](C:\path\to\image.png)
-            r"!\[.*?\]\(([A-Za-z]:\\[^)\n]+\.(?:png|jpg|jpeg|gif|bmp|PNG|JPG|JPEG|GIF|BMP))\)",
-            # Obsidian格式：![[path/to/image.png]]
-            r"!\[\[([^]\n]+\.(?:png|jpg|jpeg|gif|bmp|PNG|JPG|JPEG|GIF|BMP))\]\]",
-        ]
+        with tracer.span("read", note=file_name):
+            content, version = read_note(file_path)
 
         # 处理本地图片
         results = {}
-        total_matches = []
+        results_lock = threading.Lock()
+        with tracer.span("scan", note=file_name):
+            total_matches = find_local_images(content, file_path, image_path_prefix)
         upload_count = 0
 
-        for pattern in local_patterns:
-            matches = list(re.finditer(pattern, content))
-            total_matches.extend(matches)
-
         if total_matches:
             safe_print(f"发现 {len(total_matches)} 张图片需要上传", level="info")
 
             def upload_and_store(match):
                 nonlocal upload_count
+                # 记录任务提交后等待空闲线程的时间
+                tracer.complete("wait", submitted_at, time.perf_counter(), image=match.group(1))
                 try:
-                    local_path = match.group(1)
-
-                    # 处理 Obsidian 格式的路径 - 检查是否为绝对路径
-                    if not (len(local_path) > 1 and local_path[1] == ":"):
-                        if image_path_prefix:
-                            local_path = os.path.join(image_path_prefix, local_path)
-                        else:
-                            base_dir = os.path.dirname(file_path)
-                            local_path = os.path.join(base_dir, "Z-附件", local_path)
-
+                    with tracer.span("resolve", image=match.group(1)):
+                        local_path = resolve_image_path(
+                            match.group(1), file_path, image_path_prefix
+                        )
+                        exists = file_memo.exists(local_path)
                     file_name = os.path.basename(local_path)
 
-                    if os.path.exists(local_path):
+                    if exists:
+                        hashed = hashes.get(local_path)
+                        duplicate = near_duplicates.find(*hashed) if hashed else None
+                        if duplicate:
+                            new_url, distance = duplicate
+                            kind = "相同" if distance == 0 else f"近似（汉明距离 {distance}）"
+                            safe_print(
+                                f"图片 {file_name} 与已上传的图片{kind}，复用链接 ♻️",
+                                level="info",
+                            )
+                            metrics.record_cache_hit()
+                            with results_lock:
+                                results[match.group(0)] = f"![]({new_url})"
+                            return
+
                         safe_print(f"上传图片: {file_name}", level="info")
 
-                        # 使用图床适配器上传
-                        if image_host:
-                            new_url = image_host.upload(local_path)
-                        else:
-                            # 回退到默认的PicGo上传
-                            new_url = upload_image(local_path)
+                        upload_error = "upload failed"
+                        with tracer.span("upload", image=file_name):
+                            try:
+                                new_url = upload_with_host(local_path, image_host)
+                            except FileNotFoundError:
+                                raise
+                            except Exception as e:
+                                safe_print(f"处理图片时出错: {str(e)} ❌", level="error")
+                                new_url = None
+                                upload_error = str(e)
 
                         if new_url:
                             safe_print(f"图片 {file_name} 上传成功 ✅", level="success")
-                            results[match.group(0)] = f"![]({new_url})"
-                            upload_count += 1
+                            if hashed:
+                                near_duplicates.remember(*hashed, new_url)
+                            with results_lock:
+                                results[match.group(0)] = f"![]({new_url})"
+                                upload_count += 1
                         else:
                             safe_print(f"图片 {file_name} 上传失败 ❌", level="error")
+                            if offline_queue is not None:
+                                offline_queue.add(
+                                    local_path,
+                                    file_path,
+                                    match.group(0),
+                                    upload_error,
+                                    convert_to_wp=convert_to_wp,
+                                )
+                                safe_print(f"已加入离线队列: {file_name}", level="warning")
                     else:
                         safe_print(f"图片不存在: {file_name} ❌", level="error")
                 except Exception as e:
                     safe_print(f"处理图片时出错: {str(e)} ❌", level="error")
 
+            # 按文件大小从大到小上传，避免大文件排在最后拖慢整体耗时
+            from scheduler import order_longest_first, file_size
+
+            ordered_matches = order_longest_first(
+                total_matches,
+                lambda match: file_size(
+                    resolve_image_path(match.group(1), file_path, image_path_prefix)
+                ),
+            )
+            # 在进程池中预先计算内容哈希和感知哈希，上传前查找相同或近似的已上传图片
+            hashes = {}
+            if near_duplicates is not None:
+                with tracer.span("phash", note=file_name):
+                    hashes = near_duplicates.hash_images(
+                        path
+                        for path in (
+                            resolve_image_path(match.group(1), file_path, image_path_prefix)
+                            for match in total_matches
+                        )
+                        if file_memo.exists(path)
+                    )
+            submitted_at = time.perf_counter()
             with ThreadPoolExecutor(max_workers=max_workers) as executor:
-                executor.map(upload_and_store, total_matches)
+                executor.map(upload_and_store, ordered_matches)
 
             # 替换所有匹配的图片链接
             new_content = content
@@ -215,25 +453,21 @@ def process_markdown_file(
             safe_print("未发现需要上传的本地图片 ℹ️", level="info")
 
         # 处理WordPress链接
-        wp_count = 0
-        if convert_to_wp or remove_wp:
-            new_content, wp_count = WordPressLinkProcessor.process_markdown_content(
-                new_content, convert_to_wp=convert_to_wp, remove_wp=remove_wp
-            )
-
-            if wp_count > 0:
-                if convert_to_wp:
-                    safe_print(
-                        f"已转换 {wp_count} 个链接为 WordPress 格式 ✅", level="success"
-                    )
-                elif remove_wp:
-                    safe_print(f"已还原 {wp_count} 个 WordPress 链接 ✅", level="success")
+        new_content = apply_wordpress_links(
+            new_content, convert_to_wp=convert_to_wp, remove_wp=remove_wp
+        )
 
-        # 保存更新后的内容
+        # 原子写回；上传期间笔记被修改时在最新内容上重新应用改写
         if new_content != content:
-            with open(file_path, "w", encoding="utf-8") as f:
-                f.write(new_content)
-            safe_print(f"文件已更新: {file_name} ✅", level="success")
+            edits = list(results.items())
+
+            def reapply(fresh):
+                return apply_wordpress_links(
+                    apply_edits(fresh, edits), convert_to_wp=convert_to_wp, remove_wp=remove_wp
+                )
+
+            with tracer.span("write", note=file_name):
+                write_note(file_path, new_content, version, reapply)
         else:
             safe_print(f"文件未发生更改: {file_name} ℹ️", level="info")
 
@@ -245,6 +479,44 @@ def process_markdown_file(
         safe_print(f"文件编码错误: {str(e)} ❌", level="error")
     except Exception as e:
         safe_print(f"处理文件时发生错误: {str(e)} ❌", level="error")
+    finally:
+        if offline_queue is not None:
+            offline_queue.save()
+
+
+def collect_markdown_files(path):
+    """
+    收集需要处理的Markdown文件，目录会按字节预过滤掉不含图片语法的文件
+
+    Args:
+        path: 文件或目录路径
+
+    Returns:
+        Markdown文件路径列表
+    """
+    from prefilter import might_contain_images
+
+    path = Path(path)
+    if path.is_file():
+        return [str(path)] if path.suffix.lower() == ".md" else []
+    if not path.is_dir():
+        return []
+
+    md_files = list(path.rglob("*.md"))
+    safe_print(f"发现 {len(md_files)} 个 Markdown 文件", level="info")
+
+    # 先按字节预过滤，跳过不含图片语法的文件
+    candidates = []
+    for md_file in md_files:
+        try:
+            if might_contain_images(str(md_file)):
+                candidates.append(str(md_file))
+        except OSError as e:
+            safe_print(f"读取文件 {md_file.name} 失败: {str(e)} ❌", level="error")
+    skipped = len(md_files) - len(candidates)
+    if skipped:
+        safe_print(f"跳过 {skipped} 个不含图片的文件", level="info")
+    return candidates
 
 
 def process_vault(
@@ -254,9 +526,14 @@ def process_vault(
     convert_to_wp=False,
     remove_wp=False,
     image_path_prefix="",
+    pipeline_config=None,
+    offline_queue=None,
+    output_dir=None,
+    reference_index=None,
+    near_duplicates=None,
 ):
     """
-    处理路径（可以是单个文件或目录）
+    处理路径（可以是单个文件或目录），目录使用分阶段流水线处理
 
     Args:
         path: 文件或目录路径
@@ -265,13 +542,31 @@ def process_vault(
         convert_to_wp: 是否转换为WordPress格式
         remove_wp: 是否移除WordPress前缀
         image_path_prefix: 图片路径前缀
+        pipeline_config: 流水线配置 {"queue_size", "large_file_threshold", "stages"}
+        offline_queue: 离线上传队列，上传失败的图片会加入队列等待补传
+        output_dir: 输出目录，设置后改写结果写入输出目录，不修改源文件
+        reference_index: 图片引用反向索引，处理目录时记录每张图片被哪些笔记引用
+            （输出目录模式下不记录，源笔记中仍是本地路径）
+        near_duplicates: 近似重复索引（NearDuplicateIndex），与已上传图片相同或近似时复用其URL
     """
     try:
         path = Path(path)
 
         safe_print(f"处理路径: {path}", level="info")
 
-        if path.is_file() and path.suffix.lower() == ".md":
+        if output_dir:
+            _process_to_output_dir(
+                path,
+                output_dir,
+                image_host=image_host,
+                max_workers=max_workers,
+                convert_to_wp=convert_to_wp,
+                remove_wp=remove_wp,
+                image_path_prefix=image_path_prefix,
+                pipeline_config=pipeline_config,
+                near_duplicates=near_duplicates,
+            )
+        elif path.is_file() and path.suffix.lower() == ".md":
             process_markdown_file(
                 str(path),
                 image_host=image_host,
@@ -279,27 +574,38 @@ def process_vault(
                 convert_to_wp=convert_to_wp,
                 remove_wp=remove_wp,
                 image_path_prefix=image_path_prefix,
+                offline_queue=offline_queue,
+                near_duplicates=near_duplicates,
             )
         elif path.is_dir():
             safe_print(f"开始处理目录: {path.name} 📁", level="info")
-            md_files = list(path.rglob("*.md"))
-            safe_print(f"发现 {len(md_files)} 个 Markdown 文件", level="info")
-            for md_file in md_files:
-                try:
-                    process_markdown_file(
-                        str(md_file),
-                        image_host=image_host,
-                        max_workers=max_workers,
-                        convert_to_wp=convert_to_wp,
-                        remove_wp=remove_wp,
-                        image_path_prefix=image_path_prefix,
-                    )
-                except Exception as e:
-                    safe_print(
-                        f"处理文件 {md_file.name} 时出错: {str(e)} ❌", level="error"
-                    )
-                    # 继续处理其他文件
-                    continue
+            md_files = collect_markdown_files(path)
+
+            from pipeline import VaultPipeline
+
+            pipeline_config = pipeline_config or {}
+            pipeline = VaultPipeline(
+                image_host=image_host,
+                max_workers=max_workers,
+                convert_to_wp=convert_to_wp,
+                remove_wp=remove_wp,
+                image_path_prefix=image_path_prefix,
+                stage_config=pipeline_config.get("stages"),
+                queue_size=pipeline_config.get("queue_size", 64),
+                large_file_threshold=pipeline_config.get(
+                    "large_file_threshold", 5 * 1024 * 1024
+                ),
+                offline_queue=offline_queue,
+                reference_index=reference_index,
+                near_duplicates=near_duplicates,
+            )
+            stats = pipeline.run(md_files)
+            safe_print(
+                f"共处理 {stats['notes']} 个文件，更新 {stats['changed_notes']} 个，"
+                f"上传 {stats['uploaded']} 张图片，复用 {stats['reused']} 张，"
+                f"失败 {stats['failed']} 张",
+                level="info",
+            )
             safe_print("所有文件处理完成！🎉", level="success")
         else:
             safe_print("请提供有效的markdown文件或目录路径 ⚠️", level="warning")
@@ -307,6 +613,77 @@ def process_vault(
         safe_print(f"处理路径时发生错误: {str(e)} ❌", level="error")
 
 
+def _process_to_output_dir(
+    path,
+    output_dir,
+    image_host=None,
+    max_workers=3,
+    convert_to_wp=False,
+    remove_wp=False,
+    image_path_prefix="",
+    pipeline_config=None,
+    near_duplicates=None,
+):
+    """
+    输出目录模式：改写后的笔记原子写入输出目录，其余笔记和附件以链接方式放入
+
+    Args:
+        path: 文件或目录路径
+        output_dir: 输出目录
+        其余参数同 process_vault
+    """
+    from output_tree import OutputTree, link_file
+    from pipeline import VaultPipeline
+
+    if path.is_dir():
+        source_root = path
+    elif path.is_file() and path.suffix.lower() == ".md":
+        source_root = path.parent
+    else:
+        safe_print("请提供有效的markdown文件或目录路径 ⚠️", level="warning")
+        return
+    output_tree = OutputTree(str(source_root), output_dir)
+    safe_print(f"输出目录: {output_tree.output_dir} 📁", level="info")
+    md_files = collect_markdown_files(path)
+
+    # 不使用离线队列：补传时会改写输出目录中的笔记，而未改写的笔记是指向源文件的硬链接
+    pipeline_config = pipeline_config or {}
+    pipeline = VaultPipeline(
+        image_host=image_host,
+        max_workers=max_workers,
+        convert_to_wp=convert_to_wp,
+        remove_wp=remove_wp,
+        image_path_prefix=image_path_prefix,
+        stage_config=pipeline_config.get("stages"),
+        queue_size=pipeline_config.get("queue_size", 64),
+        large_file_threshold=pipeline_config.get("large_file_threshold", 5 * 1024 * 1024),
+        output_tree=output_tree,
+        near_duplicates=near_duplicates,
+    )
+    stats = pipeline.run(md_files)
+
+    if path.is_dir():
+        linked = output_tree.mirror(skip=pipeline.written)
+    elif pipeline.written:
+        linked = {}
+    else:
+        linked = {link_file(str(path), output_tree.target_for(str(path))): 1}
+    safe_print(
+        f"共处理 {stats['notes']} 个文件，写出改写后的笔记 {stats['changed_notes']} 个，"
+        f"上传 {stats['uploaded']} 张图片，复用 {stats['reused']} 张，"
+        f"失败 {stats['failed']} 张",
+        level="info",
+    )
+    if linked:
+        safe_print(
+            f"链接未改写的文件: 硬链接 {linked.get('hardlink', 0)} 个，"
+            f"reflink {linked.get('reflink', 0)} 个，复制 {linked.get('copy', 0)} 个，"
+            f"未变化 {linked.get('unchanged', 0)} 个，失败 {linked.get('failed', 0)} 个",
+            level="info",
+        )
+    safe_print("所有文件处理完成！🎉", level="success")
+
+
 class ImageUploader:
     def __init__(self, api_url, token=None):
         self.api_url = api_url
@@ -0,0 +1,293 @@
+"""
+笔记仓库清单
+持久化记录仓库中的笔记数、本地/远程图片数、待上传字节数和失效引用，
+程序启动时直接读取显示；后台线程按笔记的修改时间和大小增量刷新，只重新扫描有变化的笔记
+"""
+import json
+import os
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from file_memo import file_memo
+from uploader import safe_print, find_local_images, resolve_image_path
+
+# 远程图片链接：![...](http://...) 或 ![...](//...)
+REMOTE_IMAGE_PATTERN = re.compile(r"!\[[^\]\n]*\]\((?:https?:)?//[^)\s]+\)")
+
+# 清单文件格式版本，格式变化时忽略旧文件重新扫描
+INVENTORY_VERSION = 1
+
+# 吞吐量的平滑系数（新一次运行的权重）
+RATE_SMOOTHING = 0.5
+
+
+def format_eta(seconds: Optional[float]) -> str:
+    """把秒数格式化为便于阅读的预计耗时"""
+    if seconds is None:
+        return "未知"
+    if seconds < 60:
+        return f"{max(1, round(seconds))} 秒"
+    if seconds < 3600:
+        return f"{round(seconds / 60)} 分钟"
+    return f"{seconds / 3600:.1f} 小时"
+
+
+def format_bytes(size: int) -> str:
+    """把字节数格式化为 KB/MB/GB"""
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+class VaultInventory:
+    """笔记仓库清单（线程安全）"""
+
+    def __init__(
+        self, vault_path: str, path: str = "vault_inventory.json", image_path_prefix: str = ""
+    ):
+        """
+        初始化清单，读取已保存的清单文件
+
+        Args:
+            vault_path: 笔记仓库目录
+            path: 清单文件路径
+            image_path_prefix: 图片路径前缀
+        """
+        self.vault_path = os.path.abspath(vault_path)
+        self.path = path
+        self.image_path_prefix = image_path_prefix
+        # {笔记相对路径: [修改时间纳秒, 大小, 远程图片数, [本地图片路径, ...]]}
+        self._notes: Dict[str, List[Any]] = {}
+        self._rates: Dict[str, float] = {}
+        self._summary: Dict[str, Any] = {}
+        self._closed = False
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        """读取清单文件，文件不存在、格式不符或属于其他仓库时从空清单开始"""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            safe_print(f"读取仓库清单失败: {str(e)}", level="warning")
+            return
+        if data.get("version") != INVENTORY_VERSION or data.get("vault") != self.vault_path:
+            return
+        with self._lock:
+            self._notes = data.get("notes", {})
+            self._rates = data.get("rates", {})
+            self._summary = data.get("summary", {})
+
+    def save(self):
+        """原子写入清单文件（每次写入使用独立的临时文件），清单已关闭时不写入"""
+        with self._lock:
+            if self._closed:
+                return
+            data = {
+                "version": INVENTORY_VERSION,
+                "vault": self.vault_path,
+                "notes": self._notes,
+                "rates": self._rates,
+                "summary": self._summary,
+            }
+            tmp_path = f"{self.path}.{os.getpid()}-{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp_path, self.path)
+
+    def close(self):
+        """关闭清单：之后不再写入清单文件（被新的清单取代后调用）"""
+        with self._lock:
+            self._closed = True
+
+    def _scan_note(self, file_path: str, stat: os.stat_result) -> List[Any]:
+        with open(file_path, "r", encoding="utf-8", errors="replace") as f:
+            content = f.read()
+        prefix = self.image_path_prefix
+        local_images = [
+            resolve_image_path(match.group(1), file_path, prefix)
+            for match in find_local_images(content, file_path, prefix)
+        ]
+        remote_count = len(REMOTE_IMAGE_PATTERN.findall(content))
+        return [stat.st_mtime_ns, stat.st_size, remote_count, local_images]
+
+    def refresh(self) -> Dict[str, Any]:
+        """
+        增量刷新：只重新扫描新增或修改过的笔记，删除已不存在的笔记，
+        并重新检查所有引用的本地图片是否存在及其大小
+
+        Returns:
+            统计摘要（同 summary）
+        """
+        with self._lock:
+            previous = dict(self._notes)
+
+        notes = {}
+        rescanned = 0
+        for directory, dirs, files in os.walk(self.vault_path):
+            # 跳过 .obsidian、.git 等隐藏目录
+            dirs[:] = [name for name in dirs if not name.startswith(".")]
+            for name in files:
+                if not name.lower().endswith(".md"):
+                    continue
+                file_path = os.path.join(directory, name)
+                key = os.path.relpath(file_path, self.vault_path)
+                try:
+                    stat = os.stat(file_path)
+                    entry = previous.get(key)
+                    if entry is None or entry[:2] != [stat.st_mtime_ns, stat.st_size]:
+                        entry = self._scan_note(file_path, stat)
+                        rescanned += 1
+                except OSError:
+                    continue
+                notes[key] = entry
+
+        summary = self._summarize(notes)
+        with self._lock:
+            changed = {k: v for k, v in summary.items() if k != "scanned_at"} != {
+                k: v for k, v in self._summary.items() if k != "scanned_at"
+            }
+            self._notes = notes
+            self._summary = summary
+        if changed or rescanned or notes.keys() != previous.keys():
+            try:
+                self.save()
+            except OSError as e:
+                safe_print(f"保存仓库清单失败: {str(e)}", level="warning")
+        return self.summary()
+
+    def _summarize(self, notes: Dict[str, List[Any]]) -> Dict[str, Any]:
+        sizes: Dict[str, Optional[int]] = {}
+        local_refs = remote = broken = 0
+        for _, _, remote_count, local_images in notes.values():
+            remote += remote_count
+            for image_path in local_images:
+                if image_path not in sizes:
+                    try:
+                        sizes[image_path] = file_memo.getsize(image_path)
+                    except OSError:
+                        sizes[image_path] = None
+                if sizes[image_path] is None:
+                    broken += 1
+                else:
+                    local_refs += 1
+        pending = [size for size in sizes.values() if size is not None]
+        return {
+            "notes": len(notes),
+            "local_images": local_refs,
+            "pending_images": len(pending),
+            "pending_bytes": sum(pending),
+            "remote_images": remote,
+            "broken": broken,
+            "scanned_at": time.time(),
+        }
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        统计摘要（启动时直接返回上次保存的结果，无需扫描）
+
+        Returns:
+            {"notes", "local_images", "pending_images", "pending_bytes",
+             "remote_images", "broken", "scanned_at", "eta"}，尚未扫描时为空字典
+        """
+        with self._lock:
+            if not self._summary:
+                return {}
+            summary = dict(self._summary)
+        summary["eta"] = self.estimate(summary["pending_images"], summary["pending_bytes"])
+        return summary
+
+    def record_run(self, images: int, size: int, seconds: float):
+        """
+        记录一次处理的上传吞吐量，用于估算剩余耗时
+
+        Args:
+            images: 上传的图片数
+            size: 上传的字节数
+            seconds: 耗时（秒）
+        """
+        if images <= 0 or seconds <= 0:
+            return
+        measured = {"images_per_second": images / seconds, "bytes_per_second": size / seconds}
+        with self._lock:
+            for key, value in measured.items():
+                old = self._rates.get(key)
+                self._rates[key] = (
+                    value if old is None else old + RATE_SMOOTHING * (value - old)
+                )
+        try:
+            self.save()
+        except OSError as e:
+            safe_print(f"保存仓库清单失败: {str(e)}", level="warning")
+
+    def estimate(self, pending_images: int, pending_bytes: int) -> Optional[float]:
+        """
+        按历史吞吐量估算上传剩余图片所需的秒数
+
+        Returns:
+            秒数，没有历史记录时返回None
+        """
+        if not pending_images:
+            return 0.0
+        with self._lock:
+            images_rate = self._rates.get("images_per_second")
+            bytes_rate = self._rates.get("bytes_per_second")
+        if not images_rate:
+            return None
+        seconds = pending_images / images_rate
+        if bytes_rate:
+            seconds = max(seconds, pending_bytes / bytes_rate)
+        return seconds
+
+
+class BackgroundIndexer(threading.Thread):
+    """后台定期刷新仓库清单"""
+
+    def __init__(
+        self,
+        inventory: VaultInventory,
+        on_update: Callable[[Dict[str, Any]], None],
+        interval: float = 300,
+    ):
+        """
+        初始化后台刷新线程
+
+        Args:
+            inventory: 仓库清单
+            on_update: 刷新完成后的回调，参数为统计摘要（在后台线程中调用）
+            interval: 刷新间隔（秒）
+        """
+        super().__init__(daemon=True, name="vault-indexer")
+        self.inventory = inventory
+        self.on_update = on_update
+        self.interval = interval
+        self._wakeup = threading.Event()
+        self._stop_event = threading.Event()
+
+    def refresh_soon(self):
+        """立即触发一次刷新（如处理完成后）"""
+        self._wakeup.set()
+
+    def stop(self):
+        """停止刷新：关闭清单，正在进行的刷新结束后不再保存或回调"""
+        self._stop_event.set()
+        self.inventory.close()
+        self._wakeup.set()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                summary = self.inventory.refresh()
+                if not self._stop_event.is_set():
+                    self.on_update(summary)
+            except Exception as e:
+                safe_print(f"刷新仓库清单失败: {str(e)}", level="warning")
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
@@ -2,7 +2,10 @@
 WordPress链接处理模块
 处理WordPress链接的转换和还原
 """
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
 from typing import Optional
 
 
@@ -120,3 +123,90 @@ class WordPressLinkProcessor:
                 processed_count += 1
 
         return new_content, processed_count
+
+    @staticmethod
+    def process_file(
+        file_path: str, convert_to_wp: bool = False, remove_wp: bool = False
+    ) -> int:
+        """
+        只处理单个文件中的WordPress链接，内容无变化时不写回
+
+        Args:
+            file_path: Markdown文件路径
+            convert_to_wp: 是否转换为WordPress格式
+            remove_wp: 是否移除WordPress前缀
+
+        Returns:
+            处理的链接数量
+        """
+        with open(file_path, "rb") as f:
+            data = f.read()
+
+        # 先在字节层面快速判断，不含图片语法（或WordPress前缀）的文件直接跳过
+        if b"![" not in data:
+            return 0
+        if remove_wp and not convert_to_wp:
+            if WordPressLinkProcessor.WORDPRESS_PREFIX.encode() not in data:
+                return 0
+
+        content = data.decode("utf-8")
+        new_content, count = WordPressLinkProcessor.process_markdown_content(
+            content, convert_to_wp=convert_to_wp, remove_wp=remove_wp
+        )
+        if count and new_content != content:
+            with open(file_path, "wb") as f:
+                f.write(new_content.encode("utf-8"))
+        return count
+
+    @staticmethod
+    def process_vault(
+        path: str,
+        convert_to_wp: bool = False,
+        remove_wp: bool = False,
+        max_workers: Optional[int] = None,
+    ) -> dict:
+        """
+        使用进程池批量处理目录下所有笔记的WordPress链接（不上传图片）
+
+        Args:
+            path: Markdown文件或目录路径
+            convert_to_wp: 是否转换为WordPress格式
+            remove_wp: 是否移除WordPress前缀
+            max_workers: 最大进程数，默认为CPU核心数
+
+        Returns:
+            统计信息 {"files", "changed_files", "links", "errors"}
+        """
+        path = Path(path)
+        md_files = [str(path)] if path.is_file() else [str(p) for p in path.rglob("*.md")]
+
+        stats = {"files": len(md_files), "changed_files": 0, "links": 0, "errors": []}
+        if not md_files:
+            return stats
+
+        max_workers = max_workers or os.cpu_count() or 1
+        chunksize = max(1, min(256, len(md_files) // (max_workers * 4)))
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = executor.map(
+                _process_file_worker,
+                md_files,
+                [convert_to_wp] * len(md_files),
+                [remove_wp] * len(md_files),
+                chunksize=chunksize,
+            )
+            for file_path, count, error in results:
+                if error:
+                    stats["errors"].append((file_path, error))
+                elif count:
+                    stats["changed_files"] += 1
+                    stats["links"] += count
+        return stats
+
+
+def _process_file_worker(file_path: str, convert_to_wp: bool, remove_wp: bool):
+    """进程池工作函数，异常转换为返回值以免中断整批处理"""
+    try:
+        count = WordPressLinkProcessor.process_file(file_path, convert_to_wp, remove_wp)
+        return file_path, count, None
+    except Exception as e:
+        return file_path, 0, str(e)